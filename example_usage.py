@@ -6,7 +6,9 @@ This script demonstrates how to use the multi-agent orchestration system
 with the AgriAgent example for agricultural advisory.
 """
 
+import sys
 import json
+import asyncio
 from gcp_agentor import AgentOrchestrator
 from gcp_agentor.examples.agri_agent import (
     CropAdvisorAgent,
@@ -14,10 +16,15 @@ from gcp_agentor.examples.agri_agent import (
     PestAssistantAgent,
     SoilAnalyzerAgent,
     MarketAgent,
-    GeneralAssistantAgent
+    GeneralAssistantAgent,
+    get_shared_agent
 )
 
 
+# Inputs that end the interactive loop
+_QUIT_COMMANDS = frozenset({"quit", "exit", "q"})
+
+
 def setup_agri_system():
     """Set up the agricultural advisory system with all agents."""
     print("🚀 Setting up GCP Agentor - Agricultural Advisory System")
@@ -29,41 +36,38 @@ def setup_agri_system():
     # Register all agricultural agents
     print("📝 Registering agents...")
     
-    orchestrator.register_agent("crop_advisor", CropAdvisorAgent(), {
-        "description": "Provides crop recommendations based on season and location",
-        "capabilities": ["crop_advice", "seasonal_planning"],
-        "intents": ["get_crop_advice", "crop_recommendations"]
-    })
-    
-    orchestrator.register_agent("weather", WeatherAgent(), {
-        "description": "Provides weather forecasts and alerts",
-        "capabilities": ["weather_forecast", "weather_alerts"],
-        "intents": ["get_weather", "weather_forecast"]
-    })
-    
-    orchestrator.register_agent("pest_assistant", PestAssistantAgent(), {
-        "description": "Provides pest control advice and treatment recommendations",
-        "capabilities": ["pest_control", "disease_management"],
-        "intents": ["pest_control", "disease_treatment"]
-    })
-    
-    orchestrator.register_agent("soil_analyzer", SoilAnalyzerAgent(), {
-        "description": "Provides soil analysis and fertilizer recommendations",
-        "capabilities": ["soil_analysis", "fertilizer_advice"],
-        "intents": ["soil_analysis", "fertilizer_recommendations"]
-    })
-    
-    orchestrator.register_agent("market_agent", MarketAgent(), {
-        "description": "Provides market prices and trading information",
-        "capabilities": ["market_prices", "trading_advice"],
-        "intents": ["market_prices", "price_information"]
-    })
-    
-    orchestrator.register_agent("general_assistant", GeneralAssistantAgent(), {
-        "description": "Provides general agricultural advice and tips",
-        "capabilities": ["general_advice", "farming_tips"],
-        "intents": ["general_help", "farming_basics"]
-    })
+    orchestrator.register_agents([
+        ("crop_advisor", get_shared_agent(CropAdvisorAgent), {
+            "description": "Provides crop recommendations based on season and location",
+            "capabilities": ["crop_advice", "seasonal_planning"],
+            "intents": ["get_crop_advice", "crop_recommendations"]
+        }),
+        ("weather", get_shared_agent(WeatherAgent), {
+            "description": "Provides weather forecasts and alerts",
+            "capabilities": ["weather_forecast", "weather_alerts"],
+            "intents": ["get_weather", "weather_forecast"]
+        }),
+        ("pest_assistant", get_shared_agent(PestAssistantAgent), {
+            "description": "Provides pest control advice and treatment recommendations",
+            "capabilities": ["pest_control", "disease_management"],
+            "intents": ["pest_control", "disease_treatment"]
+        }),
+        ("soil_analyzer", get_shared_agent(SoilAnalyzerAgent), {
+            "description": "Provides soil analysis and fertilizer recommendations",
+            "capabilities": ["soil_analysis", "fertilizer_advice"],
+            "intents": ["soil_analysis", "fertilizer_recommendations"]
+        }),
+        ("market_agent", get_shared_agent(MarketAgent), {
+            "description": "Provides market prices and trading information",
+            "capabilities": ["market_prices", "trading_advice"],
+            "intents": ["market_prices", "price_information"]
+        }),
+        ("general_assistant", get_shared_agent(GeneralAssistantAgent), {
+            "description": "Provides general agricultural advice and tips",
+            "capabilities": ["general_advice", "farming_tips"],
+            "intents": ["general_help", "farming_basics"]
+        })
+    ])
     
     print(f"✅ Registered {len(orchestrator.list_agents())} agents")
     return orchestrator
@@ -167,9 +171,24 @@ def demonstrate_advanced_features(orchestrator):
         "How do I control pests?"
     ]
     
-    for i, msg in enumerate(messages, 1):
+    # Send them all at once; handle_message_async handles one user's messages
+    # in the order they were sent, so the history stays in order
+    async def send_all():
+        return await asyncio.gather(*(
+            orchestrator.handle_message_async({
+                "from_id": "user:farmer123",
+                "to_id": "agent:router",
+                "intent": "",  # Auto-detected
+                "message": msg,
+                "context": {}
+            })
+            for msg in messages
+        ))
+    
+    responses = asyncio.run(send_all())
+    
+    for i, (msg, response) in enumerate(zip(messages, responses), 1):
         print(f"\nMessage {i}: {msg}")
-        response = orchestrator.handle_simple_message("farmer123", msg)
         print(f"Response: {response.get('response', 'No response')[:100]}...")
     
     # Get conversation history
@@ -227,7 +246,7 @@ def interactive_demo(orchestrator):
         try:
             message = input(f"[{user_id}]> ").strip()
             
-            if message.lower() in ['quit', 'exit', 'q']:
+            if message.lower() in _QUIT_COMMANDS:
                 break
             
             if not message:
@@ -255,6 +274,12 @@ def interactive_demo(orchestrator):
 
 def main():
     """Main demonstration function."""
+    # The demo prints a lot of short lines; let them accumulate in the
+    # stream buffer instead of flushing each one (input() still flushes
+    # before prompting)
+    if hasattr(sys.stdout, "reconfigure"):
+        sys.stdout.reconfigure(line_buffering=False)
+    
     try:
         # Set up the system
         orchestrator = setup_agri_system()
@@ -281,6 +306,8 @@ def main():
         print(f"❌ Error during demo: {e}")
         import traceback
         traceback.print_exc()
+    finally:
+        sys.stdout.flush()
 
 
 if __name__ == "__main__":
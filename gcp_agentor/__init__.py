@@ -11,7 +11,7 @@ from .agent_registry import AgentRegistry
 from .router import AgentRouter
 from .memory import MemoryManager
 from .acp import ACPMessage
-from .invoker import AgentInvoker
+from .invoker import AgentInvoker, InvocationError
 from .logger import ReasoningLogger
 
 __version__ = "0.1.0"
@@ -24,5 +24,6 @@ __all__ = [
     "MemoryManager",
     "ACPMessage",
     "AgentInvoker",
+    "InvocationError",
     "ReasoningLogger",
 ] 
\ No newline at end of file
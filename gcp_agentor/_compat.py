@@ -0,0 +1,60 @@
+"""
+Compatibility helpers for the supported Python versions and optional dependencies.
+"""
+
+import json
+import sys
+from typing import Any
+
+# ``dataclass(slots=True)`` is only available on Python 3.10+
+DATACLASS_SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+    orjson = None
+
+
+def json_bytes(value: Any, indent: bool = False, sort_keys: bool = False) -> bytes:
+    """
+    Serialize a value to UTF-8 JSON, with orjson when it is installed.
+    
+    Output is compact (or indented by two spaces), keeps non-ASCII text
+    as is and converts unsupported values with ``str``, whichever
+    encoder is used.
+    
+    Args:
+        value: Value to serialize
+        indent: Indent the output for human readers
+        sort_keys: Sort dictionary keys, for output that only depends on
+            the content (raises TypeError if keys of one dict can't be
+            compared)
+    
+    Returns:
+        JSON document as bytes
+    """
+    if ORJSON_AVAILABLE:
+        # Let datetimes and dataclasses reach default=str, as with json.dumps
+        option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        try:
+            return orjson.dumps(value, default=str, option=option)
+        except TypeError:
+            # e.g. non-string dict keys; the stdlib encoder accepts those
+            pass
+    return json.dumps(
+        value,
+        indent=2 if indent else None,
+        separators=None if indent else (",", ":"),
+        ensure_ascii=False,
+        sort_keys=sort_keys,
+        default=str
+    ).encode()
+
+
+json_loads = orjson.loads if ORJSON_AVAILABLE else json.loads
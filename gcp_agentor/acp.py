@@ -4,13 +4,19 @@ Agent Communication Protocol (ACP) Module
 Defines the standard message schema for agent communication.
 """
 
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, field
 from typing import Any, Dict, Optional
-import json
-from datetime import datetime
+import time
+from datetime import datetime, timezone
+from functools import lru_cache
+from ._compat import DATACLASS_SLOTS, json_bytes, json_loads
 
+# Fields an ACP message dictionary must have (and must not be None)
+_REQUIRED_FIELDS = ("from_id", "to_id", "intent", "message")
+_FIELD_NAMES = frozenset(_REQUIRED_FIELDS + ("language", "context", "timestamp", "session_id"))
 
-@dataclass
+
+@dataclass(repr=False, **DATACLASS_SLOTS)
 class ACPMessage:
     """
     Standardized message format for agent communication.
@@ -33,41 +39,112 @@ class ACPMessage:
     context: Optional[Dict[str, Any]] = None
     timestamp: Optional[str] = None
     session_id: Optional[str] = None
+    # Creation time backing the default timestamp and session id
+    _created: float = field(default=0.0, init=False, repr=False, compare=False)
     
-    def __post_init__(self):
+    def __post_init__(self, _time=time.time):
         """Initialize default values after object creation."""
         if self.context is None:
             self.context = {}
+        # The creation time is captured now, but the default timestamp and
+        # session id are only formatted on first access (see __getattr__);
+        # many messages never read them.
+        if self.timestamp is None or self.session_id is None:
+            self._created = _time()
         if self.timestamp is None:
-            self.timestamp = datetime.utcnow().isoformat()
+            del self.timestamp
         if self.session_id is None:
-            self.session_id = f"session_{int(datetime.utcnow().timestamp())}"
+            del self.session_id
+    
+    def __getattr__(
+        self, 
+        name: str, 
+        _fromtimestamp=datetime.fromtimestamp, 
+        _utc=timezone.utc
+    ) -> Any:
+        """Format the default timestamp or session id on first access."""
+        # Clock helpers are bound as defaults to skip global lookups
+        if name == "timestamp":
+            value = _fromtimestamp(self._created, _utc).isoformat()
+        elif name == "session_id":
+            value = f"session_{int(self._created)}"
+        else:
+            raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+        setattr(self, name, value)
+        return value
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert the message to a dictionary."""
-        return asdict(self)
+        return {
+            "from_id": self.from_id,
+            "to_id": self.to_id,
+            "intent": self.intent,
+            "message": self.message,
+            "language": self.language,
+            "context": self.context,
+            "timestamp": self.timestamp,
+            "session_id": self.session_id
+        }
     
-    def to_json(self) -> str:
-        """Convert the message to JSON string."""
-        return json.dumps(self.to_dict(), indent=2)
+    def to_json(self, pretty: bool = False) -> str:
+        """
+        Convert the message to JSON string.
+        
+        Uses orjson when installed; context values it can't encode (such as
+        non-string keys) fall back to the json module.
+        
+        Args:
+            pretty: Indent the output for human readers
+        
+        Returns:
+            JSON string (compact unless pretty is set)
+        """
+        return json_bytes(self.to_dict(), indent=pretty).decode()
     
     def is_valid(self) -> bool:
         """Validate the message structure."""
-        required_fields = ["from_id", "to_id", "intent", "message"]
+        # Dataclass fields always exist, so only their values need checking;
+        # the language code must be a string of at least two characters and
+        # the context, when present, a dictionary. Exact type checks come
+        # first since plain str/dict values are the common case.
+        language = self.language
+        context = self.context
+        return (
+            self.from_id is not None
+            and self.to_id is not None
+            and self.intent is not None
+            and self.message is not None
+            and (type(language) is str or isinstance(language, str))
+            and len(language) >= 2
+            and (context is None or type(context) is dict or isinstance(context, dict))
+        )
+    
+    @staticmethod
+    def validate_dict(data: Any) -> bool:
+        """
+        Check an ACP message dictionary without building a message.
         
-        for field in required_fields:
-            if not hasattr(self, field) or getattr(self, field) is None:
-                return False
+        Args:
+            data: Candidate message dictionary
         
-        # Validate language code format
-        if not isinstance(self.language, str) or len(self.language) < 2:
+        Returns:
+            True if from_dict() accepts the dictionary and the resulting
+            message passes is_valid()
+        """
+        if type(data) is not dict and not isinstance(data, dict):
             return False
-        
-        # Validate context is a dictionary
-        if self.context is not None and not isinstance(self.context, dict):
+        if not _FIELD_NAMES.issuperset(data):
             return False
-        
-        return True
+        for name in _REQUIRED_FIELDS:
+            if data.get(name) is None:
+                return False
+        language = data.get("language", "en-US")
+        context = data.get("context")
+        return (
+            isinstance(language, str)
+            and len(language) >= 2
+            and (context is None or isinstance(context, dict))
+        )
     
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> "ACPMessage":
@@ -77,12 +154,33 @@ class ACPMessage:
     @classmethod
     def from_json(cls, json_str: str) -> "ACPMessage":
         """Create an ACPMessage from a JSON string."""
-        data = json.loads(json_str)
-        return cls.from_dict(data)
+        return cls.from_dict(json_loads(json_str))
     
     def __str__(self) -> str:
         """String representation of the message."""
         return f"ACPMessage(from={self.from_id}, to={self.to_id}, intent={self.intent})"
+    
+    # Logged messages use the same short form instead of dumping every field
+    __repr__ = __str__
+
+
+if not DATACLASS_SLOTS:
+    # Without slots the dataclass keeps the None defaults as class attributes,
+    # which would shadow __getattr__ for the lazily generated fields.
+    del ACPMessage.timestamp
+    del ACPMessage.session_id
+
+
+@lru_cache(maxsize=4096)
+def _user_id(user_id: str) -> str:
+    """Build (and cache) the sender id for a user."""
+    return f"user:{user_id}"
+
+
+@lru_cache(maxsize=1024)
+def _agent_id(agent_name: str) -> str:
+    """Build (and cache) the endpoint id for an agent."""
+    return f"agent:{agent_name}"
 
 
 def create_user_message(
@@ -106,7 +204,7 @@ def create_user_message(
         ACPMessage configured for user input
     """
     return ACPMessage(
-        from_id=f"user:{user_id}",
+        from_id=_user_id(user_id),
         to_id="agent:router",
         intent=intent,
         message=message,
@@ -136,8 +234,8 @@ def create_agent_message(
         ACPMessage configured for agent communication
     """
     return ACPMessage(
-        from_id=f"agent:{from_agent}",
-        to_id=f"agent:{to_agent}",
+        from_id=_agent_id(from_agent),
+        to_id=_agent_id(to_agent),
         intent=intent,
         message=message,
         context=context or {}
@@ -4,30 +4,48 @@ Agent Registry Module
 Manages registered agents and their metadata for dynamic discovery and routing.
 """
 
-from typing import Any, Dict, List, Optional, Callable
+from typing import Any, Dict, Iterable, List, Optional, Callable, Tuple
+import sys
 import logging
-from dataclasses import dataclass, asdict
+from collections import defaultdict
+from dataclasses import dataclass, field
+from ._compat import DATACLASS_SLOTS
 
 
-@dataclass
+def _freeze(values: Optional[Iterable[str]]) -> Tuple[str, ...]:
+    """Convert capability/intent names to a tuple of interned strings."""
+    return tuple(sys.intern(value) for value in values or ())
+
+
+@dataclass(**DATACLASS_SLOTS)
 class AgentMetadata:
     """Metadata for a registered agent."""
     name: str
     description: str = ""
-    capabilities: Optional[List[str]] = None
-    intents: Optional[List[str]] = None
+    capabilities: Tuple[str, ...] = ()
+    intents: Tuple[str, ...] = ()
     version: str = "1.0.0"
     is_active: bool = True
-    config: Optional[Dict[str, Any]] = None
+    config: Dict[str, Any] = field(default_factory=dict)
     
     def __post_init__(self):
-        """Initialize default values."""
-        if self.capabilities is None:
-            self.capabilities = []
-        if self.intents is None:
-            self.intents = []
+        """Freeze capabilities and intents into tuples of interned strings."""
+        self.capabilities = _freeze(self.capabilities)
+        self.intents = _freeze(self.intents)
         if self.config is None:
             self.config = {}
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert the metadata to a dictionary."""
+        return {
+            "name": self.name,
+            "description": self.description,
+            "capabilities": list(self.capabilities),
+            "intents": list(self.intents),
+            "version": self.version,
+            "is_active": self.is_active,
+            "config": dict(self.config)
+        }
 
 
 class AgentRegistry:
@@ -42,6 +60,20 @@ class AgentRegistry:
         self._agents: Dict[str, Any] = {}
         self._metadata: Dict[str, AgentMetadata] = {}
         self._logger = logging.getLogger(__name__)
+        
+        # Reverse indexes for capability/intent lookups. Values are dicts used
+        # as insertion-ordered sets so lookups keep registration order.
+        self._by_capability: Dict[str, Dict[str, None]] = defaultdict(dict)
+        self._by_intent: Dict[str, Dict[str, None]] = defaultdict(dict)
+        self._active_names: Dict[str, None] = {}
+        
+        # Registered names, rebuilt only when agents are added or removed
+        self._names: Tuple[str, ...] = ()
+        
+        # Bumped on every mutation; used to invalidate the cached snapshot
+        self._version = 0
+        self._snapshot: Dict[str, Dict[str, Any]] = {}
+        self._snapshot_version = -1
     
     def register(
         self, 
@@ -58,7 +90,8 @@ class AgentRegistry:
             metadata: Optional metadata dictionary
         """
         if name in self._agents:
-            self._logger.warning(f"Agent '{name}' already registered. Overwriting.")
+            self._logger.warning("Agent '%s' already registered. Overwriting.", name)
+            self._unindex(name)
         
         self._agents[name] = agent
         
@@ -68,8 +101,44 @@ class AgentRegistry:
             **(metadata or {})
         )
         self._metadata[name] = agent_metadata
+        self._index(name)
+        self._names = tuple(self._agents)
+        self._version += 1
+        
+        self._logger.info(
+            "Registered agent '%s' with capabilities: %s", name, agent_metadata.capabilities
+        )
+    
+    def register_many(
+        self, 
+        items: Iterable[Tuple[str, Any, Optional[Dict[str, Any]]]]
+    ) -> None:
+        """
+        Register several agents in one pass.
+        
+        Args:
+            items: Iterable of (name, agent, metadata) tuples
+        """
+        agents = self._agents
+        all_metadata = self._metadata
+        log_names = self._logger.isEnabledFor(logging.INFO)
+        names = []
+        
+        for name, agent, metadata in items:
+            if name in agents:
+                self._logger.warning("Agent '%s' already registered. Overwriting.", name)
+                self._unindex(name)
+            
+            agents[name] = agent
+            all_metadata[name] = AgentMetadata(name=name, **(metadata or {}))
+            self._index(name)
+            if log_names:
+                names.append(name)
         
-        self._logger.info(f"Registered agent '{name}' with capabilities: {agent_metadata.capabilities}")
+        self._names = tuple(agents)
+        self._version += 1
+        if log_names:
+            self._logger.info("Registered %d agents: %s", len(names), names)
     
     def get(self, name: str) -> Optional[Any]:
         """
@@ -83,6 +152,35 @@ class AgentRegistry:
         """
         return self._agents.get(name)
     
+    def call(
+        self, 
+        name: str, 
+        message: str, 
+        context: Optional[Dict[str, Any]] = None
+    ) -> Any:
+        """
+        Invoke a registered agent directly.
+        
+        Agents exposing an ``invoke`` method are called through it; plain
+        callables are called with the message and context.
+        
+        Args:
+            name: Agent name
+            message: Input message
+            context: Optional context data
+            
+        Returns:
+            The agent response
+            
+        Raises:
+            KeyError: If the agent is not registered
+        """
+        agent = self._agents[name]
+        invoke = getattr(agent, "invoke", None)
+        if invoke is not None:
+            return invoke(message, context or {})
+        return agent(message, context or {})
+    
     def get_metadata(self, name: str) -> Optional[AgentMetadata]:
         """
         Get agent metadata by name.
@@ -102,7 +200,7 @@ class AgentRegistry:
         Returns:
             List of agent names
         """
-        return list(self._agents.keys())
+        return list(self._names)
     
     def list_active(self) -> List[str]:
         """
@@ -111,10 +209,7 @@ class AgentRegistry:
         Returns:
             List of active agent names
         """
-        return [
-            name for name, metadata in self._metadata.items()
-            if metadata.is_active
-        ]
+        return list(self._active_names)
     
     def list_by_capability(self, capability: str) -> List[str]:
         """
@@ -127,8 +222,8 @@ class AgentRegistry:
             List of agent names with the capability
         """
         return [
-            name for name, metadata in self._metadata.items()
-            if metadata.capabilities and capability in metadata.capabilities and metadata.is_active
+            name for name in self._by_capability.get(capability, ())
+            if name in self._active_names
         ]
     
     def list_by_intent(self, intent: str) -> List[str]:
@@ -142,8 +237,8 @@ class AgentRegistry:
             List of agent names that can handle the intent
         """
         return [
-            name for name, metadata in self._metadata.items()
-            if metadata.intents and intent in metadata.intents and metadata.is_active
+            name for name in self._by_intent.get(intent, ())
+            if name in self._active_names
         ]
     
     def unregister(self, name: str) -> bool:
@@ -157,9 +252,12 @@ class AgentRegistry:
             True if agent was unregistered, False if not found
         """
         if name in self._agents:
+            self._unindex(name)
             del self._agents[name]
             del self._metadata[name]
-            self._logger.info(f"Unregistered agent '{name}'")
+            self._names = tuple(self._agents)
+            self._version += 1
+            self._logger.info("Unregistered agent '%s'", name)
             return True
         return False
     
@@ -179,10 +277,28 @@ class AgentRegistry:
         
         current_metadata = self._metadata[name]
         for key, value in metadata.items():
-            if hasattr(current_metadata, key):
-                setattr(current_metadata, key, value)
+            if not hasattr(current_metadata, key):
+                continue
+            
+            # Only touch the index buckets that actually change
+            if key == "capabilities":
+                value = _freeze(value)
+                self._reindex(self._by_capability, name, current_metadata.capabilities, value)
+            elif key == "intents":
+                value = _freeze(value)
+                self._reindex(self._by_intent, name, current_metadata.intents, value)
+            elif key == "is_active" and value != current_metadata.is_active:
+                if value:
+                    self._active_names[name] = None
+                else:
+                    self._active_names.pop(name, None)
+            elif key == "config" and value is None:
+                value = {}
+            
+            setattr(current_metadata, key, value)
+        self._version += 1
         
-        self._logger.info(f"Updated metadata for agent '{name}'")
+        self._logger.info("Updated metadata for agent '%s'", name)
         return True
     
     def is_registered(self, name: str) -> bool:
@@ -213,15 +329,81 @@ class AgentRegistry:
         return {
             "name": name,
             "agent": self._agents[name],
-            "metadata": asdict(self._metadata[name])
+            "metadata": self._metadata[name].to_dict()
         }
     
+    @property
+    def version(self) -> int:
+        """Counter incremented on every change to the registered agents."""
+        return self._version
+    
+    @property
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Agent information for all registered agents, keyed by name.
+        
+        The dictionary is rebuilt only after the registry changes and is
+        shared between callers, so it must not be mutated.
+        """
+        if self._snapshot_version != self._version:
+            self._snapshot = {name: self.get_agent_info(name) for name in self._agents}
+            self._snapshot_version = self._version
+        return self._snapshot
+    
     def clear(self) -> None:
         """Clear all registered agents."""
         self._agents.clear()
         self._metadata.clear()
+        self._by_capability.clear()
+        self._by_intent.clear()
+        self._active_names.clear()
+        self._names = ()
+        self._version += 1
         self._logger.info("Cleared all registered agents")
     
+    def _index(self, name: str) -> None:
+        """Add an agent's metadata to the reverse indexes."""
+        metadata = self._metadata[name]
+        for capability in metadata.capabilities:
+            self._by_capability[capability][name] = None
+        for intent in metadata.intents:
+            self._by_intent[intent][name] = None
+        if metadata.is_active:
+            self._active_names[name] = None
+    
+    def _unindex(self, name: str) -> None:
+        """Remove an agent's metadata from the reverse indexes."""
+        metadata = self._metadata[name]
+        for capability in metadata.capabilities:
+            self._discard(self._by_capability, capability, name)
+        for intent in metadata.intents:
+            self._discard(self._by_intent, intent, name)
+        self._active_names.pop(name, None)
+    
+    def _reindex(
+        self, 
+        index: Dict[str, Dict[str, None]], 
+        name: str, 
+        old: Tuple[str, ...], 
+        new: Tuple[str, ...]
+    ) -> None:
+        """Move an agent between index buckets for the keys that changed."""
+        old_keys = set(old)
+        new_keys = set(new)
+        for key in old_keys - new_keys:
+            self._discard(index, key, name)
+        for key in new_keys - old_keys:
+            index[key][name] = None
+    
+    @staticmethod
+    def _discard(index: Dict[str, Dict[str, None]], key: str, name: str) -> None:
+        """Remove a name from an index bucket, dropping the bucket when empty."""
+        bucket = index.get(key)
+        if bucket is not None:
+            bucket.pop(name, None)
+            if not bucket:
+                del index[key]
+    
     def __len__(self) -> int:
         """Return the number of registered agents."""
         return len(self._agents)
@@ -0,0 +1,383 @@
+"""
+Async Module
+
+Asyncio variants of the memory manager and reasoning logger.
+
+They use Firestore's ``AsyncClient`` so session reads and log writes don't
+block the event loop and can run concurrently with ``asyncio.gather``.
+Without Firestore they run the synchronous managers in an executor thread.
+"""
+
+import asyncio
+import functools
+import logging
+import os
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+from datetime import datetime
+from .logger import ReasoningLogger
+from .memory import MemoryManager, SessionDocuments
+
+try:
+    from google.cloud import firestore
+    FIRESTORE_AVAILABLE = True
+except ImportError:
+    FIRESTORE_AVAILABLE = False
+    firestore = None
+
+
+class _AsyncFirestore:
+    """Lazily created ``AsyncClient`` collection with a synchronous fallback."""
+    
+    def __init__(self, project_id: Optional[str], collection_name: str, fallback: Callable[[], Any]):
+        """
+        Initialize the connection state.
+        
+        Args:
+            project_id: GCP project ID (uses default if not provided)
+            collection_name: Firestore collection name
+            fallback: Factory of the synchronous manager used without Firestore
+        """
+        self.project_id = project_id or os.getenv("GCP_PROJECT_ID")
+        self.collection_name = collection_name
+        self._logger = logging.getLogger(__name__)
+        self._collection = None
+        self._firestore_enabled = FIRESTORE_AVAILABLE
+        self._fallback_factory = fallback
+        self._fallback = None
+    
+    @property
+    def _use_firestore(self) -> bool:
+        """Whether Firestore's async client is used, connecting on first access."""
+        if self._collection is None and self._firestore_enabled:
+            try:
+                client = firestore.AsyncClient(project=self.project_id)
+                self._collection = client.collection(self.collection_name)
+                self._logger.info(f"Initialized async Firestore client for collection: {self.collection_name}")
+            except Exception as e:
+                self._logger.error(f"Failed to initialize async Firestore: {e}. Using the synchronous manager.")
+                self._firestore_enabled = False
+        return self._firestore_enabled
+    
+    async def _run_sync(self, method: str, *args: Any) -> Any:
+        """Run a method of the synchronous fallback manager in an executor thread."""
+        if self._fallback is None:
+            self._fallback = self._fallback_factory()
+        call = functools.partial(getattr(self._fallback, method), *args)
+        return await asyncio.get_running_loop().run_in_executor(None, call)
+
+
+class AsyncMemoryManager(_AsyncFirestore):
+    """
+    Async counterpart of MemoryManager.
+    
+    Stores sessions in the same documents (compressed or not) as
+    MemoryManager, so both can be used on one collection.
+    """
+    
+    def __init__(
+        self, 
+        project_id: Optional[str] = None, 
+        collection_name: str = "agentor_memory",
+        compress: bool = False,
+        unpack_compressed: bool = False
+    ):
+        """
+        Initialize the memory manager.
+        
+        Args:
+            project_id: GCP project ID (uses default if not provided)
+            collection_name: Firestore collection name for memory storage
+            compress: Store context and conversation history as one
+                zstd-compressed blob, as MemoryManager(compress=True) does
+            unpack_compressed: Check documents for compressed blobs before
+                the first uncompressed write (see MemoryManager)
+        """
+        super().__init__(
+            project_id, collection_name,
+            lambda: MemoryManager(project_id, collection_name)
+        )
+        # Builds the document writes, as it does for MemoryManager
+        self._documents = SessionDocuments(compress, unpack_compressed)
+    
+    @property
+    def _partial_writes(self) -> bool:
+        """Whether single session fields can be written (Firestore without compression)."""
+        return not self._documents.compressed and self._use_firestore
+    
+    async def get_session(self, user_id: str) -> Dict[str, Any]:
+        """
+        Retrieve session data for a user.
+        
+        Args:
+            user_id: User identifier
+        
+        Returns:
+            Session data dictionary
+        """
+        if not self._use_firestore:
+            return await self._run_sync("get_session", user_id)
+        try:
+            doc = await self._collection.document(f"user_{user_id}").get()
+            return self._documents.load(user_id, (doc.to_dict() or {}) if doc.exists else {})
+        except Exception as e:
+            self._logger.error(f"Error retrieving session for user {user_id}: {e}")
+            return {}
+    
+    async def get_sessions(self, user_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Retrieve the sessions of several users concurrently.
+        
+        Args:
+            user_ids: User identifiers
+        
+        Returns:
+            Session data per user ID
+        """
+        user_ids = list(user_ids)
+        sessions = await asyncio.gather(*(self.get_session(user_id) for user_id in user_ids))
+        return dict(zip(user_ids, sessions))
+    
+    async def save_session(self, user_id: str, data: Dict[str, Any]) -> None:
+        """
+        Save complete session data for a user.
+        
+        Args:
+            user_id: User identifier
+            data: Session data to save
+        """
+        if not self._use_firestore:
+            return await self._run_sync("save_session", user_id, data)
+        try:
+            doc_ref = self._collection.document(f"user_{user_id}")
+            if self._documents.compressed:
+                # The blob holds several fields, so merge on this side
+                data = {**await self.get_session(user_id), **data}
+                await doc_ref.set(self._documents.packed_write(data), merge=True)
+            else:
+                await self._drop_blob(user_id)
+                await doc_ref.set(data, merge=True)
+        except Exception as e:
+            self._logger.error(f"Error saving session for user {user_id}: {e}")
+    
+    async def get_context(self, user_id: str, key: str) -> Any:
+        """
+        Get a specific context value for a user.
+        
+        Args:
+            user_id: User identifier
+            key: Context key
+        
+        Returns:
+            The context value or None if not found
+        """
+        session = await self.get_session(user_id)
+        return session.get("context", {}).get(key)
+    
+    async def set_context(self, user_id: str, key: str, value: Any) -> None:
+        """
+        Set a specific context value for a user.
+        
+        Args:
+            user_id: User identifier
+            key: Context key
+            value: Context value to set
+        """
+        if not self._use_firestore:
+            return await self._run_sync("set_context", user_id, key, value)
+        if self._partial_writes:
+            await self._merge(
+                user_id,
+                {"context": {key: value}},
+                [firestore.FieldPath("context", key)],
+                f"setting context for user {user_id}"
+            )
+            return
+        
+        session = await self.get_session(user_id)
+        session.setdefault("context", {})[key] = value
+        session["last_updated"] = datetime.utcnow().isoformat()
+        await self.save_session(user_id, session)
+    
+    async def get_conversation_history(self, user_id: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        Get conversation history for a user.
+        
+        Args:
+            user_id: User identifier
+            limit: Maximum number of messages to return
+        
+        Returns:
+            List of conversation messages
+        """
+        session = await self.get_session(user_id)
+        history = session.get("conversation_history", [])
+        return history[-limit:] if limit > 0 else history
+    
+    async def add_conversation_message(self, user_id: str, message: Dict[str, Any]) -> None:
+        """
+        Add a message to the conversation history.
+        
+        Args:
+            user_id: User identifier
+            message: Message to add to history
+        """
+        if not self._use_firestore:
+            return await self._run_sync("add_conversation_message", user_id, message)
+        if self._partial_writes:
+            # Append in place; the history is trimmed every few appends
+            await self._merge(
+                user_id,
+                self._documents.append_data(message),
+                ["conversation_history"],
+                f"adding conversation message for user {user_id}"
+            )
+            if self._documents.count_append(user_id):
+                await self._prune_history(user_id)
+            return
+        
+        session = await self.get_session(user_id)
+        self._documents.append(session, message)
+        await self.save_session(user_id, session)
+    
+    async def delete_session(self, user_id: str) -> None:
+        """
+        Delete all session data for a user.
+        
+        Args:
+            user_id: User identifier
+        """
+        if not self._use_firestore:
+            return await self._run_sync("delete_session", user_id)
+        try:
+            await self._collection.document(f"user_{user_id}").delete()
+        except Exception as e:
+            self._logger.error(f"Error deleting session for user {user_id}: {e}")
+    
+    async def _merge(self, user_id: str, data: Dict[str, Any], fields: List[Any], action: str) -> None:
+        """Overwrite some fields (and ``last_updated``) of a user's session document."""
+        await self._drop_blob(user_id)
+        data, fields = self._documents.field_write(data, fields)
+        try:
+            await self._collection.document(f"user_{user_id}").set(data, merge=fields)
+        except Exception as e:
+            self._logger.error(f"Error {action}: {e}")
+    
+    async def _drop_blob(self, user_id: str) -> None:
+        """Turn a user's compressed session document into uncompressed fields (see MemoryManager)."""
+        if not self._documents.needs_blob_check(user_id):
+            return
+        try:
+            doc_ref = self._collection.document(f"user_{user_id}")
+            doc = await doc_ref.get()
+            write = self._documents.unpacked_write((doc.to_dict() or {}) if doc.exists else {})
+            if write is not None:
+                await doc_ref.set(write, merge=True)
+        except Exception as e:
+            self._logger.error(f"Error unpacking session for user {user_id}: {e}")
+            return
+        self._documents.blob_checked(user_id)
+    
+    async def _prune_history(self, user_id: str) -> None:
+        """Trim a user's Firestore conversation history to the last MAX_HISTORY messages."""
+        # Read the stored history itself; get_session() returns it trimmed
+        try:
+            doc = await self._collection.document(f"user_{user_id}").get(field_paths=["conversation_history"])
+        except Exception as e:
+            self._logger.error(f"Error reading conversation history for user {user_id}: {e}")
+            return
+        history = self._documents.pruned_history((doc.to_dict() or {}) if doc.exists else {})
+        if history is not None:
+            await self._merge(
+                user_id,
+                {"conversation_history": history},
+                ["conversation_history"],
+                f"pruning conversation history for user {user_id}"
+            )
+
+
+class AsyncReasoningLogger(_AsyncFirestore):
+    """
+    Async counterpart of ReasoningLogger.
+    
+    Each log entry is written as soon as it is awaited; callers logging
+    several steps can await them together with ``asyncio.gather``.
+    """
+    
+    def __init__(self, project_id: Optional[str] = None, collection_name: str = "agentor_logs"):
+        """
+        Initialize the reasoning logger.
+        
+        Args:
+            project_id: GCP project ID
+            collection_name: Firestore collection name for logs
+        """
+        super().__init__(
+            project_id, collection_name,
+            lambda: ReasoningLogger(project_id, collection_name)
+        )
+    
+    async def log(
+        self,
+        user_id: str,
+        step: str,
+        details: Dict[str, Any],
+        session_id: Optional[str] = None
+    ) -> None:
+        """
+        Log a reasoning step.
+        
+        Args:
+            user_id: User identifier
+            step: Step description
+            details: Step details and data
+            session_id: Optional session identifier
+        """
+        if not self._use_firestore:
+            return await self._run_sync("log", user_id, step, details, session_id)
+        log_entry = {
+            "user_id": user_id,
+            "session_id": session_id or f"session_{int(time.time())}",
+            "timestamp": datetime.utcnow().isoformat(),
+            "step": step,
+            "details": details
+        }
+        try:
+            logs = self._collection.document(f"user_{user_id}").collection("logs")
+            await logs.document().set(log_entry)
+        except Exception as e:
+            self._logger.error(f"Error logging step for user {user_id}: {e}")
+    
+    async def get_logs(
+        self,
+        user_id: str,
+        limit: int = 100,
+        session_id: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Get logs for a user, newest first.
+        
+        Args:
+            user_id: User identifier
+            limit: Maximum number of logs to return
+            session_id: Optional session filter
+        
+        Returns:
+            List of log entries
+        """
+        if not self._use_firestore:
+            return await self._run_sync("get_logs", user_id, limit, session_id)
+        try:
+            query = self._collection.document(f"user_{user_id}").collection("logs")
+            if session_id:
+                query = query.where("session_id", "==", session_id)
+            query = query.order_by("timestamp", direction=firestore.Query.DESCENDING)
+            logs = []
+            async for doc in query.limit(limit).stream():
+                log_data = doc.to_dict()
+                log_data["log_id"] = doc.id
+                logs.append(log_data)
+            return logs
+        except Exception as e:
+            self._logger.error(f"Error retrieving logs for user {user_id}: {e}")
+            return []
@@ -0,0 +1,253 @@
+"""
+Firestore Batcher Module
+
+Coalesces Firestore document writes into batched commits.
+"""
+
+import atexit
+import logging
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+try:
+    from google.api_core import exceptions as api_exceptions
+    API_CORE_AVAILABLE = True
+except ImportError:
+    API_CORE_AVAILABLE = False
+    api_exceptions = None
+
+# Firestore rejects batches above 500 writes; stay below that by default
+MAX_BATCH_SIZE = 400
+
+# Writes waiting for a commit before new ones are dropped
+MAX_QUEUE_SIZE = 10000
+
+# Errors after which a commit is worth retrying
+TRANSIENT_ERRORS: Tuple[type, ...] = (ConnectionError, TimeoutError)
+if API_CORE_AVAILABLE:
+    TRANSIENT_ERRORS += (
+        api_exceptions.Aborted,
+        api_exceptions.DeadlineExceeded,
+        api_exceptions.ServiceUnavailable,
+    )
+
+
+class FirestoreBatcher:
+    """
+    Queues Firestore ``set`` operations and commits them in batches.
+    
+    A background thread commits the queued writes every ``flush_interval``
+    seconds, or as soon as ``max_batch_size`` writes are waiting. When
+    Firestore rejects a batch as too large, the batch size is halved and
+    the writes are retried in smaller batches; transient errors are retried
+    with exponential backoff. Queued writes are flushed
+    when the interpreter exits. Enqueueing never blocks: once
+    ``max_queue_size`` writes are waiting, new writes are dropped and
+    counted in ``dropped``.
+    """
+    
+    def __init__(
+        self,
+        client: Any,
+        flush_interval: float = 0.05,
+        max_batch_size: int = MAX_BATCH_SIZE,
+        max_retries: int = 3,
+        retry_delay: float = 0.1,
+        max_queue_size: int = MAX_QUEUE_SIZE
+    ):
+        """
+        Initialize the batcher.
+        
+        Args:
+            client: Firestore client used to create write batches
+            flush_interval: Seconds between background commits
+            max_batch_size: Maximum number of writes per commit
+            max_retries: Retries of a commit that failed with a transient error
+            retry_delay: Seconds before the first retry (doubled for each retry)
+            max_queue_size: Maximum number of queued writes (0 for no limit)
+        """
+        self._client = client
+        self.flush_interval = flush_interval
+        self.batch_size = max_batch_size
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.max_queue_size = max_queue_size
+        self.dropped = 0
+        self._logger = logging.getLogger(__name__)
+        
+        self._pending: List[Tuple[Any, Dict[str, Any], bool]] = []
+        self._in_flight = 0
+        self._flushing = 0
+        self._condition = threading.Condition()
+        self._closed = False
+        self._thread: Optional[threading.Thread] = None
+    
+    def enqueue(self, doc_ref: Any, data: Dict[str, Any], merge: bool = False) -> bool:
+        """
+        Queue a ``set`` of a document.
+        
+        Args:
+            doc_ref: Firestore document reference
+            data: Document data
+            merge: Whether to merge into an existing document
+        
+        Returns:
+            True if the write was queued, False if it was dropped because
+            the queue is full
+        """
+        return self.enqueue_many([(doc_ref, data)], merge) == 1
+    
+    def enqueue_many(self, writes: Iterable[Tuple[Any, Dict[str, Any]]], merge: bool = False) -> int:
+        """
+        Queue ``set`` operations of several documents at once.
+        
+        Args:
+            writes: (document reference, data) pairs
+            merge: Whether to merge into existing documents
+        
+        Returns:
+            Number of writes queued; the rest were dropped because the
+            queue is full
+        """
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("FirestoreBatcher is closed")
+            queued = 0
+            for doc_ref, data in writes:
+                if self.max_queue_size and len(self._pending) >= self.max_queue_size:
+                    self.dropped += 1
+                    if self.dropped == 1 or self.dropped % 1000 == 0:
+                        self._logger.warning(
+                            f"Firestore write queue full; {self.dropped} writes dropped so far"
+                        )
+                    continue
+                self._pending.append((doc_ref, data, merge))
+                queued += 1
+            if not queued:
+                return 0
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="agentor-firestore-batcher", daemon=True
+                )
+                self._thread.start()
+                # The thread is a daemon; don't lose queued writes on exit
+                atexit.register(self.flush)
+            if len(self._pending) == queued or len(self._pending) >= self.batch_size:
+                self._condition.notify_all()
+            return queued
+    
+    def flush(self) -> None:
+        """Block until every queued write has been committed (or has failed)."""
+        with self._condition:
+            self._flushing += 1
+            self._condition.notify_all()
+            try:
+                while (self._pending or self._in_flight) and self._thread is not None:
+                    self._condition.wait()
+            finally:
+                self._flushing -= 1
+    
+    def close(self) -> None:
+        """Commit the queued writes and stop the background thread."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+            thread = self._thread
+        if thread is not None:
+            thread.join()
+            atexit.unregister(self.flush)
+    
+    def _run(self) -> None:
+        """Background loop committing queued writes."""
+        while True:
+            with self._condition:
+                while not self._pending and not self._closed:
+                    self._condition.wait()
+                if (
+                    not self._closed
+                    and not self._flushing
+                    and len(self._pending) < self.batch_size
+                ):
+                    # Give concurrent writers a moment to join this batch
+                    self._condition.wait(self.flush_interval)
+                
+                ops, self._pending = self._pending, []
+                self._in_flight = len(ops)
+                if not ops and self._closed:
+                    self._condition.notify_all()
+                    return
+            
+            try:
+                if ops:
+                    self._commit(ops)
+            finally:
+                with self._condition:
+                    self._in_flight = 0
+                    self._condition.notify_all()
+    
+    def _commit(self, ops: List[Tuple[Any, Dict[str, Any], bool]]) -> None:
+        """Commit writes in batches of at most ``batch_size`` operations."""
+        start = 0
+        attempt = 0
+        while start < len(ops):
+            chunk = ops[start:start + self.batch_size]
+            try:
+                batch = self._client.batch()
+                for doc_ref, data, merge in chunk:
+                    batch.set(doc_ref, data, merge=merge)
+                batch.commit()
+            except Exception as e:
+                if len(chunk) > 1 and _is_too_big(e):
+                    self.batch_size = max(1, len(chunk) // 2)
+                    self._logger.warning(
+                        f"Firestore batch of {len(chunk)} writes too big; "
+                        f"retrying with batches of {self.batch_size}"
+                    )
+                    continue
+                if attempt < self.max_retries and isinstance(e, TRANSIENT_ERRORS):
+                    delay = self.retry_delay * 2 ** attempt
+                    attempt += 1
+                    self._logger.warning(
+                        f"Firestore commit failed ({e}); retry {attempt} in {delay:.2f}s"
+                    )
+                    time.sleep(delay)
+                    continue
+                self._logger.error(f"Failed to commit {len(chunk)} Firestore writes: {e}")
+            attempt = 0
+            start += len(chunk)
+
+
+def _is_too_big(error: Exception) -> bool:
+    """Check whether Firestore rejected a batch for its size."""
+    text = str(error).lower()
+    return "too big" in text or "too large" in text or "exceeds" in text
+
+
+def delete_documents(client: Any, doc_refs: Iterable[Any], batch_size: int = MAX_BATCH_SIZE) -> int:
+    """
+    Delete documents with batched commits instead of one request each.
+    
+    Args:
+        client: Firestore client used to create write batches
+        doc_refs: References of the documents to delete
+        batch_size: Maximum number of deletes per commit
+    
+    Returns:
+        Number of documents deleted
+    """
+    deleted = 0
+    batch = client.batch()
+    pending = 0
+    for doc_ref in doc_refs:
+        batch.delete(doc_ref)
+        pending += 1
+        if pending >= batch_size:
+            batch.commit()
+            deleted += pending
+            batch = client.batch()
+            pending = 0
+    if pending:
+        batch.commit()
+        deleted += pending
+    return deleted
@@ -0,0 +1,160 @@
+"""
+Cache Module
+
+Small thread-safe in-process caches used by the orchestrator.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional, Tuple
+
+try:
+    import diskcache
+    DISKCACHE_AVAILABLE = True
+except ImportError:
+    DISKCACHE_AVAILABLE = False
+    diskcache = None
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache whose entries expire after a fixed time-to-live.
+    
+    Once ``maxsize`` entries are stored, the least recently used entry is
+    evicted to make room for a new one. When a ``directory`` is given and
+    diskcache is installed, entries are also written to an on-disk cache
+    that survives restarts and can be shared by processes on one host.
+    """
+    
+    def __init__(
+        self,
+        maxsize: int,
+        ttl: float,
+        timer: Callable[[], float] = time.monotonic,
+        directory: Optional[str] = None,
+        namespace: str = ""
+    ):
+        """
+        Initialize the cache.
+        
+        Args:
+            maxsize: Maximum number of entries
+            ttl: Seconds an entry stays valid after it is stored
+            timer: Clock used for expiry (monotonic by default)
+            directory: Optional diskcache directory for the second tier
+            namespace: Key prefix separating caches sharing a directory
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.namespace = namespace
+        self._timer = timer
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.RLock()
+        
+        self._disk = None
+        if directory:
+            if DISKCACHE_AVAILABLE:
+                self._disk = diskcache.Cache(directory)
+            else:
+                logging.getLogger(__name__).warning(
+                    "diskcache not available. Using in-memory cache only."
+                )
+    
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Get a cached value.
+        
+        Args:
+            key: Cache key
+            default: Value returned when the key is missing or expired
+        
+        Returns:
+            The cached value or default
+        """
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                expires, value = entry
+                if expires > self._timer():
+                    self._data.move_to_end(key)
+                    return value
+                del self._data[key]
+        
+        if self._disk is not None:
+            value = self._disk.get((self.namespace, key), _MISSING)
+            if value is not _MISSING:
+                # Promote to memory; the disk entry keeps its own expiry
+                self._set_memory(key, value)
+                return value
+        return default
+    
+    def set(self, key: Hashable, value: Any) -> None:
+        """
+        Store a value.
+        
+        Args:
+            key: Cache key
+            value: Value to cache
+        """
+        self._set_memory(key, value)
+        if self._disk is not None:
+            self._disk.set((self.namespace, key), value, expire=self.ttl)
+    
+    def _set_memory(self, key: Hashable, value: Any) -> None:
+        """Store a value in the in-memory tier."""
+        with self._lock:
+            self._data[key] = (self._timer() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+    
+    def pop(self, key: Hashable, default: Optional[Any] = None) -> Any:
+        """
+        Remove a key and return its value.
+        
+        Args:
+            key: Cache key
+            default: Value returned when the key is missing or expired
+        
+        Returns:
+            The removed value or default
+        """
+        with self._lock:
+            entry = self._data.pop(key, None)
+        if self._disk is not None:
+            disk_value = self._disk.pop((self.namespace, key), _MISSING)
+            if entry is None and disk_value is not _MISSING:
+                return disk_value
+        if entry is None or entry[0] <= self._timer():
+            return default
+        return entry[1]
+    
+    def clear(self) -> None:
+        """Remove all entries (the on-disk tier is shared and left as is)."""
+        with self._lock:
+            self._data.clear()
+    
+    def expire(self) -> int:
+        """
+        Drop expired entries from the on-disk tier.
+        
+        Returns:
+            Number of entries removed
+        """
+        if self._disk is None:
+            return 0
+        return self._disk.expire()
+    
+    def close(self) -> None:
+        """Close the on-disk tier, if any."""
+        if self._disk is not None:
+            self._disk.close()
+    
+    def __len__(self) -> int:
+        """Number of stored entries (including ones that have expired)."""
+        return len(self._data)
+
+
+_MISSING = object()
@@ -15,48 +15,50 @@ from .examples.agri_agent import (
     PestAssistantAgent,
     SoilAnalyzerAgent,
     MarketAgent,
-    GeneralAssistantAgent
+    GeneralAssistantAgent,
+    get_shared_agent
 )
 
 
+# Inputs that end the interactive loop
+_QUIT_COMMANDS = frozenset({"quit", "exit", "q"})
+
+
 def setup_agents(orchestrator: AgentOrchestrator) -> None:
     """Set up sample agents for testing."""
     # Register sample agents
-    orchestrator.register_agent("crop_advisor", CropAdvisorAgent(), {
-        "description": "Provides crop recommendations",
-        "capabilities": ["crop_advice"],
-        "intents": ["get_crop_advice"]
-    })
-    
-    orchestrator.register_agent("weather", WeatherAgent(), {
-        "description": "Provides weather information",
-        "capabilities": ["weather_forecast"],
-        "intents": ["get_weather"]
-    })
-    
-    orchestrator.register_agent("pest_assistant", PestAssistantAgent(), {
-        "description": "Provides pest control advice",
-        "capabilities": ["pest_control"],
-        "intents": ["pest_control"]
-    })
-    
-    orchestrator.register_agent("soil_analyzer", SoilAnalyzerAgent(), {
-        "description": "Provides soil analysis",
-        "capabilities": ["soil_analysis"],
-        "intents": ["soil_analysis"]
-    })
-    
-    orchestrator.register_agent("market_agent", MarketAgent(), {
-        "description": "Provides market information",
-        "capabilities": ["market_prices"],
-        "intents": ["market_prices"]
-    })
-    
-    orchestrator.register_agent("general_assistant", GeneralAssistantAgent(), {
-        "description": "Provides general agricultural advice",
-        "capabilities": ["general_advice"],
-        "intents": ["general_help"]
-    })
+    orchestrator.register_agents([
+        ("crop_advisor", get_shared_agent(CropAdvisorAgent), {
+            "description": "Provides crop recommendations",
+            "capabilities": ["crop_advice"],
+            "intents": ["get_crop_advice"]
+        }),
+        ("weather", get_shared_agent(WeatherAgent), {
+            "description": "Provides weather information",
+            "capabilities": ["weather_forecast"],
+            "intents": ["get_weather"]
+        }),
+        ("pest_assistant", get_shared_agent(PestAssistantAgent), {
+            "description": "Provides pest control advice",
+            "capabilities": ["pest_control"],
+            "intents": ["pest_control"]
+        }),
+        ("soil_analyzer", get_shared_agent(SoilAnalyzerAgent), {
+            "description": "Provides soil analysis",
+            "capabilities": ["soil_analysis"],
+            "intents": ["soil_analysis"]
+        }),
+        ("market_agent", get_shared_agent(MarketAgent), {
+            "description": "Provides market information",
+            "capabilities": ["market_prices"],
+            "intents": ["market_prices"]
+        }),
+        ("general_assistant", get_shared_agent(GeneralAssistantAgent), {
+            "description": "Provides general agricultural advice",
+            "capabilities": ["general_advice"],
+            "intents": ["general_help"]
+        })
+    ])
 
 
 def list_agents(orchestrator: AgentOrchestrator) -> None:
@@ -67,17 +69,21 @@ def list_agents(orchestrator: AgentOrchestrator) -> None:
         print("No agents registered.")
         return
     
-    print("Registered Agents:")
-    print("=" * 50)
+    lines = ["Registered Agents:", "=" * 50]
     
     for name, info in agents.items():
         metadata = info["metadata"]
-        print(f"Name: {name}")
-        print(f"Description: {metadata.get('description', 'No description')}")
-        print(f"Capabilities: {', '.join(metadata.get('capabilities', []))}")
-        print(f"Intents: {', '.join(metadata.get('intents', []))}")
-        print(f"Active: {metadata.get('is_active', True)}")
-        print("-" * 30)
+        lines.extend([
+            f"Name: {name}",
+            f"Description: {metadata.get('description', 'No description')}",
+            f"Capabilities: {', '.join(metadata.get('capabilities', []))}",
+            f"Intents: {', '.join(metadata.get('intents', []))}",
+            f"Active: {metadata.get('is_active', True)}",
+            "-" * 30
+        ])
+    
+    # Emit the listing with a single write
+    print("\n".join(lines))
 
 
 def test_agent(orchestrator: AgentOrchestrator, agent_name: str, message: str) -> None:
@@ -115,18 +121,20 @@ def show_status(orchestrator: AgentOrchestrator) -> None:
     """Show system status."""
     status = orchestrator.get_system_status()
     
-    print("System Status:")
-    print("=" * 30)
-    print(f"Project ID: {status.get('project_id', 'Not set')}")
-    print(f"Registered Agents: {status['registered_agents']}")
-    print(f"Active Agents: {status['active_agents']}")
-    print(f"Memory Available: {status['memory_available']}")
-    print(f"Logging Available: {status['logging_available']}")
-    
     routing_info = status.get('routing_config', {})
-    print(f"\nRouting Configuration:")
-    print(f"Intent Mappings: {len(routing_info.get('intent_mapping', {}))}")
-    print(f"Tool Chains: {len(routing_info.get('tool_chains', {}))}")
+    print("\n".join([
+        "System Status:",
+        "=" * 30,
+        f"Project ID: {status.get('project_id', 'Not set')}",
+        f"Registered Agents: {status['registered_agents']}",
+        f"Active Agents: {status['active_agents']}",
+        f"Memory Available: {status['memory_available']}",
+        f"Logging Available: {status['logging_available']}",
+        "",
+        "Routing Configuration:",
+        f"Intent Mappings: {len(routing_info.get('intent_mapping', {}))}",
+        f"Tool Chains: {len(routing_info.get('tool_chains', {}))}"
+    ]))
 
 
 def interactive_mode(orchestrator: AgentOrchestrator) -> None:
@@ -140,7 +148,7 @@ def interactive_mode(orchestrator: AgentOrchestrator) -> None:
         try:
             message = input(f"[{user_id}]> ").strip()
             
-            if message.lower() in ['quit', 'exit', 'q']:
+            if message.lower() in _QUIT_COMMANDS:
                 break
             
             if not message:
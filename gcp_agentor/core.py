@@ -5,14 +5,33 @@ Main orchestrator interface for external applications (Flask, FastAPI, etc.).
 """
 
 import os
+import json
+import asyncio
+import hashlib
 import logging
-from typing import Any, Dict, Optional
+import threading
+import weakref
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Any, Dict, Iterable, Optional, Tuple
 from .agent_registry import AgentRegistry
 from .router import AgentRouter
 from .memory import MemoryManager
-from .invoker import AgentInvoker
+from .invoker import AgentInvoker, InvocationError
 from .logger import ReasoningLogger
-from .acp import ACPMessage
+from .batcher import MAX_QUEUE_SIZE
+from .acp import ACPMessage, create_user_message as _create_user_message
+from .cache import TTLCache
+
+
+# Background writers of conversation history; each user's writes go to one of them
+PERSIST_WORKERS = 4
+
+# Returned (as a copy) for messages that are not valid ACP messages
+_INVALID_MSG_RESPONSE = {
+    "success": False,
+    "error": "Invalid ACP message format",
+    "response": "Please provide a valid message format."
+}
 
 
 class AgentOrchestrator:
@@ -27,7 +46,9 @@ class AgentOrchestrator:
         self, 
         project_id: Optional[str] = None,
         collection_name: str = "agentor_memory",
-        log_collection: str = "agentor_logs"
+        log_collection: str = "agentor_logs",
+        cache_dir: Optional[str] = None,
+        response_cache_size: int = 0
     ):
         """
         Initialize the agent orchestrator.
@@ -36,14 +57,21 @@ class AgentOrchestrator:
             project_id: GCP project ID
             collection_name: Firestore collection name for memory
             log_collection: Firestore collection name for logs
+            cache_dir: Optional directory for a persistent (diskcache) tier
+                behind the routing and response caches
+            response_cache_size: Number of agent responses the invoker
+                caches (0, the default, disables response caching)
         """
         self.project_id = project_id or os.getenv("GCP_PROJECT_ID")
+        self.cache_dir = cache_dir or os.getenv("AGENTOR_CACHE_DIR")
         self._logger = logging.getLogger(__name__)
         
         # Initialize core components
         self.registry = AgentRegistry()
         self.memory = MemoryManager(self.project_id, collection_name)
-        self.invoker = AgentInvoker(self.project_id)
+        self.invoker = AgentInvoker(
+            self.project_id, cache_size=response_cache_size, cache_dir=self.cache_dir
+        )
         self.logger = ReasoningLogger(self.project_id, log_collection)
         self.router = AgentRouter(
             registry=self.registry,
@@ -52,6 +80,42 @@ class AgentOrchestrator:
             logger=self.logger
         )
         
+        # Conversation history is written off the request path. Every write
+        # is a read-modify-write of the user's session, so all writes of a
+        # user go to the same single-thread worker, which keeps them in order.
+        self._persist_pools = tuple(
+            ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"agentor-persist-{i}")
+            for i in range(PERSIST_WORKERS)
+        )
+        # Pending writes and their users; once MAX_QUEUE_SIZE writes are
+        # pending, new messages are dropped and counted
+        self._pending_writes: Dict[Future, str] = {}
+        self._pending_lock = threading.Lock()
+        self._dropped_writes = 0
+        
+        # Detected intent per normalized message for handle_simple_message
+        self._route_cache = TTLCache(
+            maxsize=5000, ttl=120, directory=self.cache_dir, namespace="route"
+        )
+        # Per-user context reads; invalidated by this orchestrator's writes
+        self._session_cache = TTLCache(maxsize=5000, ttl=30)
+        # invoke_agent_directly responses keyed by a hash of the inputs
+        self._invoke_cache = TTLCache(
+            maxsize=10000, ttl=3600, directory=self.cache_dir, namespace="invoke"
+        )
+        self._closed = threading.Event()
+        if self.cache_dir:
+            threading.Thread(
+                target=self._expire_disk_caches, name="agentor-cache-expiry", daemon=True
+            ).start()
+        
+        # Per-user locks for handle_message_async; weak values let idle
+        # users' locks be collected once no request holds them
+        self._user_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = (
+            weakref.WeakValueDictionary()
+        )
+        self._locks_mutex = threading.Lock()
+        
         self._logger.info("AgentOrchestrator initialized successfully")
     
     def handle_message(self, acp_message: Dict[str, Any]) -> Dict[str, Any]:
@@ -64,22 +128,19 @@ class AgentOrchestrator:
         Returns:
             Response dictionary with agent response and metadata
         """
+        # Validate the raw dictionary so that invalid input never builds a message
+        if not ACPMessage.validate_dict(acp_message):
+            return _INVALID_MSG_RESPONSE.copy()
+        message = ACPMessage.from_dict(acp_message)
+        
         try:
-            # Validate the message
-            message = ACPMessage.from_dict(acp_message)
-            if not message.is_valid():
-                return {
-                    "success": False,
-                    "error": "Invalid ACP message format",
-                    "response": "Please provide a valid message format."
-                }
-            
             # Route the message
-            response = self.router.route(acp_message)
+            response = self.router.route(message)
             
-            # Store conversation in memory
-            user_id = self._extract_user_id(message.from_id)
-            self.memory.add_conversation_message(user_id, {
+            # Store conversation in memory (in the background)
+            from_id = message.from_id
+            user_id = from_id[5:] if from_id[:5] == "user:" else from_id
+            self._persist_conversation(user_id, {
                 "message": message.to_dict(),
                 "response": response
             })
@@ -94,6 +155,41 @@ class AgentOrchestrator:
                 "response": "Sorry, I encountered an error processing your request."
             }
     
+    async def handle_message_async(self, acp_message: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Handle an ACP message without blocking the event loop.
+        
+        Agent invocation and the Firestore reads/writes are blocking calls,
+        so the message is handled in the event loop's default executor. Async
+        servers (FastAPI, aiohttp) can keep many requests in flight on one loop.
+        Messages from the same user are handled one at a time; different users
+        run in parallel.
+        
+        Args:
+            acp_message: ACP message dictionary
+            
+        Returns:
+            Response dictionary with agent response and metadata
+        """
+        loop = asyncio.get_running_loop()
+        from_id = acp_message.get("from_id") if isinstance(acp_message, dict) else None
+        if not isinstance(from_id, str):
+            # Invalid message; handle_message rejects it without touching state
+            return await loop.run_in_executor(None, self.handle_message, acp_message)
+        
+        user_id = from_id[5:] if from_id[:5] == "user:" else from_id
+        async with self._get_user_lock(user_id):
+            return await loop.run_in_executor(None, self.handle_message, acp_message)
+    
+    def _get_user_lock(self, user_id: str) -> asyncio.Lock:
+        """Get (or create) the asyncio lock serializing a user's messages."""
+        with self._locks_mutex:
+            lock = self._user_locks.get(user_id)
+            if lock is None:
+                lock = asyncio.Lock()
+                self._user_locks[user_id] = lock
+            return lock
+    
     def register_agent(
         self, 
         name: str, 
@@ -111,6 +207,18 @@ class AgentOrchestrator:
         self.registry.register(name, agent, metadata)
         self._logger.info(f"Registered agent: {name}")
     
+    def register_agents(
+        self, 
+        agents: Iterable[Tuple[str, Any, Optional[Dict[str, Any]]]]
+    ) -> None:
+        """
+        Register several agents with the orchestrator at once.
+        
+        Args:
+            agents: Iterable of (name, agent, metadata) tuples
+        """
+        self.registry.register_many(agents)
+    
     def unregister_agent(self, name: str) -> bool:
         """
         Unregister an agent.
@@ -134,23 +242,20 @@ class AgentOrchestrator:
             name: Agent name
             
         Returns:
-            Agent information dictionary or None if not found
+            Agent information dictionary (shared; do not mutate) or None if not found
         """
-        return self.registry.get_agent_info(name)
+        # Served from the registry snapshot, which is only rebuilt after
+        # an agent is registered, unregistered or updated
+        return self.registry.snapshot.get(name)
     
     def list_agents(self) -> Dict[str, Any]:
         """
         Get list of all registered agents.
         
         Returns:
-            Dictionary with agent information
+            Dictionary with agent information (shared; do not mutate)
         """
-        agents = {}
-        for name in self.registry.list_all():
-            info = self.registry.get_agent_info(name)
-            if info:
-                agents[name] = info
-        return agents
+        return self.registry.snapshot
     
     def get_user_context(self, user_id: str) -> Dict[str, Any]:
         """
@@ -160,10 +265,16 @@ class AgentOrchestrator:
             user_id: User identifier
             
         Returns:
-            User context dictionary
-        """
-        session = self.memory.get_session(user_id)
-        return session.get("context", {})
+            User context dictionary (a copy; changing it doesn't update the context)
+        """
+        context = self._session_cache.get(user_id)
+        if context is None:
+            self.flush(user_id=user_id)
+            session = self.memory.get_session(user_id)
+            context = session.get("context", {})
+            self._session_cache.set(user_id, context)
+        # The cached dict is shared by later calls, so hand out a copy
+        return dict(context)
     
     def set_user_context(self, user_id: str, key: str, value: Any) -> None:
         """
@@ -174,7 +285,9 @@ class AgentOrchestrator:
             key: Context key
             value: Context value
         """
+        self.flush(user_id=user_id)
         self.memory.set_context(user_id, key, value)
+        self._session_cache.pop(user_id, None)
     
     def get_conversation_history(self, user_id: str, limit: int = 10) -> list:
         """
@@ -187,6 +300,7 @@ class AgentOrchestrator:
         Returns:
             List of conversation messages
         """
+        self.flush(user_id=user_id)
         return self.memory.get_conversation_history(user_id, limit)
     
     def clear_user_context(self, user_id: str) -> None:
@@ -196,7 +310,9 @@ class AgentOrchestrator:
         Args:
             user_id: User identifier
         """
+        self.flush(user_id=user_id)
         self.memory.clear_context(user_id)
+        self._session_cache.pop(user_id, None)
     
     def clear_conversation_history(self, user_id: str) -> None:
         """
@@ -205,6 +321,7 @@ class AgentOrchestrator:
         Args:
             user_id: User identifier
         """
+        self.flush(user_id=user_id)
         self.memory.clear_conversation_history(user_id)
     
     def get_user_logs(self, user_id: str, limit: int = 100) -> list:
@@ -229,15 +346,19 @@ class AgentOrchestrator:
         """
         return self.router.get_routing_info()
     
-    def add_intent_mapping(self, intent: str, agents: list) -> None:
+    def add_intent_mapping(self, intent: str, agents: list, keywords: Optional[list] = None) -> None:
         """
         Add or update intent to agent mapping.
         
         Args:
             intent: Intent name
             agents: List of agent names for this intent
+            keywords: Words detecting the intent in messages (optional)
+        
+        Raises:
+            ValueError: If a keyword is empty or only whitespace
         """
-        self.router.add_intent_mapping(intent, agents)
+        self.router.add_intent_mapping(intent, agents, keywords)
     
     def add_tool_chain(self, name: str, steps: list) -> None:
         """
@@ -253,24 +374,66 @@ class AgentOrchestrator:
         self, 
         agent_name: str, 
         message: str, 
-        context: Optional[Dict[str, Any]] = None
+        context: Optional[Dict[str, Any]] = None,
+        no_cache: bool = False
     ) -> str:
         """
         Invoke an agent directly without routing.
         
+        Identical calls (same agent, message and context) within an hour are
+        answered from a response cache unless no_cache is set. Registering
+        or unregistering agents starts a new cache generation.
+        
         Args:
             agent_name: Agent name
             message: Input message
             context: Optional context
+            no_cache: Always invoke the agent and don't cache its response
             
         Returns:
             Agent response
         """
+        cache_key = None if no_cache else self._invoke_cache_key(
+            agent_name, message, context, self.registry.version
+        )
+        if cache_key is not None:
+            cached = self._invoke_cache.get(cache_key)
+            if cached is not None:
+                self._logger.debug("Response cache hit for agent %s", agent_name)
+                return cached
+        
         try:
-            return self.invoker.invoke(agent_name, message, context or {})
+            # Registered agents are plain in-process calls; only unknown
+            # names (e.g. remote Vertex AI agents) go through the invoker
+            if agent_name in self.registry:
+                response = self.registry.call(agent_name, message, context)
+            else:
+                response = self.invoker.invoke(agent_name, message, context or {})
         except Exception as e:
             self._logger.error(f"Error invoking agent {agent_name}: {e}")
-            return f"Error: {str(e)}"
+            return InvocationError(f"Error: {str(e)}")
+        
+        # Only plain text answers are cached; errors (InvocationError) and
+        # structured (e.g. tool call) responses are stateful
+        if cache_key is not None and type(response) is str:
+            self._invoke_cache.set(cache_key, response)
+        return response
+    
+    @staticmethod
+    def _invoke_cache_key(
+        agent_name: str, 
+        message: str, 
+        context: Optional[Dict[str, Any]],
+        registry_version: int
+    ) -> Optional[str]:
+        """Hash the inputs of a direct invocation (None if not JSON-serializable)."""
+        try:
+            payload = json.dumps(
+                [agent_name, message, context or {}, registry_version], sort_keys=True
+            )
+        except (TypeError, ValueError):
+            return None
+        return hashlib.sha256(payload.encode()).hexdigest()
     
     def get_system_status(self) -> Dict[str, Any]:
         """
@@ -288,11 +451,95 @@ class AgentOrchestrator:
             "routing_config": self.get_routing_info()
         }
     
+    def warm_up(self) -> None:
+        """
+        Connect to Firestore and Vertex AI now.
+        
+        Clients are otherwise created on first use; services that prefer to
+        pay the connection cost at startup can call this once after creation.
+        """
+        self.memory.warm_up()
+        self.logger.warm_up()
+        self.invoker.warm_up()
+    
+    @property
+    def dropped_messages(self) -> int:
+        """Number of conversation messages not stored because too many writes were pending."""
+        return self._dropped_writes
+    
+    def flush(self, timeout: Optional[float] = None, user_id: Optional[str] = None) -> None:
+        """
+        Wait for pending conversation history writes to finish.
+        
+        Args:
+            timeout: Maximum number of seconds to wait (None waits forever)
+            user_id: Only wait for this user's writes (all users if None)
+        """
+        with self._pending_lock:
+            pending = [
+                future for future, owner in self._pending_writes.items()
+                if user_id is None or owner == user_id
+            ]
+        if pending:
+            wait(pending, timeout=timeout)
+    
+    def close(self) -> None:
+        """Finish pending conversation history writes and release resources."""
+        for pool in self._persist_pools:
+            pool.shutdown(wait=True)
+        self._closed.set()
+        self._route_cache.close()
+        self._invoke_cache.close()
+        self.router.close()
+        self.invoker.close()
+        self.logger.close()
+    
+    def _expire_disk_caches(self, interval: float = 24 * 60 * 60) -> None:
+        """Drop expired entries from the persistent cache tier once a day."""
+        while not self._closed.wait(interval):
+            try:
+                removed = self._route_cache.expire() + self._invoke_cache.expire()
+                self._logger.info(f"Expired {removed} persistent cache entries")
+            except Exception as e:
+                self._logger.warning(f"Failed to expire persistent cache entries: {e}")
+    
+    def _persist_conversation(self, user_id: str, entry: Dict[str, Any]) -> None:
+        """Queue a conversation history write on the user's background writer."""
+        pool = self._persist_pools[hash(user_id) % len(self._persist_pools)]
+        with self._pending_lock:
+            if len(self._pending_writes) >= MAX_QUEUE_SIZE:
+                self._dropped_writes += 1
+                dropped = self._dropped_writes
+                future = None
+            else:
+                try:
+                    future = pool.submit(self.memory.add_conversation_message, user_id, entry)
+                except RuntimeError as e:
+                    # The writers have been shut down via close()
+                    self._logger.error(f"Dropped conversation message for user {user_id}: {e}")
+                    return
+                self._pending_writes[future] = user_id
+        
+        if future is None:
+            if dropped == 1 or dropped % 1000 == 0:
+                self._logger.warning(
+                    f"Conversation write queue full; {dropped} messages dropped so far"
+                )
+            return
+        future.add_done_callback(self._on_conversation_persisted)
+    
+    def _on_conversation_persisted(self, future: Future) -> None:
+        """Forget a finished write and report it if it failed."""
+        with self._pending_lock:
+            self._pending_writes.pop(future, None)
+        error = future.exception()
+        if error is not None:
+            self._logger.error(f"Failed to persist conversation message: {error}")
+    
     def _extract_user_id(self, from_id: str) -> str:
         """Extract user ID from from_id field."""
-        if from_id.startswith("user:"):
-            return from_id[5:]  # Remove "user:" prefix
-        return from_id
+        # Slice compare instead of startswith(): no method call
+        return from_id[5:] if from_id[:5] == "user:" else from_id
     
     def create_user_message(
         self, 
@@ -315,9 +562,7 @@ class AgentOrchestrator:
         Returns:
             ACP message dictionary
         """
-        from .acp import create_user_message
-        acp_message = create_user_message(user_id, intent, message, language, context)
-        return acp_message.to_dict()
+        return _create_user_message(user_id, intent, message, language, context).to_dict()
     
     def handle_simple_message(
         self, 
@@ -336,14 +581,26 @@ class AgentOrchestrator:
         Returns:
             Response dictionary
         """
+        # Intent detection only looks at the text (and the router's keywords),
+        # so repeat queries can reuse an earlier result. Messages with
+        # context are not cached.
+        cache_key = (
+            f"{self.router.keywords_fingerprint}:{' '.join(message.lower().split())}"
+            if not context else None
+        )
+        intent = self._route_cache.get(cache_key, "") if cache_key else ""
+        
         # Create ACP message with auto-intent detection
         acp_message = {
             "from_id": f"user:{user_id}",
             "to_id": "agent:router",
-            "intent": "",  # Will be auto-detected
+            "intent": intent,  # Auto-detected unless cached
             "message": message,
             "language": "en-US",
             "context": context or {}
         }
         
-        return self.handle_message(acp_message) 
\ No newline at end of file
+        response = self.handle_message(acp_message)
+        if cache_key and not intent and response.get("success") and response.get("intent"):
+            self._route_cache.set(cache_key, response["intent"])
+        return response 
\ No newline at end of file
@@ -4,10 +4,188 @@ AgriAgent Example
 Sample agents for agricultural advisory system.
 """
 
-from typing import Dict, Any, List, Optional
+import re
+import bisect
+import functools
+from types import MappingProxyType
+from typing import Dict, Any, Callable, List, Mapping, Optional, Sequence, Type
 from ..invoker import BaseAgent
 
 
+def _freeze(value: Any) -> Any:
+    """Recursively turn dicts into read-only mappings and lists into tuples."""
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+# Responses remembered per agent instance
+RESPONSE_CACHE_SIZE = 128
+
+
+def _keyword_pattern(groups: Dict[str, Sequence[str]]) -> "re.Pattern":
+    """
+    Compile keyword groups into one case-insensitive substring pattern.
+    
+    Keywords match anywhere, also inside longer words ("colder",
+    "rainfall"), as ``keyword in message.lower()`` does. Each match is a
+    lookahead, so overlapping keywords of different groups are all found.
+    
+    Args:
+        groups: Group name -> keywords of that group
+        
+    Returns:
+        Pattern with one named group per keyword group
+    """
+    alternatives = "|".join(
+        f"(?P<{name}>{'|'.join(map(re.escape, words))})" for name, words in groups.items()
+    )
+    return re.compile(rf"(?=(?:{alternatives}))", re.IGNORECASE)
+
+
+def _detect(pattern: "re.Pattern", message: str, priority: Sequence[str]) -> Optional[str]:
+    """
+    Find the highest-priority keyword group mentioned in a message.
+    
+    The message is scanned once; when several groups match, the one listed
+    first in ``priority`` wins, wherever it appears in the message.
+    
+    Args:
+        pattern: Pattern built by _keyword_pattern
+        message: Message to scan
+        priority: Group names, most important first
+        
+    Returns:
+        The winning group name, or None if no keyword matched
+    """
+    found = {match.lastgroup for match in pattern.finditer(message)}
+    if not found:
+        return None
+    return next(name for name in priority if name in found)
+
+
+def _detect_many(
+    pattern: "re.Pattern",
+    messages: Sequence[str],
+    priority: Sequence[str]
+) -> List[Optional[str]]:
+    """
+    Run _detect over many messages with a single scan.
+    
+    The messages are joined with newlines (never part of a keyword) and
+    scanned once; each match is mapped back to its message by offset.
+    
+    Args:
+        pattern: Pattern built by _keyword_pattern
+        messages: Messages to scan
+        priority: Group names, most important first
+    
+    Returns:
+        The winning group name (or None) for each message, in order
+    """
+    starts = []
+    offset = 0
+    for message in messages:
+        starts.append(offset)
+        offset += len(message) + 1
+    
+    found = [set() for _ in messages]
+    for match in pattern.finditer("\n".join(messages)):
+        found[bisect.bisect_right(starts, match.start()) - 1].add(match.lastgroup)
+    return [
+        next(name for name in priority if name in groups) if groups else None
+        for groups in found
+    ]
+
+
+_SEASON_GROUPS = {
+    "monsoon": ("monsoon", "rain", "wet"),
+    "winter": ("winter", "cold", "cool"),
+    "summer": ("summer", "hot", "dry", "drier"),
+}
+_SEASON_RE = _keyword_pattern(_SEASON_GROUPS)
+
+_LOCATION_GROUPS = {"Mumbai": ("mumbai",), "Jalgaon": ("jalgaon",)}
+_LOCATION_RE = _keyword_pattern(_LOCATION_GROUPS)
+
+_PEST_CROP_GROUPS = {"wheat": ("wheat",), "cotton": ("cotton",), "rice": ("rice",)}
+_PEST_CROP_RE = _keyword_pattern(_PEST_CROP_GROUPS)
+
+_TOPIC_GROUPS = {
+    "farming_basics": ("basic", "beginner", "start"),
+    "sustainable_farming": ("sustainable", "organic", "environment"),
+    "technology": ("technology", "digital", "smart"),
+}
+_TOPIC_RE = _keyword_pattern(_TOPIC_GROUPS)
+
+
+def _memoize_invoke(*fields: str) -> Callable[[Callable[..., str]], Callable[..., str]]:
+    """
+    Cache an agent's responses per instance, keyed by message and the
+    context fields the agent reads.
+    
+    The sample agents are pure functions of the message and those fields;
+    everything else in the context (such as the router's ``timestamp`` and
+    ``user_id``) is left out of the key so routed calls still hit the cache.
+    Calls whose read fields hold unhashable values bypass the cache.
+    
+    Args:
+        fields: Context keys the agent reads
+        
+    Returns:
+        Decorator turning an invoke method into a caching one
+    """
+    def decorate(invoke: Callable[..., str]) -> Callable[..., str]:
+        @functools.wraps(invoke)
+        def cached_invoke(self, message: str, context: Optional[Dict[str, Any]] = None) -> str:
+            context = context or {}
+            context_key = tuple((field, context[field]) for field in fields if field in context)
+            try:
+                hash(context_key)
+            except TypeError:
+                return invoke(self, message, context)
+            
+            compute = getattr(self, "_cached_invoke", None)
+            if compute is None:
+                compute = functools.lru_cache(maxsize=RESPONSE_CACHE_SIZE)(
+                    lambda message, context_key: invoke(self, message, dict(context_key))
+                )
+                self._cached_invoke = compute
+            return compute(message, context_key)
+        
+        return cached_invoke
+    
+    return decorate
+
+
+# Sample agents are stateless, so one instance per class is shared by every
+# caller that sets up the demo system in this process.
+_AGENT_INSTANCES: Dict[type, BaseAgent] = {}
+
+
+def get_shared_agent(agent_class: Type[BaseAgent]) -> BaseAgent:
+    """
+    Get the shared instance of a sample agent class, creating it on first use.
+    
+    Args:
+        agent_class: Agent class to instantiate
+        
+    Returns:
+        The cached agent instance
+    """
+    agent = _AGENT_INSTANCES.get(agent_class)
+    if agent is None:
+        agent = _AGENT_INSTANCES[agent_class] = agent_class()
+    return agent
+
+
+def clear_agent_cache() -> None:
+    """Drop all shared sample agent instances."""
+    _AGENT_INSTANCES.clear()
+
+
 class CropAdvisorAgent(BaseAgent):
     """
     Crop Advisor Agent
@@ -15,27 +193,45 @@ class CropAdvisorAgent(BaseAgent):
     Provides crop recommendations based on weather, soil, and season.
     """
     
+    __slots__ = ("name", "_season_body", "_crop_index", "_cached_invoke")
+    
+    CROP_DATABASE = _freeze({
+        "monsoon": {
+            "rice": {"description": "Best for monsoon season", "duration": "120 days"},
+            "maize": {"description": "Good monsoon crop", "duration": "90 days"},
+            "cotton": {"description": "Suitable for monsoon", "duration": "150 days"}
+        },
+        "winter": {
+            "wheat": {"description": "Primary winter crop", "duration": "120 days"},
+            "mustard": {"description": "Oil seed crop", "duration": "90 days"},
+            "potato": {"description": "Winter vegetable", "duration": "100 days"}
+        },
+        "summer": {
+            "millet": {"description": "Drought resistant", "duration": "80 days"},
+            "pulses": {"description": "Legume crops", "duration": "90 days"},
+            "vegetables": {"description": "Short duration crops", "duration": "60 days"}
+        }
+    })
+    crop_database = CROP_DATABASE
+    
     def __init__(self):
         """Initialize the crop advisor agent."""
         self.name = "CropAdvisor"
-        self.crop_database = {
-            "monsoon": {
-                "rice": {"description": "Best for monsoon season", "duration": "120 days"},
-                "maize": {"description": "Good monsoon crop", "duration": "90 days"},
-                "cotton": {"description": "Suitable for monsoon", "duration": "150 days"}
-            },
-            "winter": {
-                "wheat": {"description": "Primary winter crop", "duration": "120 days"},
-                "mustard": {"description": "Oil seed crop", "duration": "90 days"},
-                "potato": {"description": "Winter vegetable", "duration": "100 days"}
-            },
-            "summer": {
-                "millet": {"description": "Drought resistant", "duration": "80 days"},
-                "pulses": {"description": "Legume crops", "duration": "90 days"},
-                "vegetables": {"description": "Short duration crops", "duration": "60 days"}
-            }
+        # The title and crop list of each season never change; format them once
+        self._season_body = {
+            season: (season.title(), "\n".join(
+                f"• {crop.title()}: {info['description']} ({info['duration']})"
+                for crop, info in crops.items()
+            ))
+            for season, crops in self.CROP_DATABASE.items()
         }
+        # Crop name -> (season, info); the first season listing a crop wins
+        self._crop_index: Dict[str, Any] = {}
+        for season, crops in self.CROP_DATABASE.items():
+            for crop, info in crops.items():
+                self._crop_index.setdefault(crop, (season, info))
     
+    @_memoize_invoke("season", "location", "soil_pH")
     def invoke(self, message: str, context: Optional[Dict[str, Any]] = None) -> str:
         """
         Provide crop advice based on the message and context.
@@ -47,35 +243,40 @@ class CropAdvisorAgent(BaseAgent):
         Returns:
             Crop advice response
         """
+        # Simple keyword-based season detection
+        return self._respond(_detect(_SEASON_RE, message, _SEASON_GROUPS), context)
+    
+    def invoke_many(self, messages: Sequence[str], context: Optional[Dict[str, Any]] = None) -> List[str]:
+        """
+        Provide crop advice for several messages sharing one context.
+        
+        Args:
+            messages: User messages
+            context: Context information
+        
+        Returns:
+            Crop advice responses, in the order of the messages
+        """
+        seasons = _detect_many(_SEASON_RE, messages, _SEASON_GROUPS)
+        return [self._respond(season, context) for season in seasons]
+    
+    def _respond(self, detected: Optional[str], context: Optional[Dict[str, Any]]) -> str:
+        """Build the crop advice for the season detected in a message (if any)."""
         context = context or {}
         
         # Extract season from context or message
-        season = context.get("season", "monsoon")
+        season = detected or context.get("season", "monsoon")
         location = context.get("location", "unknown")
         soil_ph = context.get("soil_pH", 6.5)
         
-        # Simple keyword-based season detection
-        message_lower = message.lower()
-        if any(word in message_lower for word in ["monsoon", "rain", "wet"]):
-            season = "monsoon"
-        elif any(word in message_lower for word in ["winter", "cold", "cool"]):
-            season = "winter"
-        elif any(word in message_lower for word in ["summer", "hot", "dry"]):
-            season = "summer"
-        
         # Get crop recommendations
-        if season in self.crop_database:
-            crops = self.crop_database[season]
-            recommendations = []
-            
-            for crop, info in crops.items():
-                recommendations.append(f"• {crop.title()}: {info['description']} ({info['duration']})")
-            
-            response = f"🌾 Crop Recommendations for {season.title()} Season in {location}:\n\n"
-            response += "\n".join(recommendations)
-            response += f"\n\n💡 Soil pH: {soil_ph} (Optimal range: 6.0-7.5)"
-            
-            return response
+        prepared = self._season_body.get(season)
+        if prepared is not None:
+            title, body = prepared
+            return (
+                f"🌾 Crop Recommendations for {title} Season in {location}:\n\n"
+                f"{body}\n\n💡 Soil pH: {soil_ph} (Optimal range: 6.0-7.5)"
+            )
         else:
             return f"Sorry, I don't have crop recommendations for {season} season."
     
@@ -89,13 +290,10 @@ class CropAdvisorAgent(BaseAgent):
         Returns:
             Crop information dictionary
         """
-        for season, crops in self.crop_database.items():
-            if crop_name.lower() in crops:
-                return {
-                    "crop": crop_name,
-                    "season": season,
-                    **crops[crop_name.lower()]
-                }
+        hit = self._crop_index.get(crop_name.lower())
+        if hit is not None:
+            season, info = hit
+            return {"crop": crop_name, "season": season, **info}
         return {"error": f"Crop {crop_name} not found in database"}
 
 
@@ -106,28 +304,38 @@ class WeatherAgent(BaseAgent):
     Provides weather information and forecasts.
     """
     
+    __slots__ = ("name", "_reports", "_cached_invoke")
+    
+    WEATHER_DATA = _freeze({
+        "Jalgaon": {
+            "current": {"temperature": 28, "humidity": 65, "condition": "Partly Cloudy"},
+            "forecast": [
+                {"day": "Today", "high": 30, "low": 22, "condition": "Partly Cloudy"},
+                {"day": "Tomorrow", "high": 32, "low": 24, "condition": "Sunny"},
+                {"day": "Day 3", "high": 29, "low": 21, "condition": "Light Rain"}
+            ]
+        },
+        "Mumbai": {
+            "current": {"temperature": 32, "humidity": 80, "condition": "Humid"},
+            "forecast": [
+                {"day": "Today", "high": 34, "low": 26, "condition": "Humid"},
+                {"day": "Tomorrow", "high": 33, "low": 25, "condition": "Partly Cloudy"},
+                {"day": "Day 3", "high": 31, "low": 24, "condition": "Rain"}
+            ]
+        }
+    })
+    weather_data = WEATHER_DATA
+    
     def __init__(self):
         """Initialize the weather agent."""
         self.name = "WeatherBot"
-        self.weather_data = {
-            "Jalgaon": {
-                "current": {"temperature": 28, "humidity": 65, "condition": "Partly Cloudy"},
-                "forecast": [
-                    {"day": "Today", "high": 30, "low": 22, "condition": "Partly Cloudy"},
-                    {"day": "Tomorrow", "high": 32, "low": 24, "condition": "Sunny"},
-                    {"day": "Day 3", "high": 29, "low": 21, "condition": "Light Rain"}
-                ]
-            },
-            "Mumbai": {
-                "current": {"temperature": 32, "humidity": 80, "condition": "Humid"},
-                "forecast": [
-                    {"day": "Today", "high": 34, "low": 26, "condition": "Humid"},
-                    {"day": "Tomorrow", "high": 33, "low": 25, "condition": "Partly Cloudy"},
-                    {"day": "Day 3", "high": 31, "low": 24, "condition": "Rain"}
-                ]
-            }
+        # Reports only depend on the location; format them once
+        self._reports = {
+            location: self._format_report(location, weather)
+            for location, weather in self.WEATHER_DATA.items()
         }
     
+    @_memoize_invoke("location")
     def invoke(self, message: str, context: Optional[Dict[str, Any]] = None) -> str:
         """
         Provide weather information based on the message and context.
@@ -139,33 +347,49 @@ class WeatherAgent(BaseAgent):
         Returns:
             Weather information response
         """
+        # Simple location detection from message
+        return self._respond(_detect(_LOCATION_RE, message, _LOCATION_GROUPS), context)
+    
+    def invoke_many(self, messages: Sequence[str], context: Optional[Dict[str, Any]] = None) -> List[str]:
+        """
+        Provide weather information for several messages sharing one context.
+        
+        Args:
+            messages: User messages
+            context: Context information
+        
+        Returns:
+            Weather information responses, in the order of the messages
+        """
+        locations = _detect_many(_LOCATION_RE, messages, _LOCATION_GROUPS)
+        return [self._respond(location, context) for location in locations]
+    
+    def _respond(self, detected: Optional[str], context: Optional[Dict[str, Any]]) -> str:
+        """Build the weather report for the location detected in a message (if any)."""
         context = context or {}
         
         # Extract location from context or message
-        location = context.get("location", "Jalgaon")
+        location = detected or context.get("location", "Jalgaon")
         
-        # Simple location detection from message
-        message_lower = message.lower()
-        if "mumbai" in message_lower:
-            location = "Mumbai"
-        elif "jalgaon" in message_lower:
-            location = "Jalgaon"
-        
-        if location in self.weather_data:
-            weather = self.weather_data[location]
-            current = weather["current"]
-            forecast = weather["forecast"]
-            
-            response = f"🌤️ Weather for {location}:\n\n"
-            response += f"Current: {current['temperature']}°C, {current['humidity']}% humidity, {current['condition']}\n\n"
-            response += "3-Day Forecast:\n"
-            
-            for day in forecast:
-                response += f"• {day['day']}: {day['high']}°C / {day['low']}°C, {day['condition']}\n"
-            
-            return response
+        report = self._reports.get(location)
+        if report is not None:
+            return report
         else:
-            return f"Sorry, I don't have weather data for {location}. Available locations: {', '.join(self.weather_data.keys())}"
+            return f"Sorry, I don't have weather data for {location}. Available locations: {', '.join(self.WEATHER_DATA.keys())}"
+    
+    @staticmethod
+    def _format_report(location: str, weather: Mapping[str, Any]) -> str:
+        """Format the current conditions and forecast for a location."""
+        current = weather["current"]
+        forecast = "".join(
+            f"• {day['day']}: {day['high']}°C / {day['low']}°C, {day['condition']}\n"
+            for day in weather["forecast"]
+        )
+        return (
+            f"🌤️ Weather for {location}:\n\n"
+            f"Current: {current['temperature']}°C, {current['humidity']}% humidity, {current['condition']}\n\n"
+            f"3-Day Forecast:\n{forecast}"
+        )
     
     def get_weather_alert(self, location: str) -> str:
         """
@@ -192,54 +416,64 @@ class PestAssistantAgent(BaseAgent):
     Provides pest control advice and treatment recommendations.
     """
     
+    __slots__ = ("name", "_advice", "_cached_invoke")
+    
+    PEST_DATABASE = _freeze({
+        "rice": {
+            "pests": [
+                {
+                    "name": "Rice Stem Borer",
+                    "symptoms": "Dead hearts, white ears",
+                    "treatment": "Use neem-based pesticides, maintain field hygiene"
+                },
+                {
+                    "name": "Rice Leaf Folder",
+                    "symptoms": "Rolled leaves, reduced photosynthesis",
+                    "treatment": "Apply carbaryl or quinalphos, remove alternate hosts"
+                }
+            ]
+        },
+        "wheat": {
+            "pests": [
+                {
+                    "name": "Aphids",
+                    "symptoms": "Yellowing leaves, stunted growth",
+                    "treatment": "Use imidacloprid, encourage natural predators"
+                },
+                {
+                    "name": "Army Worm",
+                    "symptoms": "Defoliation, skeletonized leaves",
+                    "treatment": "Apply chlorpyriphos, monitor regularly"
+                }
+            ]
+        },
+        "cotton": {
+            "pests": [
+                {
+                    "name": "Bollworm",
+                    "symptoms": "Damaged bolls, reduced yield",
+                    "treatment": "Use Bt cotton, apply recommended insecticides"
+                },
+                {
+                    "name": "Whitefly",
+                    "symptoms": "Yellowing, sooty mold",
+                    "treatment": "Use systemic insecticides, remove weeds"
+                }
+            ]
+        }
+    })
+    pest_database = PEST_DATABASE
+    
     def __init__(self):
         """Initialize the pest assistant agent."""
         self.name = "PestAssistant"
-        self.pest_database = {
-            "rice": {
-                "pests": [
-                    {
-                        "name": "Rice Stem Borer",
-                        "symptoms": "Dead hearts, white ears",
-                        "treatment": "Use neem-based pesticides, maintain field hygiene"
-                    },
-                    {
-                        "name": "Rice Leaf Folder",
-                        "symptoms": "Rolled leaves, reduced photosynthesis",
-                        "treatment": "Apply carbaryl or quinalphos, remove alternate hosts"
-                    }
-                ]
-            },
-            "wheat": {
-                "pests": [
-                    {
-                        "name": "Aphids",
-                        "symptoms": "Yellowing leaves, stunted growth",
-                        "treatment": "Use imidacloprid, encourage natural predators"
-                    },
-                    {
-                        "name": "Army Worm",
-                        "symptoms": "Defoliation, skeletonized leaves",
-                        "treatment": "Apply chlorpyriphos, monitor regularly"
-                    }
-                ]
-            },
-            "cotton": {
-                "pests": [
-                    {
-                        "name": "Bollworm",
-                        "symptoms": "Damaged bolls, reduced yield",
-                        "treatment": "Use Bt cotton, apply recommended insecticides"
-                    },
-                    {
-                        "name": "Whitefly",
-                        "symptoms": "Yellowing, sooty mold",
-                        "treatment": "Use systemic insecticides, remove weeds"
-                    }
-                ]
-            }
+        # Advice only depends on the crop; format it once
+        self._advice = {
+            crop: self._format_advice(crop, pests["pests"])
+            for crop, pests in self.PEST_DATABASE.items()
         }
     
+    @_memoize_invoke("crop")
     def invoke(self, message: str, context: Dict[str, Any] = None) -> str:
         """
         Provide pest control advice based on the message and context.
@@ -251,39 +485,53 @@ class PestAssistantAgent(BaseAgent):
         Returns:
             Pest control advice response
         """
+        # Simple crop detection from message
+        return self._respond(_detect(_PEST_CROP_RE, message, _PEST_CROP_GROUPS), context)
+    
+    def invoke_many(self, messages: Sequence[str], context: Optional[Dict[str, Any]] = None) -> List[str]:
+        """
+        Provide pest control advice for several messages sharing one context.
+        
+        Args:
+            messages: User messages
+            context: Context information
+        
+        Returns:
+            Pest control advice responses, in the order of the messages
+        """
+        crops = _detect_many(_PEST_CROP_RE, messages, _PEST_CROP_GROUPS)
+        return [self._respond(crop, context) for crop in crops]
+    
+    def _respond(self, detected: Optional[str], context: Optional[Dict[str, Any]]) -> str:
+        """Build the pest advice for the crop detected in a message (if any)."""
         context = context or {}
         
         # Extract crop from context or message
-        crop = context.get("crop", "rice")
+        crop = detected or context.get("crop", "rice")
         
-        # Simple crop detection from message
-        message_lower = message.lower()
-        if "wheat" in message_lower:
-            crop = "wheat"
-        elif "cotton" in message_lower:
-            crop = "cotton"
-        elif "rice" in message_lower:
-            crop = "rice"
-        
-        if crop in self.pest_database:
-            pests = self.pest_database[crop]
-            
-            response = f"🐛 Pest Management for {crop.title()}:\n\n"
-            
-            for pest in pests["pests"]:
-                response += f"**{pest['name']}**\n"
-                response += f"Symptoms: {pest['symptoms']}\n"
-                response += f"Treatment: {pest['treatment']}\n\n"
-            
-            response += "💡 General Tips:\n"
-            response += "• Monitor crops regularly\n"
-            response += "• Use integrated pest management\n"
-            response += "• Maintain field hygiene\n"
-            response += "• Consider biological control methods"
-            
-            return response
+        advice = self._advice.get(crop)
+        if advice is not None:
+            return advice
         else:
-            return f"Sorry, I don't have pest information for {crop}. Available crops: {', '.join(self.pest_database.keys())}"
+            return f"Sorry, I don't have pest information for {crop}. Available crops: {', '.join(self.PEST_DATABASE.keys())}"
+    
+    @staticmethod
+    def _format_advice(crop: str, pests: Sequence[Mapping[str, str]]) -> str:
+        """Format the pest management advice for a crop."""
+        body = "".join(
+            f"**{pest['name']}**\n"
+            f"Symptoms: {pest['symptoms']}\n"
+            f"Treatment: {pest['treatment']}\n\n"
+            for pest in pests
+        )
+        return (
+            f"🐛 Pest Management for {crop.title()}:\n\n{body}"
+            "💡 General Tips:\n"
+            "• Monitor crops regularly\n"
+            "• Use integrated pest management\n"
+            "• Maintain field hygiene\n"
+            "• Consider biological control methods"
+        )
     
     def get_pest_alert(self, crop: str, severity: str = "medium") -> str:
         """
@@ -311,36 +559,46 @@ class SoilAnalyzerAgent(BaseAgent):
     Provides soil analysis and fertilizer recommendations.
     """
     
+    __slots__ = ("name", "_report_tail", "_cached_invoke")
+    
+    SOIL_RECOMMENDATIONS = _freeze({
+        "acidic": {
+            "ph_range": "5.0-6.0",
+            "recommendations": [
+                "Add lime to raise pH",
+                "Use calcium-rich fertilizers",
+                "Consider dolomite application"
+            ]
+        },
+        "neutral": {
+            "ph_range": "6.0-7.5",
+            "recommendations": [
+                "Optimal pH for most crops",
+                "Use balanced NPK fertilizers",
+                "Maintain organic matter"
+            ]
+        },
+        "alkaline": {
+            "ph_range": "7.5-8.5",
+            "recommendations": [
+                "Add sulfur to lower pH",
+                "Use acid-forming fertilizers",
+                "Consider gypsum application"
+            ]
+        }
+    })
+    soil_recommendations = SOIL_RECOMMENDATIONS
+    
     def __init__(self):
         """Initialize the soil analyzer agent."""
         self.name = "SoilAnalyzer"
-        self.soil_recommendations = {
-            "acidic": {
-                "ph_range": "5.0-6.0",
-                "recommendations": [
-                    "Add lime to raise pH",
-                    "Use calcium-rich fertilizers",
-                    "Consider dolomite application"
-                ]
-            },
-            "neutral": {
-                "ph_range": "6.0-7.5",
-                "recommendations": [
-                    "Optimal pH for most crops",
-                    "Use balanced NPK fertilizers",
-                    "Maintain organic matter"
-                ]
-            },
-            "alkaline": {
-                "ph_range": "7.5-8.5",
-                "recommendations": [
-                    "Add sulfur to lower pH",
-                    "Use acid-forming fertilizers",
-                    "Consider gypsum application"
-                ]
-            }
+        # Everything after the pH value only depends on the soil type
+        self._report_tail = {
+            soil_type: f"({soil_type.title()})\n{self._format_tail(info)}"
+            for soil_type, info in self.SOIL_RECOMMENDATIONS.items()
         }
     
+    @_memoize_invoke("soil_pH")
     def invoke(self, message: str, context: Dict[str, Any] = None) -> str:
         """
         Provide soil analysis and recommendations.
@@ -365,23 +623,36 @@ class SoilAnalyzerAgent(BaseAgent):
         else:
             soil_type = "alkaline"
         
-        recommendations = self.soil_recommendations[soil_type]
-        
-        response = f"🌱 Soil Analysis Report:\n\n"
-        response += f"pH Level: {soil_ph} ({soil_type.title()})\n"
-        response += f"Optimal Range: {recommendations['ph_range']}\n\n"
-        response += "Recommendations:\n"
+        return f"🌱 Soil Analysis Report:\n\npH Level: {soil_ph} {self._report_tail[soil_type]}"
+    
+    def invoke_many(self, messages: Sequence[str], context: Optional[Dict[str, Any]] = None) -> List[str]:
+        """
+        Provide soil analysis for several messages sharing one context.
         
-        for rec in recommendations["recommendations"]:
-            response += f"• {rec}\n"
+        The report only depends on the context, so it is built once.
         
-        response += f"\n💡 Additional Tips:\n"
-        response += "• Test soil regularly\n"
-        response += "• Maintain proper drainage\n"
-        response += "• Use organic amendments\n"
-        response += "• Rotate crops to improve soil health"
+        Args:
+            messages: User messages
+            context: Context information
         
-        return response
+        Returns:
+            Soil analysis responses, in the order of the messages
+        """
+        return [self.invoke("", context)] * len(messages)
+    
+    @staticmethod
+    def _format_tail(info: Mapping[str, Any]) -> str:
+        """Format the range, recommendations and tips for a soil type."""
+        recommendations = "".join(f"• {rec}\n" for rec in info["recommendations"])
+        return (
+            f"Optimal Range: {info['ph_range']}\n\n"
+            f"Recommendations:\n{recommendations}"
+            "\n💡 Additional Tips:\n"
+            "• Test soil regularly\n"
+            "• Maintain proper drainage\n"
+            "• Use organic amendments\n"
+            "• Rotate crops to improve soil health"
+        )
 
 
 class MarketAgent(BaseAgent):
@@ -391,17 +662,27 @@ class MarketAgent(BaseAgent):
     Provides market prices and trading information.
     """
     
+    __slots__ = ("name", "_crop_re", "_reports", "_cached_invoke")
+    
+    PRICE_DATA = _freeze({
+        "rice": {"current": 2800, "unit": "per quintal", "trend": "stable"},
+        "wheat": {"current": 2200, "unit": "per quintal", "trend": "rising"},
+        "cotton": {"current": 6500, "unit": "per quintal", "trend": "falling"},
+        "maize": {"current": 1800, "unit": "per quintal", "trend": "stable"},
+        "pulses": {"current": 4500, "unit": "per quintal", "trend": "rising"}
+    })
+    price_data = PRICE_DATA
+    
     def __init__(self):
         """Initialize the market agent."""
         self.name = "MarketAgent"
-        self.price_data = {
-            "rice": {"current": 2800, "unit": "per quintal", "trend": "stable"},
-            "wheat": {"current": 2200, "unit": "per quintal", "trend": "rising"},
-            "cotton": {"current": 6500, "unit": "per quintal", "trend": "falling"},
-            "maize": {"current": 1800, "unit": "per quintal", "trend": "stable"},
-            "pulses": {"current": 4500, "unit": "per quintal", "trend": "rising"}
+        self._crop_re = _keyword_pattern({crop: (crop,) for crop in self.PRICE_DATA})
+        # Market information only depends on the crop; format it once
+        self._reports = {
+            crop: self._format_report(crop, info) for crop, info in self.PRICE_DATA.items()
         }
     
+    @_memoize_invoke("crop")
     def invoke(self, message: str, context: Dict[str, Any] = None) -> str:
         """
         Provide market price information.
@@ -413,42 +694,58 @@ class MarketAgent(BaseAgent):
         Returns:
             Market information response
         """
+        # Simple crop detection from message (first crop in price_data order)
+        return self._respond(_detect(self._crop_re, message, self.PRICE_DATA), context)
+    
+    def invoke_many(self, messages: Sequence[str], context: Optional[Dict[str, Any]] = None) -> List[str]:
+        """
+        Provide market information for several messages sharing one context.
+        
+        Args:
+            messages: User messages
+            context: Context information
+        
+        Returns:
+            Market information responses, in the order of the messages
+        """
+        crops = _detect_many(self._crop_re, messages, self.PRICE_DATA)
+        return [self._respond(crop, context) for crop in crops]
+    
+    def _respond(self, detected: Optional[str], context: Optional[Dict[str, Any]]) -> str:
+        """Build the market information for the crop detected in a message (if any)."""
         context = context or {}
         
         # Extract crop from context or message
-        crop = context.get("crop", "rice")
+        crop = detected or context.get("crop", "rice")
         
-        # Simple crop detection from message
-        message_lower = message.lower()
-        for available_crop in self.price_data.keys():
-            if available_crop in message_lower:
-                crop = available_crop
-                break
-        
-        if crop in self.price_data:
-            price_info = self.price_data[crop]
-            
-            response = f"📊 Market Information for {crop.title()}:\n\n"
-            response += f"Current Price: ₹{price_info['current']} {price_info['unit']}\n"
-            response += f"Market Trend: {price_info['trend'].title()}\n\n"
-            
-            if price_info['trend'] == "rising":
-                response += "📈 Price is trending upward - good time to sell\n"
-            elif price_info['trend'] == "falling":
-                response += "📉 Price is trending downward - consider holding\n"
-            else:
-                response += "➡️ Price is stable - normal trading conditions\n"
-            
-            response += f"\n💡 Trading Tips:\n"
-            response += "• Monitor daily price updates\n"
-            response += "• Consider storage costs\n"
-            response += "• Check government MSP rates\n"
-            response += "• Plan harvest timing carefully"
-            
-            return response
+        report = self._reports.get(crop)
+        if report is not None:
+            return report
         else:
-            available_crops = ", ".join(self.price_data.keys())
+            available_crops = ", ".join(self.PRICE_DATA.keys())
             return f"Sorry, I don't have price data for {crop}. Available crops: {available_crops}"
+    
+    @staticmethod
+    def _format_report(crop: str, price_info: Mapping[str, Any]) -> str:
+        """Format the price, trend and trading tips for a crop."""
+        if price_info['trend'] == "rising":
+            outlook = "📈 Price is trending upward - good time to sell\n"
+        elif price_info['trend'] == "falling":
+            outlook = "📉 Price is trending downward - consider holding\n"
+        else:
+            outlook = "➡️ Price is stable - normal trading conditions\n"
+        
+        return (
+            f"📊 Market Information for {crop.title()}:\n\n"
+            f"Current Price: ₹{price_info['current']} {price_info['unit']}\n"
+            f"Market Trend: {price_info['trend'].title()}\n\n"
+            f"{outlook}"
+            "\n💡 Trading Tips:\n"
+            "• Monitor daily price updates\n"
+            "• Consider storage costs\n"
+            "• Check government MSP rates\n"
+            "• Plan harvest timing carefully"
+        )
 
 
 class GeneralAssistantAgent(BaseAgent):
@@ -458,30 +755,45 @@ class GeneralAssistantAgent(BaseAgent):
     Provides general agricultural advice and information.
     """
     
+    __slots__ = ("name", "_topic_body", "_cached_invoke")
+    
+    GENERAL_TIPS = _freeze({
+        "farming_basics": [
+            "Always test soil before planting",
+            "Use crop rotation to maintain soil health",
+            "Implement proper irrigation practices",
+            "Monitor weather forecasts regularly"
+        ],
+        "sustainable_farming": [
+            "Use organic fertilizers when possible",
+            "Implement integrated pest management",
+            "Conserve water through efficient irrigation",
+            "Maintain biodiversity on your farm"
+        ],
+        "technology": [
+            "Consider precision farming techniques",
+            "Use mobile apps for crop monitoring",
+            "Explore IoT sensors for soil monitoring",
+            "Stay updated with agricultural innovations"
+        ]
+    })
+    general_tips = GENERAL_TIPS
+    
+    _TOPIC_TITLES = {
+        "farming_basics": "Farming Basics",
+        "sustainable_farming": "Sustainable Farming",
+        "technology": "Agricultural Technology",
+    }
+    
     def __init__(self):
         """Initialize the general assistant agent."""
         self.name = "GeneralAssistant"
-        self.general_tips = {
-            "farming_basics": [
-                "Always test soil before planting",
-                "Use crop rotation to maintain soil health",
-                "Implement proper irrigation practices",
-                "Monitor weather forecasts regularly"
-            ],
-            "sustainable_farming": [
-                "Use organic fertilizers when possible",
-                "Implement integrated pest management",
-                "Conserve water through efficient irrigation",
-                "Maintain biodiversity on your farm"
-            ],
-            "technology": [
-                "Consider precision farming techniques",
-                "Use mobile apps for crop monitoring",
-                "Explore IoT sensors for soil monitoring",
-                "Stay updated with agricultural innovations"
-            ]
+        # Tip lists and the closing suggestions never change; format them once
+        self._topic_body = {
+            topic: self._format_body(tips) for topic, tips in self.GENERAL_TIPS.items()
         }
     
+    @_memoize_invoke()
     def invoke(self, message: str, context: Dict[str, Any] = None) -> str:
         """
         Provide general agricultural advice.
@@ -493,37 +805,43 @@ class GeneralAssistantAgent(BaseAgent):
         Returns:
             General advice response
         """
-        context = context or {}
+        # Determine topic based on keywords
+        return self._respond(_detect(_TOPIC_RE, message, _TOPIC_GROUPS))
         
-        message_lower = message.lower()
+    def invoke_many(self, messages: Sequence[str], context: Optional[Dict[str, Any]] = None) -> List[str]:
+        """
+        Provide general advice for several messages.
         
-        # Determine topic based on keywords
-        if any(word in message_lower for word in ["basic", "beginner", "start"]):
-            topic = "farming_basics"
-            title = "Farming Basics"
-        elif any(word in message_lower for word in ["sustainable", "organic", "environment"]):
-            topic = "sustainable_farming"
-            title = "Sustainable Farming"
-        elif any(word in message_lower for word in ["technology", "digital", "smart"]):
-            topic = "technology"
-            title = "Agricultural Technology"
+        Args:
+            messages: User messages
+            context: Context information
+        
+        Returns:
+            General advice responses, in the order of the messages
+        """
+        return [self._respond(topic) for topic in _detect_many(_TOPIC_RE, messages, _TOPIC_GROUPS)]
+    
+    def _respond(self, topic: Optional[str]) -> str:
+        """Build the advice for the topic detected in a message (if any)."""
+        if topic is not None:
+            title = self._TOPIC_TITLES[topic]
         else:
             # Default to farming basics
             topic = "farming_basics"
             title = "General Agricultural Advice"
         
-        tips = self.general_tips[topic]
-        
-        response = f"🌾 {title}:\n\n"
-        
-        for i, tip in enumerate(tips, 1):
-            response += f"{i}. {tip}\n"
-        
-        response += f"\n💡 Need specific advice? Try asking about:\n"
-        response += "• Crop recommendations\n"
-        response += "• Weather information\n"
-        response += "• Pest control\n"
-        response += "• Soil analysis\n"
-        response += "• Market prices"
-        
-        return response 
\ No newline at end of file
+        return f"🌾 {title}:\n\n{self._topic_body[topic]}"
+    
+    @staticmethod
+    def _format_body(tips: Sequence[str]) -> str:
+        """Format a numbered tip list followed by the suggested topics."""
+        numbered = "".join(f"{i}. {tip}\n" for i, tip in enumerate(tips, 1))
+        return (
+            f"{numbered}"
+            "\n💡 Need specific advice? Try asking about:\n"
+            "• Crop recommendations\n"
+            "• Weather information\n"
+            "• Pest control\n"
+            "• Soil analysis\n"
+            "• Market prices"
+        ) 
\ No newline at end of file
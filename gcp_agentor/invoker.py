@@ -5,23 +5,63 @@ Handles agent invocation for both local ADK agents and remote Vertex AI agents.
 """
 
 import os
+import asyncio
+import hashlib
+import importlib.util
 import logging
-from typing import Any, Dict, Optional, Union, Callable
-from abc import ABC, abstractmethod
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Protocol, Tuple, Union, Callable, runtime_checkable
+from ._compat import json_bytes
+from .cache import TTLCache
 
+# The Vertex AI SDK is large, so only check that it is installed here and
+# import it on the first remote call (see _load_aiplatform)
 try:
-    from google.cloud import aiplatform
-    from google.cloud.aiplatform_v1.types import PredictRequest, PredictResponse
-    VERTEX_AI_AVAILABLE = True
-except ImportError:
+    VERTEX_AI_AVAILABLE = importlib.util.find_spec("google.cloud.aiplatform") is not None
+except (ImportError, ValueError):
     VERTEX_AI_AVAILABLE = False
-    aiplatform = None
+aiplatform = None
 
+# Context keys the router adds to every call (see AgentRouter._prepare_context).
+# They differ per call, so the response cache keys leave them out.
+ROUTING_METADATA_KEYS = frozenset({"user_id", "timestamp"})
 
-class BaseAgent(ABC):
-    """Abstract base class for all agents."""
+
+class InvocationError(str):
+    """
+    Response text of a failed invocation ("Error: ...").
+    
+    It is a plain string for callers that show responses, while callers
+    that need to tell failures apart check ``isinstance(response,
+    InvocationError)`` instead of matching the text.
+    """
+    
+    __slots__ = ()
+
+
+def _load_aiplatform() -> Any:
+    """Import the Vertex AI SDK on first use."""
+    global aiplatform
+    if aiplatform is None:
+        from google.cloud import aiplatform as sdk
+        aiplatform = sdk
+    return aiplatform
+
+
+@runtime_checkable
+class BaseAgent(Protocol):
+    """
+    Interface for all agents.
+    
+    Any object with a matching ``invoke`` method is an agent; subclassing
+    BaseAgent is optional.
+    """
+    
+    # No instance state here, so subclasses that declare __slots__ stay dict-free
+    __slots__ = ()
     
-    @abstractmethod
     def invoke(self, message: str, context: Dict[str, Any] = None) -> str:
         """
         Invoke the agent with a message and context.
@@ -33,7 +73,7 @@ class BaseAgent(ABC):
         Returns:
             Agent response
         """
-        pass
+        ...
 
 
 class AgentInvoker:
@@ -43,24 +83,141 @@ class AgentInvoker:
     Supports both local ADK agents and remote Vertex AI agents.
     """
     
-    def __init__(self, project_id: Optional[str] = None, location: str = "us-central1"):
+    def __init__(
+        self, 
+        project_id: Optional[str] = None, 
+        location: str = "us-central1",
+        cache_size: int = 0,
+        cache_ttl: float = 300,
+        max_workers: int = 32,
+        cache_dir: Optional[str] = None,
+        breaker_threshold: int = 5,
+        breaker_cooldown: float = 30.0,
+        disk_cache_size: int = 10000
+    ):
         """
         Initialize the agent invoker.
         
         Args:
             project_id: GCP project ID
             location: GCP location for Vertex AI resources
+            cache_size: Number of responses to cache (0, the default, disables caching)
+            cache_ttl: Seconds a cached response stays valid
+            max_workers: Maximum number of concurrent invocations in batch_invoke
+            cache_dir: Optional diskcache directory keeping Vertex AI responses
+                (for 24 hours) across process restarts
+            breaker_threshold: Consecutive failures after which an agent's
+                circuit opens and calls to it fail fast
+            breaker_cooldown: Seconds an open circuit rejects calls before
+                the agent is tried again
+            disk_cache_size: Number of Vertex AI responses kept in memory in
+                front of the cache_dir tier (independent of cache_size)
         """
         self.project_id = project_id or os.getenv("GCP_PROJECT_ID")
         self.location = location
         self._logger = logging.getLogger(__name__)
+        self._response_cache = TTLCache(cache_size, cache_ttl) if cache_size > 0 else None
+        self.max_workers = max_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # Vertex AI endpoint clients by full resource name
+        self._endpoint_cache: Dict[str, Any] = {}
         
-        if VERTEX_AI_AVAILABLE and self.project_id:
-            try:
-                aiplatform.init(project=self.project_id, location=self.location)
-                self._logger.info(f"Initialized Vertex AI client for project: {self.project_id}")
-            except Exception as e:
-                self._logger.warning(f"Failed to initialize Vertex AI: {e}")
+        # Invocation handler per agent type; unknown types are invoked locally
+        self._dispatch: Dict[str, Callable[[str, str, Dict[str, Any]], str]] = {
+            "local": self._invoke_local_agent,
+            "vertex": self._invoke_vertex_agent,
+        }
+        
+        cache_dir = cache_dir or os.getenv("AGENTOR_CACHE_DIR")
+        self._vertex_cache = None
+        if cache_dir and disk_cache_size > 0:
+            self._vertex_cache = TTLCache(
+                disk_cache_size, 24 * 60 * 60, directory=cache_dir, namespace="vertex"
+            )
+        
+        # Circuit breakers: agent name -> (consecutive failures, last failure time)
+        self.breaker_threshold = breaker_threshold
+        self.breaker_cooldown = breaker_cooldown
+        self._breakers: Dict[str, Tuple[int, float]] = {}
+        self._breaker_lock = threading.Lock()
+        
+        # Vertex AI is initialized on the first remote invocation
+        self._vertex_initialized = False
+        self._init_lock = threading.Lock()
+    
+    def _init_vertex(self) -> None:
+        """Initialize the Vertex AI SDK once, if it is available and configured."""
+        if self._vertex_initialized:
+            return
+        with self._init_lock:
+            if self._vertex_initialized:
+                return
+            self._vertex_initialized = True
+            if VERTEX_AI_AVAILABLE and self.project_id:
+                try:
+                    _load_aiplatform().init(project=self.project_id, location=self.location)
+                    self._logger.info("Initialized Vertex AI client for project: %s", self.project_id)
+                except Exception as e:
+                    self._logger.warning("Failed to initialize Vertex AI: %s", e)
+    
+    def warm_up(self) -> None:
+        """Initialize the Vertex AI SDK now instead of on the first remote call."""
+        self._init_vertex()
+    
+    def prefetch(self, agent_names: List[str]) -> None:
+        """
+        Create Vertex AI endpoint clients in the background ahead of use.
+        
+        Args:
+            agent_names: Vertex AI agent resource names or IDs
+        """
+        if not VERTEX_AI_AVAILABLE:
+            return
+        executor = self._get_executor()
+        for agent_name in agent_names:
+            if self._resource_name(agent_name) not in self._endpoint_cache:
+                executor.submit(self._prefetch_endpoint, agent_name)
+    
+    def _prefetch_endpoint(self, agent_name: str) -> None:
+        """Create an endpoint client, logging instead of raising on failure."""
+        try:
+            self._endpoint_for(agent_name)
+        except Exception as e:
+            self._logger.warning("Failed to prefetch Vertex AI endpoint %s: %s", agent_name, e)
+    
+    def _resource_name(self, agent_name: str) -> str:
+        """Expand an agent ID into its full Vertex AI resource name."""
+        if agent_name.startswith("projects/"):
+            return agent_name
+        return f"projects/{self.project_id}/locations/{self.location}/agents/{agent_name}"
+    
+    def _endpoint_for(self, agent_name: str) -> Any:
+        """Get the (cached) Vertex AI endpoint client for an agent."""
+        resource_name = self._resource_name(agent_name)
+        endpoint = self._endpoint_cache.get(resource_name)
+        if endpoint is None:
+            self._init_vertex()
+            endpoint = _load_aiplatform().Endpoint(endpoint_name=resource_name)
+            self._endpoint_cache[resource_name] = endpoint
+        return endpoint
+    
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """Get the thread pool used for concurrent invocations, creating it once."""
+        if self._executor is None:
+            with self._init_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers, thread_name_prefix="agentor-invoke"
+                    )
+        return self._executor
+    
+    def close(self) -> None:
+        """Shut down the invocation thread pool and close the response disk cache."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        if self._vertex_cache is not None:
+            self._vertex_cache.close()
     
     def invoke(
         self, 
@@ -83,14 +240,149 @@ class AgentInvoker:
         """
         context = context or {}
         
+        cache_key = self._response_cache_key(agent_name, message, context, agent_type)
+        if cache_key is not None:
+            cached = self._response_cache.get(cache_key)
+            if cached is not None:
+                return cached
+        
+        if self._circuit_open(agent_name):
+            return self._circuit_open_response(agent_name)
+        
+        handler = self._dispatch.get(agent_type) or self._dispatch["local"]
         try:
-            if agent_type == "vertex":
-                return self._invoke_vertex_agent(agent_name, message, context)
-            else:
-                return self._invoke_local_agent(agent_name, message, context)
+            response = handler(agent_name, message, context)
         except Exception as e:
-            self._logger.error(f"Error invoking agent {agent_name}: {e}")
-            return f"Error: Failed to invoke agent {agent_name}. {str(e)}"
+            self._record_failure(agent_name)
+            self._logger.error("Error invoking agent %s: %s", agent_name, e)
+            return InvocationError(f"Error: Failed to invoke agent {agent_name}. {str(e)}")
+        
+        self._record_success(agent_name)
+        if cache_key is not None:
+            self._response_cache.set(cache_key, response)
+        return response
+    
+    def _response_cache_key(
+        self, 
+        agent_name: str, 
+        message: str, 
+        context: Dict[str, Any],
+        agent_type: str
+    ) -> Optional[tuple]:
+        """Key for the response cache (None if caching is off or context is unhashable)."""
+        if self._response_cache is None:
+            return None
+        try:
+            items = frozenset(
+                item for item in context.items() if item[0] not in ROUTING_METADATA_KEYS
+            )
+            return (agent_name, message, items, agent_type)
+        except TypeError:
+            return None
+    
+    async def ainvoke(
+        self, 
+        agent_name: str, 
+        message: str, 
+        context: Dict[str, Any] = None,
+        agent_type: str = "local"
+    ) -> str:
+        """
+        Invoke an agent with a message without blocking the event loop.
+        
+        Vertex AI agents are called through the SDK's ``predict_async`` when it
+        is available; everything else runs on the invoker's thread pool.
+        
+        Args:
+            agent_name: Name or identifier of the agent
+            message: Input message
+            context: Additional context data
+            agent_type: Type of agent ("local" or "vertex")
+            
+        Returns:
+            Agent response
+        """
+        context = context or {}
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        
+        if (
+            agent_type == "vertex" 
+            and VERTEX_AI_AVAILABLE 
+            and self._dispatch.get("vertex") == self._invoke_vertex_agent
+        ):
+            cache_key = self._response_cache_key(agent_name, message, context, agent_type)
+            cached = self._response_cache.get(cache_key) if cache_key is not None else None
+            if cached is not None:
+                return cached
+            if self._circuit_open(agent_name):
+                return self._circuit_open_response(agent_name)
+            try:
+                # Creating the client may block (auth, discovery); do it off-loop
+                endpoint = await loop.run_in_executor(executor, self._endpoint_for, agent_name)
+                predict_async = getattr(endpoint, "predict_async", None)
+                if predict_async is not None:
+                    response = await predict_async([{"message": message, "context": context}])
+                    self._record_success(agent_name)
+                    if response and getattr(response, 'predictions', None):
+                        result = str(response.predictions[0])
+                        if cache_key is not None:
+                            self._response_cache.set(cache_key, result)
+                        return result
+                    return "No response from Vertex AI agent"
+            except Exception as e:
+                self._record_failure(agent_name)
+                self._logger.error("Error invoking agent %s: %s", agent_name, e)
+                return InvocationError(f"Error: Failed to invoke agent {agent_name}. {str(e)}")
+        
+        return await loop.run_in_executor(
+            executor, self.invoke, agent_name, message, context, agent_type
+        )
+    
+    def _circuit_open(self, agent_name: str) -> bool:
+        """Check whether calls to an agent should currently fail fast."""
+        state = self._breakers.get(agent_name)
+        return (
+            state is not None
+            and state[0] >= self.breaker_threshold
+            and time.monotonic() - state[1] < self.breaker_cooldown
+        )
+    
+    def _circuit_open_response(self, agent_name: str) -> str:
+        """Error response returned while an agent's circuit is open."""
+        return InvocationError(
+            f"Error: Failed to invoke agent {agent_name}. Circuit open after repeated failures"
+        )
+    
+    def _record_failure(self, agent_name: str) -> None:
+        """Count a failed call; the circuit opens once the threshold is reached."""
+        with self._breaker_lock:
+            failures = self._breakers.get(agent_name, (0, 0.0))[0] + 1
+            self._breakers[agent_name] = (failures, time.monotonic())
+        if failures == self.breaker_threshold:
+            self._logger.warning(
+                "Circuit opened for agent %s after %s failures", agent_name, failures
+            )
+    
+    def _record_success(self, agent_name: str) -> None:
+        """Close an agent's circuit after a successful call."""
+        if agent_name in self._breakers:
+            with self._breaker_lock:
+                self._breakers.pop(agent_name, None)
+    
+    def register_agent_type(
+        self, 
+        agent_type: str, 
+        handler: Callable[[str, str, Dict[str, Any]], str]
+    ) -> None:
+        """
+        Register (or replace) the invocation handler for an agent type.
+        
+        Args:
+            agent_type: Agent type name passed to invoke()
+            handler: Callable taking (agent_name, message, context) and returning the response
+        """
+        self._dispatch[agent_type] = handler
     
     def _invoke_local_agent(self, agent_name: str, message: str, context: Dict[str, Any]) -> str:
         """
@@ -106,7 +398,7 @@ class AgentInvoker:
         """
         # This would typically involve calling the ADK agent runtime
         # For now, we'll return a placeholder response
-        self._logger.info(f"Invoking local agent: {agent_name}")
+        self._logger.info("Invoking local agent: %s", agent_name)
         
         # Mock response for demonstration
         return f"Local agent '{agent_name}' response: {message}"
@@ -128,15 +420,18 @@ class AgentInvoker:
         
         try:
             # Construct the full resource name if only ID is provided
-            if not agent_name.startswith("projects/"):
-                agent_name = f"projects/{self.project_id}/locations/{self.location}/agents/{agent_name}"
+            agent_name = self._resource_name(agent_name)
             
-            self._logger.info(f"Invoking Vertex AI agent: {agent_name}")
+            cache_key = self._vertex_cache_key(agent_name, message, context)
+            if cache_key is not None:
+                cached = self._vertex_cache.get(cache_key)
+                if cached is not None:
+                    return cached
             
-            # Create the endpoint client
-            endpoint_client = aiplatform.Endpoint(
-                endpoint_name=agent_name
-            )
+            self._logger.info("Invoking Vertex AI agent: %s", agent_name)
+            
+            # Reuse the endpoint client (and its connections) across calls
+            endpoint_client = self._endpoint_for(agent_name)
             
             # Prepare the request payload
             payload = {
@@ -149,14 +444,81 @@ class AgentInvoker:
             
             # Extract the response
             if response and hasattr(response, 'predictions'):
-                return str(response.predictions[0])
+                result = str(response.predictions[0])
+                if cache_key is not None:
+                    self._vertex_cache.set(cache_key, result)
+                return result
             else:
                 return "No response from Vertex AI agent"
                 
         except Exception as e:
-            self._logger.error(f"Error invoking Vertex AI agent {agent_name}: {e}")
+            self._logger.error("Error invoking Vertex AI agent %s: %s", agent_name, e)
             raise
     
+    def _vertex_cache_key(self, resource_name: str, message: str, context: Dict[str, Any]) -> Optional[bytes]:
+        """Key for the persistent Vertex AI response cache (None if caching is off or impossible)."""
+        if self._vertex_cache is None:
+            return None
+        context = {key: value for key, value in context.items() if key not in ROUTING_METADATA_KEYS}
+        try:
+            payload = json_bytes([resource_name, message, context], sort_keys=True)
+        except TypeError:
+            # Context keys that can't be sorted (e.g. mixed str and int)
+            return None
+        return hashlib.blake2b(payload).digest()
+    
+    def invoke_many(
+        self, 
+        agent_name: str, 
+        messages: List[str], 
+        context: Dict[str, Any] = None,
+        agent_type: str = "local"
+    ) -> List[str]:
+        """
+        Invoke one agent with several messages.
+        
+        Vertex AI agents receive all messages in a single predict request
+        instead of one request per message; repeated messages are sent once.
+        
+        Args:
+            agent_name: Name or identifier of the agent
+            messages: Input messages
+            context: Additional context data (shared by all messages)
+            agent_type: Type of agent ("local" or "vertex")
+            
+        Returns:
+            Agent responses, in the order of the messages
+        """
+        context = context or {}
+        if agent_type != "vertex" or len(messages) < 2:
+            return [self.invoke(agent_name, message, context, agent_type) for message in messages]
+        
+        if self._circuit_open(agent_name):
+            return [self._circuit_open_response(agent_name)] * len(messages)
+        
+        try:
+            if not VERTEX_AI_AVAILABLE:
+                raise RuntimeError("Vertex AI SDK not available")
+            
+            unique = list(dict.fromkeys(messages))
+            resource_name = self._resource_name(agent_name)
+            self._logger.info("Invoking Vertex AI agent: %s (%s messages)", resource_name, len(unique))
+            response = self._endpoint_for(resource_name).predict(
+                [{"message": message, "context": context} for message in unique]
+            )
+        except Exception as e:
+            self._record_failure(agent_name)
+            self._logger.error("Error invoking agent %s: %s", agent_name, e)
+            return [InvocationError(f"Error: Failed to invoke agent {agent_name}. {str(e)}")] * len(messages)
+        
+        self._record_success(agent_name)
+        predictions = list(getattr(response, 'predictions', None) or [])
+        by_message = {
+            message: str(predictions[i]) if i < len(predictions) else "No response from Vertex AI agent"
+            for i, message in enumerate(unique)
+        }
+        return [by_message[message] for message in messages]
+    
     def invoke_with_fallback(
         self, 
         agent_name: str, 
@@ -174,21 +536,23 @@ class AgentInvoker:
             fallback_agent: Fallback agent name
             
         Returns:
-            Agent response or fallback response
+            Agent response or fallback response (an InvocationError if
+            both failed)
         """
-        try:
-            return self.invoke(agent_name, message, context)
-        except Exception as e:
-            self._logger.warning(f"Primary agent {agent_name} failed: {e}")
+        # invoke() reports failures (including an open circuit) as InvocationError
+        response = self.invoke(agent_name, message, context)
+        if not isinstance(response, InvocationError):
+            return response
+        self._logger.warning("Primary agent %s failed: %s", agent_name, response)
             
-            if fallback_agent:
-                try:
-                    self._logger.info(f"Trying fallback agent: {fallback_agent}")
-                    return self.invoke(fallback_agent, message, context)
-                except Exception as fallback_error:
-                    self._logger.error(f"Fallback agent {fallback_agent} also failed: {fallback_error}")
+        if fallback_agent:
+            self._logger.info("Trying fallback agent: %s", fallback_agent)
+            fallback_response = self.invoke(fallback_agent, message, context)
+            if not isinstance(fallback_response, InvocationError):
+                return fallback_response
+            self._logger.error("Fallback agent %s also failed: %s", fallback_agent, fallback_response)
             
-            return f"Error: All agents failed. Original error: {str(e)}"
+        return InvocationError(f"Error: All agents failed. Original error: {response[len('Error: '):]}")
     
     def batch_invoke(
         self, 
@@ -199,6 +563,9 @@ class AgentInvoker:
         """
         Invoke multiple agents with the same message.
         
+        The agents are invoked concurrently on a thread pool, so a batch of
+        remote agents takes about as long as the slowest one.
+        
         Args:
             agents: List of agent configurations (dict with 'name' and 'type')
             message: Input message
@@ -210,21 +577,72 @@ class AgentInvoker:
         results = {}
         context = context or {}
         
-        for agent_config in agents:
-            agent_name = agent_config.get('name')
-            agent_type = agent_config.get('type', 'local')
-            
-            if not agent_name:
-                continue
-            
+        calls = list(self._agent_types(agents).items())
+        # Start creating any missing endpoint clients before the calls need them
+        self.prefetch([name for name, agent_type in calls if agent_type == "vertex"])
+        if len(calls) > 1:
+            executor = self._get_executor()
+            futures = [
+                executor.submit(self.invoke, agent_name, message, context, agent_type)
+                for agent_name, agent_type in calls
+            ]
+        else:
+            futures = [None] * len(calls)
+        
+        for (agent_name, agent_type), future in zip(calls, futures):
             try:
-                response = self.invoke(agent_name, message, context, agent_type)
-                results[agent_name] = response
+                if future is not None:
+                    results[agent_name] = future.result()
+                else:
+                    results[agent_name] = self.invoke(agent_name, message, context, agent_type)
             except Exception as e:
-                results[agent_name] = f"Error: {str(e)}"
+                results[agent_name] = InvocationError(f"Error: {str(e)}")
         
         return results
     
+    @staticmethod
+    def _agent_types(agents: list) -> Dict[str, str]:
+        """
+        Map each named agent config to its agent type, in request order.
+        
+        Results are keyed by name, so a repeated agent is invoked once, with
+        its last config (the response that used to overwrite the others).
+        """
+        agent_types = {}
+        for agent_config in agents:
+            if agent_config.get('name'):
+                agent_types[agent_config['name']] = agent_config.get('type', 'local')
+        return agent_types
+    
+    async def abatch_invoke(
+        self, 
+        agents: list, 
+        message: str, 
+        context: Dict[str, Any] = None
+    ) -> Dict[str, str]:
+        """
+        Invoke multiple agents with the same message from an event loop.
+        
+        Async counterpart of batch_invoke: Vertex AI calls share the event
+        loop instead of holding one pool thread each while they wait.
+        
+        Args:
+            agents: List of agent configurations (dict with 'name' and 'type')
+            message: Input message
+            context: Context data
+            
+        Returns:
+            Dictionary mapping agent names to responses
+        """
+        context = context or {}
+        agent_types = self._agent_types(agents)
+        
+        responses = await asyncio.gather(*(
+            self.ainvoke(agent_name, message, context, agent_type)
+            for agent_name, agent_type in agent_types.items()
+        ))
+        return dict(zip(agent_types, responses))
+    
     def get_agent_status(self, agent_name: str, agent_type: str = "local") -> Dict[str, Any]:
         """
         Get the status of an agent.
@@ -250,8 +668,7 @@ class AgentInvoker:
                     return status
                 
                 # Check if Vertex AI agent exists
-                if not agent_name.startswith("projects/"):
-                    agent_name = f"projects/{self.project_id}/locations/{self.location}/agents/{agent_name}"
+                agent_name = self._resource_name(agent_name)
                 
                 # This would typically check the agent's deployment status
                 status["available"] = True
@@ -281,6 +698,8 @@ class AgentInvoker:
 class MockAgent(BaseAgent):
     """Mock agent for testing purposes."""
     
+    __slots__ = ("name", "response_template")
+    
     def __init__(self, name: str, response_template: str = "Mock response from {name}: {message}"):
         """
         Initialize the mock agent.
@@ -303,4 +722,4 @@ class MockAgent(BaseAgent):
         Returns:
             Mock response
         """
-        return self.response_template.format(name=self.name, message=message) 
\ No newline at end of file
+        return self.response_template.format(name=self.name, message=message)
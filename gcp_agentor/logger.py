@@ -5,11 +5,19 @@ Comprehensive logging of agent decisions and reasoning traces.
 """
 
 import os
-import json
+import io
+import bisect
+import contextlib
+import functools
+import itertools
 import logging
-from typing import Any, Dict, List, Optional
-from datetime import datetime
-from dataclasses import dataclass, asdict
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, TextIO, Tuple
+from datetime import datetime, timedelta
+from dataclasses import dataclass, field
+from ._compat import DATACLASS_SLOTS, json_bytes
+from .batcher import FirestoreBatcher, MAX_QUEUE_SIZE, delete_documents
 
 try:
     from google.cloud import firestore
@@ -18,8 +26,26 @@ except ImportError:
     FIRESTORE_AVAILABLE = False
     firestore = None
 
+try:
+    from google.api_core import exceptions as api_exceptions
+    API_CORE_AVAILABLE = True
+except ImportError:
+    API_CORE_AVAILABLE = False
+    api_exceptions = None
+
+# Raised by Firestore when a query needs a composite index that doesn't exist
+MISSING_INDEX_ERRORS: Tuple[type, ...] = (
+    (api_exceptions.FailedPrecondition,) if API_CORE_AVAILABLE else ()
+)
+
+# Composite index used by _query_by_step_prefix (collection ID "logs")
+STEP_PREFIX_INDEX = "logs: session_id ASC, timestamp DESC, step ASC"
 
-@dataclass
+# Single-field index used by cleanup_old_logs (collection group scope)
+CLEANUP_INDEX = "logs collection group: timestamp ASC"
+
+
+@dataclass(**DATACLASS_SLOTS)
 class ReasoningStep:
     """Represents a single reasoning step in the decision process."""
     step_id: str
@@ -28,12 +54,38 @@ class ReasoningStep:
     description: str
     input_data: Dict[str, Any]
     output_data: Dict[str, Any]
-    metadata: Dict[str, Any] = None
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+
+def _snapshot(value: Any) -> Any:
+    """Copy the dicts, lists and tuples of a logged value, leaving the other values shared."""
+    if isinstance(value, dict):
+        return {key: _snapshot(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_snapshot(item) for item in value]
+    if type(value) is tuple:
+        return tuple(_snapshot(item) for item in value)
+    return value
+
+
+@dataclass(**DATACLASS_SLOTS)
+class _LogEntry:
+    """A log entry as kept in memory; converted to a dict when read or written."""
+    user_id: str
+    session_id: str
+    timestamp: str
+    step: str
+    details: Dict[str, Any]
     
-    def __post_init__(self):
-        """Initialize default values."""
-        if self.metadata is None:
-            self.metadata = {}
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to the dictionary stored in Firestore and returned to callers."""
+        return {
+            "user_id": self.user_id,
+            "session_id": self.session_id,
+            "timestamp": self.timestamp,
+            "step": self.step,
+            "details": self.details
+        }
 
 
 class ReasoningLogger:
@@ -43,32 +95,77 @@ class ReasoningLogger:
     Stores detailed logs in Firestore for analysis and debugging.
     """
     
-    def __init__(self, project_id: Optional[str] = None, collection_name: str = "agentor_logs"):
+    def __init__(
+        self, 
+        project_id: Optional[str] = None, 
+        collection_name: str = "agentor_logs",
+        max_queue_size: int = MAX_QUEUE_SIZE
+    ):
         """
         Initialize the reasoning logger.
         
         Args:
             project_id: GCP project ID
             collection_name: Firestore collection name for logs
+            max_queue_size: Log entries waiting to be written to Firestore
+                before new entries are dropped (0 for no limit)
         """
         self.project_id = project_id or os.getenv("GCP_PROJECT_ID")
         self.collection_name = collection_name
+        self.max_queue_size = max_queue_size
         self._logger = logging.getLogger(__name__)
+        # In-memory log entries per user, oldest first, with their timestamps
+        # in a parallel list so out-of-order entries can be placed by bisection
+        self._logs: Dict[str, List[_LogEntry]] = {}
+        self._log_times: Dict[str, List[str]] = {}
+        
+        # The Firestore client is created on first use (see _use_firestore)
+        self._db = None
+        self._collection = None
+        self._batcher: Optional[FirestoreBatcher] = None
+        self._firestore_enabled = FIRESTORE_AVAILABLE
+        self._connect_lock = threading.Lock()
+        # Per-user "logs" subcollection references, reused across calls
+        self._user_logs = functools.lru_cache(maxsize=1024)(self._make_user_logs)
+        # Entries collected by batch(), per thread
+        self._local = threading.local()
         
         if not FIRESTORE_AVAILABLE:
             self._logger.warning("Firestore not available. Using in-memory logging.")
-            self._use_firestore = False
-            self._logs: Dict[str, List[Dict[str, Any]]] = {}
-        else:
-            self._use_firestore = True
+    
+    @property
+    def _use_firestore(self) -> bool:
+        """Whether logs go to Firestore, connecting on first access."""
+        if self._collection is None and self._firestore_enabled:
+            self._connect()
+        return self._firestore_enabled
+    
+    def _connect(self) -> None:
+        """Create the Firestore client, falling back to in-memory logging."""
+        with self._connect_lock:
+            if self._collection is not None or not self._firestore_enabled:
+                return
             try:
                 self._db = firestore.Client(project=self.project_id)
-                self._collection = self._db.collection(collection_name)
-                self._logger.info(f"Initialized Firestore logger with collection: {collection_name}")
+                self._collection = self._db.collection(self.collection_name)
+                self._batcher = FirestoreBatcher(self._db, max_queue_size=self.max_queue_size)
+                self._logger.info(f"Initialized Firestore logger with collection: {self.collection_name}")
             except Exception as e:
                 self._logger.error(f"Failed to initialize Firestore logger: {e}. Falling back to in-memory logging.")
-                self._use_firestore = False
-                self._logs = {}
+                self._firestore_enabled = False
+    
+    def _make_user_logs(self, user_id: str) -> Any:
+        """Build the Firestore reference of a user's logs subcollection."""
+        return self._collection.document(f"user_{user_id}").collection("logs")
+    
+    def warm_up(self) -> bool:
+        """
+        Connect to Firestore now instead of on the first log entry.
+        
+        Returns:
+            True if logs go to Firestore, False if logging is in-memory
+        """
+        return self._use_firestore
     
     def log(
         self, 
@@ -87,27 +184,85 @@ class ReasoningLogger:
             session_id: Optional session identifier
         """
         timestamp = datetime.utcnow().isoformat()
-        session_id = session_id or f"session_{int(datetime.utcnow().timestamp())}"
+        if not session_id:
+            # Same form as ACPMessage session ids; time.time() is far cheaper
+            # than a second datetime.utcnow() and is not skewed by the local
+            # timezone the way naive datetime.timestamp() is
+            session_id = f"session_{int(time.time())}"
         
-        log_entry = {
-            "user_id": user_id,
-            "session_id": session_id,
-            "timestamp": timestamp,
-            "step": step,
-            "details": details
-        }
+        # Entries are serialized later (when a batch ends or the batcher
+        # writes), so copy the details as they are now; callers such as
+        # AgentRouter.route() keep changing the dicts they logged
+        log_entry = _LogEntry(user_id, session_id, timestamp, step, _snapshot(details))
+        
+        pending = getattr(self._local, "pending", None)
+        if pending is not None:
+            pending.append(log_entry)
+        else:
+            self._write([log_entry])
+    
+    @contextlib.contextmanager
+    def batch(self) -> Iterator[None]:
+        """
+        Collect the entries this thread logs in a block and store them together.
+        
+        Entries keep the timestamps of their log() calls. They are stored
+        when the block exits, also on errors, with a single write queue
+        operation instead of one per entry. Nested blocks join the
+        outermost one.
+        """
+        if getattr(self._local, "pending", None) is not None:
+            yield
+            return
         
+        pending: List[_LogEntry] = []
+        self._local.pending = pending
+        try:
+            yield
+        finally:
+            self._local.pending = None
+            if pending:
+                self._write(pending)
+    
+    def _write(self, entries: List[_LogEntry]) -> None:
+        """Store log entries in Firestore (through the batcher) or in memory."""
         if self._use_firestore:
             try:
-                doc_ref = self._collection.document(f"user_{user_id}").collection("logs").document()
-                doc_ref.set(log_entry)
-                self._logger.debug(f"Logged step for user {user_id}: {step}")
+                self._batcher.enqueue_many([
+                    (self._user_logs(entry.user_id).document(), entry.to_dict())
+                    for entry in entries
+                ])
+                self._logger.debug(f"Queued {len(entries)} log steps for user {entries[0].user_id}")
             except Exception as e:
-                self._logger.error(f"Error logging step for user {user_id}: {e}")
-        else:
-            if user_id not in self._logs:
-                self._logs[user_id] = []
-            self._logs[user_id].append(log_entry)
+                self._logger.error(f"Error logging steps for user {entries[0].user_id}: {e}")
+            return
+        
+        for entry in entries:
+            timestamp = entry.timestamp
+            logs = self._logs.setdefault(entry.user_id, [])
+            times = self._log_times.setdefault(entry.user_id, [])
+            if not times or timestamp >= times[-1]:
+                logs.append(entry)
+                times.append(timestamp)
+            else:
+                index = bisect.bisect_right(times, timestamp)
+                logs.insert(index, entry)
+                times.insert(index, timestamp)
+    
+    @property
+    def dropped_entries(self) -> int:
+        """Number of log entries dropped because the Firestore write queue was full."""
+        return self._batcher.dropped if self._batcher is not None else 0
+    
+    def flush(self) -> None:
+        """Wait until queued log entries have been written to Firestore."""
+        if self._batcher is not None:
+            self._batcher.flush()
+    
+    def close(self) -> None:
+        """Write queued log entries and stop the background writer."""
+        if self._batcher is not None:
+            self._batcher.close()
     
     def log_reasoning_step(
         self, 
@@ -271,33 +426,82 @@ class ReasoningLogger:
             List of log entries
         """
         if self._use_firestore:
+            # One page holding every requested entry: a single query
+            return list(self.iter_logs(user_id, session_id, page_size=max(limit, 1), limit=limit))
+        else:
+            return self._newest_logs(user_id, session_id, limit)
+    
+    def iter_logs(
+        self, 
+        user_id: str, 
+        session_id: Optional[str] = None,
+        page_size: int = 100,
+        limit: Optional[int] = None,
+        fields: Optional[List[str]] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Iterate over a user's logs, newest first.
+        
+        Firestore logs are fetched one page at a time, continuing after the
+        last document of the previous page, so only one page is held in
+        memory.
+        
+        Args:
+            user_id: User identifier
+            session_id: Optional session filter
+            page_size: Number of log entries fetched per query
+            limit: Maximum number of log entries (None for all)
+            fields: Only fetch these fields of Firestore log entries
+                (in-memory entries are always complete)
+        
+        Yields:
+            Log entries
+        """
+        if not self._use_firestore:
+            yield from self._newest_logs(user_id, session_id, limit)
+            return
+        
+        self.flush()
+        remaining = limit
+        last_doc = None
+        while remaining is None or remaining > 0:
+            size = page_size if remaining is None else min(page_size, remaining)
             try:
-                query = self._collection.document(f"user_{user_id}").collection("logs")
-                
+                query = self._user_logs(user_id)
                 if session_id:
                     query = query.where("session_id", "==", session_id)
-                
-                query = query.order_by("timestamp", direction=firestore.Query.DESCENDING).limit(limit)
-                docs = query.stream()
-                
-                logs = []
-                for doc in docs:
-                    log_data = doc.to_dict()
-                    log_data["log_id"] = doc.id
-                    logs.append(log_data)
-                
-                return logs
+                if fields:
+                    query = query.select(fields)
+                query = query.order_by("timestamp", direction=firestore.Query.DESCENDING)
+                if last_doc is not None:
+                    query = query.start_after(last_doc)
+                docs = list(query.limit(size).stream())
             except Exception as e:
                 self._logger.error(f"Error getting logs for user {user_id}: {e}")
-                return []
-        else:
-            user_logs = self._logs.get(user_id, [])
-            if session_id:
-                user_logs = [log for log in user_logs if log.get("session_id") == session_id]
+                return
+            
+            for doc in docs:
+                log_data = doc.to_dict()
+                log_data["log_id"] = doc.id
+                yield log_data
             
-            # Sort by timestamp descending and limit
-            user_logs.sort(key=lambda x: x.get("timestamp", ""), reverse=True)
-            return user_logs[:limit]
+            if len(docs) < size:
+                return
+            last_doc = docs[-1]
+            if remaining is not None:
+                remaining -= len(docs)
+    
+    def _newest_logs(
+        self, 
+        user_id: str, 
+        session_id: Optional[str], 
+        limit: Optional[int]
+    ) -> List[Dict[str, Any]]:
+        """In-memory logs of a user, newest first (entries are kept in timestamp order)."""
+        newest = reversed(self._logs.get(user_id, []))
+        if session_id:
+            newest = (log for log in newest if log.session_id == session_id)
+        return [log.to_dict() for log in itertools.islice(newest, limit)]
     
     def get_session_logs(self, user_id: str, session_id: str) -> List[Dict[str, Any]]:
         """
@@ -327,25 +531,92 @@ class ReasoningLogger:
         Returns:
             List of ReasoningStep objects
         """
-        logs = self.get_session_logs(user_id, session_id)
+        logs = self._query_by_step_prefix(user_id, session_id, "reasoning_step_")
         reasoning_steps = []
         
         for log in logs:
-            if log.get("step", "").startswith("reasoning_step_"):
-                details = log.get("details", {})
-                step = ReasoningStep(
-                    step_id=details.get("step_id", ""),
-                    timestamp=log.get("timestamp", ""),
-                    step_type=details.get("step_type", ""),
-                    description=details.get("description", ""),
-                    input_data=details.get("input_data", {}),
-                    output_data=details.get("output_data", {}),
-                    metadata=details.get("metadata", {})
-                )
-                reasoning_steps.append(step)
+            details = log.get("details", {})
+            step = ReasoningStep(
+                step_id=details.get("step_id", ""),
+                timestamp=log.get("timestamp", ""),
+                step_type=details.get("step_type", ""),
+                description=details.get("description", ""),
+                input_data=details.get("input_data", {}),
+                output_data=details.get("output_data", {}),
+                metadata=details.get("metadata") or {}
+            )
+            reasoning_steps.append(step)
         
         return reasoning_steps
     
+    def _query_by_step_prefix(
+        self, 
+        user_id: str, 
+        session_id: str, 
+        prefix: str, 
+        limit: int = 1000
+    ) -> List[Dict[str, Any]]:
+        """
+        Get a session's logs whose step starts with a prefix, newest first.
+        
+        On Firestore the prefix is matched by a range query on ``step``
+        ordered by timestamp, so only the newest matching entries are
+        fetched. Ordering by a field other than the range-filtered one
+        needs Firestore's support for inequality filters on any field and a
+        composite index on the ``logs`` collection (see STEP_PREFIX_INDEX):
+        session_id ascending, timestamp descending, step ascending. Without
+        the index the session's logs are fetched and filtered here, with a
+        warning.
+        
+        Args:
+            user_id: User identifier
+            session_id: Session identifier
+            prefix: Step prefix
+            limit: Maximum number of log entries
+        
+        Returns:
+            Matching log entries
+        """
+        if not self._use_firestore:
+            newest = reversed(self._logs.get(user_id, []))
+            matching = (
+                log for log in newest
+                if log.session_id == session_id and log.step.startswith(prefix)
+            )
+            return [log.to_dict() for log in itertools.islice(matching, limit)]
+        
+        self.flush()
+        try:
+            query = (
+                self._user_logs(user_id)
+                .where("session_id", "==", session_id)
+                .where("step", ">=", prefix)
+                .where("step", "<", prefix + "\uffff")
+                # Ordered by timestamp first, so the limit keeps the newest
+                # entries rather than the alphabetically first steps
+                .order_by("timestamp", direction=firestore.Query.DESCENDING)
+                .limit(limit)
+            )
+            logs = []
+            for doc in query.stream():
+                log_data = doc.to_dict()
+                log_data["log_id"] = doc.id
+                logs.append(log_data)
+        except MISSING_INDEX_ERRORS as e:
+            self._logger.warning(
+                f"Firestore index missing for step-prefix queries ({STEP_PREFIX_INDEX}); "
+                f"filtering the session's logs instead: {e}"
+            )
+            logs = [
+                log for log in self.get_session_logs(user_id, session_id)
+                if log.get("step", "").startswith(prefix)
+            ]
+            return logs[:limit]
+        except Exception as e:
+            self._logger.error(f"Error getting logs for user {user_id}: {e}")
+            return []
+        return logs
+    
     def export_logs(self, user_id: str, session_id: Optional[str] = None) -> str:
         """
         Export logs as JSON string.
@@ -357,37 +628,100 @@ class ReasoningLogger:
         Returns:
             JSON string representation of logs
         """
-        logs = self.get_logs(user_id, limit=1000, session_id=session_id)
-        return json.dumps(logs, indent=2, default=str)
+        sink = io.StringIO()
+        self.write_logs(sink, user_id, session_id)
+        return sink.getvalue()
+    
+    def write_logs(
+        self, 
+        sink: TextIO, 
+        user_id: str, 
+        session_id: Optional[str] = None,
+        limit: int = 1000
+    ) -> int:
+        """
+        Write logs to a file-like object as a JSON array, one page at a time.
+        
+        The output is the JSON array of the entries, indented by two spaces.
+        
+        Args:
+            sink: Text stream to write to
+            user_id: User identifier
+            session_id: Optional session filter
+            limit: Maximum number of log entries to write
+        
+        Returns:
+            Number of log entries written
+        """
+        count = 0
+        for log in self.iter_logs(user_id, session_id, limit=limit):
+            entry = json_bytes(log, indent=True).decode().replace("\n", "\n  ")
+            sink.write(f"{',' if count else '['}\n  {entry}")
+            count += 1
+        sink.write("\n]" if count else "[]")
+        return count
     
     def cleanup_old_logs(self, days_old: int = 30) -> int:
         """
         Clean up logs older than specified days.
         
+        On Firestore old entries of all users are found with one collection
+        group query, which needs a collection-group scoped index on the
+        ``logs`` timestamp (see CLEANUP_INDEX). Without it each user's logs
+        are queried in turn, with a warning.
+        
         Args:
             days_old: Number of days after which logs are considered old
             
         Returns:
             Number of logs deleted
         """
-        if not self._use_firestore:
-            # For in-memory storage, we don't have timestamps, so skip cleanup
-            return 0
-        
-        cutoff_date = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-        cutoff_date = cutoff_date.replace(day=cutoff_date.day - days_old)
+        cutoff = (datetime.utcnow() - timedelta(days=days_old)).isoformat()
         
-        deleted_count = 0
+        if not self._use_firestore:
+            deleted_count = 0
+            for user_id, times in self._log_times.items():
+                # Entries are in timestamp order, so the old ones form a prefix
+                old = bisect.bisect_left(times, cutoff)
+                del times[:old]
+                del self._logs[user_id][:old]
+                deleted_count += old
+            return deleted_count
         
+        self.flush()
         try:
-            # This would require a more complex query structure in Firestore
-            # For now, we'll just log the cleanup attempt
-            self._logger.info(f"Cleanup requested for logs older than {days_old} days")
+            try:
+                deleted_count = delete_documents(self._db, self._old_log_refs(cutoff))
+            except MISSING_INDEX_ERRORS as e:
+                self._logger.warning(
+                    f"Firestore index missing for log cleanup ({CLEANUP_INDEX}); "
+                    f"cleaning up user by user instead: {e}"
+                )
+                deleted_count = delete_documents(self._db, self._old_log_refs_by_user(cutoff))
+            self._logger.info(f"Cleaned up {deleted_count} old logs")
         except Exception as e:
             self._logger.error(f"Error during log cleanup: {e}")
+            deleted_count = 0
         
         return deleted_count
     
+    def _old_log_refs(self, cutoff: str) -> Iterator[Any]:
+        """References of this logger's Firestore entries older than cutoff, from one collection group query."""
+        # Collection groups span the database; document paths are relative
+        # to it ("<collection>/user_<id>/logs/<log id>"), so keep this
+        # logger's collection only
+        prefix = f"{self.collection_name}/"
+        docs = self._db.collection_group("logs").where("timestamp", "<", cutoff).select([]).stream()
+        return (doc.reference for doc in docs if doc.reference.path.startswith(prefix))
+    
+    def _old_log_refs_by_user(self, cutoff: str) -> Iterator[Any]:
+        """References of this logger's Firestore entries older than cutoff, one user at a time."""
+        # list_documents() also yields user documents that only hold a subcollection
+        for user_doc in self._collection.list_documents():
+            docs = user_doc.collection("logs").where("timestamp", "<", cutoff).select([]).stream()
+            for doc in docs:
+                yield doc.reference
+    
     def get_log_statistics(self, user_id: str) -> Dict[str, Any]:
         """
         Get log statistics for a user.
@@ -398,7 +732,10 @@ class ReasoningLogger:
         Returns:
             Dictionary with log statistics
         """
-        logs = self.get_logs(user_id, limit=1000)
+        # Only the fields counted below are fetched, not the entry details
+        logs = list(self.iter_logs(
+            user_id, page_size=1000, limit=1000, fields=["session_id", "step", "timestamp"]
+        ))
         
         if not logs:
             return {
@@ -409,25 +746,24 @@ class ReasoningLogger:
                 "errors": 0
             }
         
-        sessions = set(log.get("session_id") for log in logs)
+        sessions = set()
         step_types = {}
-        errors = 0
+        timestamps = []
         
         for log in logs:
+            sessions.add(log.get("session_id"))
             step = log.get("step", "")
             step_types[step] = step_types.get(step, 0) + 1
-            
-            if step == "error":
-                errors += 1
+            timestamps.append(log.get("timestamp", ""))
         
         return {
             "user_id": user_id,
             "total_logs": len(logs),
             "sessions": len(sessions),
             "step_types": step_types,
-            "errors": errors,
+            "errors": step_types.get("error", 0),
             "date_range": {
-                "earliest": min(log.get("timestamp", "") for log in logs),
-                "latest": max(log.get("timestamp", "") for log in logs)
+                "earliest": min(timestamps),
+                "latest": max(timestamps)
             }
         } 
\ No newline at end of file
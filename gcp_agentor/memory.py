@@ -5,10 +5,16 @@ Shared memory layer using Firestore for persistent storage and context managemen
 """
 
 import os
-import json
+import copy
+import functools
 import logging
-from typing import Any, Dict, Optional, List
+import threading
+import uuid
+from typing import Any, Dict, Optional, List, Tuple
 from datetime import datetime, timedelta
+from ._compat import json_bytes, json_loads
+from .batcher import delete_documents
+from .cache import TTLCache
 
 try:
     from google.cloud import firestore
@@ -18,6 +24,242 @@ except ImportError:
     FIRESTORE_AVAILABLE = False
     firestore = None
 
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+    zstandard = None
+
+# Conversation messages kept per user
+MAX_HISTORY = 100
+
+# Appends to a user's Firestore history between two prunes
+HISTORY_PRUNE_INTERVAL = 10
+
+# Session fields stored in the compressed blob (the rest stay queryable)
+COMPRESSED_FIELDS = ("context", "conversation_history")
+
+# Format version of the compressed blob
+BLOB_SCHEMA = 1
+
+# Document fields written by SessionDocuments.pack besides the uncompressed session fields
+BLOB_FIELDS = ("blob", "blob_schema", "blob_updated")
+
+# Key of the unique id given to history entries appended with ArrayUnion
+# (which skips values equal to an element already in the array, so it would
+# drop repeated messages); removed again when sessions are read
+HISTORY_ENTRY_ID = "_entry_id"
+
+# Users tracked in the per-user bookkeeping caches, and how long for
+USER_STATE_SIZE = 1024
+USER_STATE_TTL = 3600
+
+
+def _history_entry(message: Dict[str, Any]) -> Dict[str, Any]:
+    """Give a conversation message a timestamp (in place) if it has none."""
+    if "timestamp" not in message:
+        message["timestamp"] = datetime.utcnow().isoformat()
+    return message
+
+
+def _union_entry(message: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy of a history entry with a unique HISTORY_ENTRY_ID, for appending with ArrayUnion."""
+    return {**message, HISTORY_ENTRY_ID: uuid.uuid4().hex}
+
+
+class SessionDocuments:
+    """
+    Layout of session documents in Firestore.
+    
+    Shared by MemoryManager and AsyncMemoryManager: it builds the data of
+    their document writes and keeps the per-user state the writes depend
+    on, so the managers only make the (sync or async) Firestore calls.
+    """
+    
+    def __init__(self, compress: bool = False, unpack_compressed: bool = False):
+        """
+        Initialize the document layout.
+        
+        Args:
+            compress: Pack context and conversation history into one
+                zstd-compressed blob (needs zstandard)
+            unpack_compressed: Check a user's document for a compressed blob
+                before the first uncompressed write, even if no read saw one
+        """
+        self.unpack_compressed = unpack_compressed
+        self._compressor = None
+        self._decompressor = None
+        if compress:
+            if ZSTD_AVAILABLE:
+                self._compressor = zstandard.ZstdCompressor(level=3)
+                self._decompressor = zstandard.ZstdDecompressor()
+            else:
+                logging.getLogger(__name__).warning("zstandard not available. Storing sessions uncompressed.")
+        # Firestore history appends per user since the last prune
+        self._appends = TTLCache(USER_STATE_SIZE, USER_STATE_TTL)
+        # Whether each user's document had a compressed blob when last read
+        self._blob_users = TTLCache(USER_STATE_SIZE, USER_STATE_TTL)
+    
+    @property
+    def compressed(self) -> bool:
+        """Whether sessions are written as compressed blobs."""
+        return self._compressor is not None
+    
+    def pack(self, session: Dict[str, Any]) -> Dict[str, Any]:
+        """Move the large session fields into a compressed blob."""
+        packed = {key: value for key, value in session.items() if key not in COMPRESSED_FIELDS}
+        blob = {key: session[key] for key in COMPRESSED_FIELDS if key in session}
+        packed["blob"] = self._compressor.compress(json_bytes(blob))
+        packed["blob_schema"] = BLOB_SCHEMA
+        packed["blob_updated"] = datetime.utcnow().isoformat()
+        return packed
+    
+    def unpack(self, document: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Restore the fields of a session document stored by pack().
+        
+        Managers with different compress settings may leave both a blob and
+        uncompressed fields in one document; fields in both are taken from
+        whichever was written last (``blob_updated`` vs ``last_updated``).
+        
+        Args:
+            document: Stored document data
+        
+        Returns:
+            Session data dictionary
+        """
+        if "blob" not in document:
+            return document
+        if self._decompressor is None:
+            if not ZSTD_AVAILABLE:
+                raise RuntimeError("zstandard is needed to read compressed sessions")
+            self._decompressor = zstandard.ZstdDecompressor()
+        session = {key: value for key, value in document.items() if key not in BLOB_FIELDS}
+        blob = json_loads(self._decompressor.decompress(document["blob"]))
+        if document.get("blob_updated", "") >= document.get("last_updated", ""):
+            session.update(blob)
+        else:
+            for key, value in blob.items():
+                session.setdefault(key, value)
+        return session
+    
+    def load(self, user_id: str, document: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Build a session from its Firestore document.
+        
+        Whether the document has a blob is remembered for needs_blob_check().
+        History appends are only pruned every few writes, so the history
+        read back is trimmed to the last MAX_HISTORY messages here, and
+        their HISTORY_ENTRY_IDs are removed.
+        
+        Args:
+            user_id: User identifier
+            document: Stored document data (possibly only some fields)
+        
+        Returns:
+            Session data dictionary
+        """
+        self._blob_users.set(user_id, "blob" in document)
+        session = self.unpack(document)
+        history = session.get("conversation_history")
+        if history:
+            session["conversation_history"] = [
+                {key: value for key, value in entry.items() if key != HISTORY_ENTRY_ID}
+                if HISTORY_ENTRY_ID in entry else entry
+                for entry in history[-MAX_HISTORY:]
+            ]
+        return session
+    
+    def packed_write(self, session: Dict[str, Any]) -> Dict[str, Any]:
+        """Merge write storing a session packed and deleting its uncompressed fields."""
+        return {**self.pack(session), **{key: firestore.DELETE_FIELD for key in COMPRESSED_FIELDS}}
+    
+    def unpacked_write(self, document: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Merge write storing a packed document uncompressed (None if it has no blob)."""
+        if "blob" not in document:
+            return None
+        return {**self.unpack(document), **{key: firestore.DELETE_FIELD for key in BLOB_FIELDS}}
+    
+    def needs_blob_check(self, user_id: str) -> bool:
+        """
+        Whether a user's document must be read (and unpacked) before an uncompressed write.
+        
+        True if the last read saw a blob, so the document does not keep a
+        stale one, and, with unpack_compressed, if no read happened yet.
+        
+        Args:
+            user_id: User identifier
+        
+        Returns:
+            True if the document should be checked for a blob
+        """
+        has_blob = self._blob_users.get(user_id)
+        return has_blob is True or (has_blob is None and self.unpack_compressed)
+    
+    def blob_checked(self, user_id: str) -> None:
+        """Record that a user's document holds no blob (any more)."""
+        self._blob_users.set(user_id, False)
+    
+    @staticmethod
+    def field_write(data: Dict[str, Any], fields: List[Any]) -> Tuple[Dict[str, Any], List[Any]]:
+        """Data and merge field paths overwriting some fields and ``last_updated``."""
+        return {**data, "last_updated": datetime.utcnow().isoformat()}, [*fields, "last_updated"]
+    
+    @staticmethod
+    def append_data(message: Dict[str, Any]) -> Dict[str, Any]:
+        """Field data appending a message to the stored history with ArrayUnion."""
+        return {"conversation_history": firestore.ArrayUnion([_union_entry(_history_entry(message))])}
+    
+    @staticmethod
+    def append(session: Dict[str, Any], message: Dict[str, Any]) -> None:
+        """Append a message to a session's history in place, keeping MAX_HISTORY messages."""
+        history = session.setdefault("conversation_history", [])
+        history.append(_history_entry(message))
+        
+        # Trim in place (no copy of the list) and keep a plain list for
+        # exports and callers
+        if len(history) > MAX_HISTORY:
+            del history[:-MAX_HISTORY]
+        
+        session["last_updated"] = datetime.utcnow().isoformat()
+    
+    def count_append(self, user_id: str) -> bool:
+        """
+        Count a history append for a user.
+        
+        Args:
+            user_id: User identifier
+        
+        Returns:
+            True every HISTORY_PRUNE_INTERVAL appends, when the stored
+            history should be pruned
+        """
+        appends = self._appends.get(user_id, 0) + 1
+        due = appends >= HISTORY_PRUNE_INTERVAL
+        self._appends.set(user_id, 0 if due else appends)
+        return due
+    
+    def forget_appends(self, user_id: str) -> None:
+        """Reset a user's append count (after the history was cleared)."""
+        self._appends.pop(user_id)
+    
+    @staticmethod
+    def pruned_history(document: Dict[str, Any]) -> Optional[List[Dict[str, Any]]]:
+        """
+        Pruned history of a stored document read with its raw history.
+        
+        Args:
+            document: Stored document data
+        
+        Returns:
+            The last MAX_HISTORY messages, or None if the history is not longer
+        """
+        history = document.get("conversation_history") or []
+        if len(history) > MAX_HISTORY:
+            return history[-MAX_HISTORY:]
+        return None
+
 
 class MemoryManager:
     """
@@ -27,32 +269,113 @@ class MemoryManager:
     and conversation history for multi-agent systems.
     """
     
-    def __init__(self, project_id: Optional[str] = None, collection_name: str = "agentor_memory"):
+    def __init__(
+        self, 
+        project_id: Optional[str] = None, 
+        collection_name: str = "agentor_memory",
+        session_cache_ttl: float = 5.0,
+        compress: bool = False,
+        unpack_compressed: bool = False
+    ):
         """
         Initialize the memory manager.
         
         Args:
             project_id: GCP project ID (uses default if not provided)
             collection_name: Firestore collection name for memory storage
+            session_cache_ttl: Seconds a session read from Firestore is reused
+                (0 disables the cache)
+            compress: Store context and conversation history in Firestore
+                as one zstd-compressed blob (needs zstandard). Compressed
+                sessions are rewritten as a whole on every change.
+            unpack_compressed: Check each user's document for a blob left by
+                a compress=True manager before its first uncompressed write
+                (one extra read per user). Without it, only blobs seen by
+                reads are unpacked.
         """
         self.project_id = project_id or os.getenv("GCP_PROJECT_ID")
         self.collection_name = collection_name
         self._logger = logging.getLogger(__name__)
+        self._memory: Dict[str, Dict[str, Any]] = {}
+        
+        # The Firestore client is created on first use (see _use_firestore)
+        self._db = None
+        self._collection = None
+        self._firestore_enabled = FIRESTORE_AVAILABLE
+        self._connect_lock = threading.Lock()
+        # Builds the document writes; shared logic with AsyncMemoryManager
+        self._documents = SessionDocuments(compress, unpack_compressed)
+        # Sessions read from Firestore; writes through this manager invalidate them
+        self._session_cache = TTLCache(1024, session_cache_ttl) if session_cache_ttl > 0 else None
+        # Session document references, reused across calls for the same user
+        self._user_doc = functools.lru_cache(maxsize=1024)(self._make_user_doc)
         
         if not FIRESTORE_AVAILABLE:
             self._logger.warning("Firestore not available. Using in-memory storage.")
-            self._use_firestore = False
-            self._memory: Dict[str, Dict[str, Any]] = {}
-        else:
-            self._use_firestore = True
+    
+    @property
+    def _use_firestore(self) -> bool:
+        """Whether Firestore backs this manager, connecting on first access."""
+        if self._collection is None and self._firestore_enabled:
+            self._connect()
+        return self._firestore_enabled
+    
+    def _connect(self) -> None:
+        """Create the Firestore client, falling back to in-memory storage."""
+        with self._connect_lock:
+            if self._collection is not None or not self._firestore_enabled:
+                return
             try:
                 self._db = firestore.Client(project=self.project_id)
-                self._collection = self._db.collection(collection_name)
-                self._logger.info(f"Initialized Firestore memory manager with collection: {collection_name}")
+                self._collection = self._db.collection(self.collection_name)
+                self._logger.info(f"Initialized Firestore memory manager with collection: {self.collection_name}")
             except Exception as e:
                 self._logger.error(f"Failed to initialize Firestore: {e}. Falling back to in-memory storage.")
-                self._use_firestore = False
-                self._memory = {}
+                self._firestore_enabled = False
+    
+    def _make_user_doc(self, user_id: str) -> Any:
+        """Build the Firestore reference of a user's session document."""
+        return self._collection.document(f"user_{user_id}")
+    
+    @property
+    def _partial_writes(self) -> bool:
+        """Whether single session fields can be written (Firestore without compression)."""
+        return not self._documents.compressed and self._use_firestore
+    
+    def _drop_blob(self, user_id: str) -> None:
+        """
+        Turn a user's compressed session document into uncompressed fields.
+        
+        Called before uncompressed writes, so a document packed by a manager
+        with compress=True does not keep a stale blob. Only documents last
+        read with a blob are unpacked, and, with unpack_compressed, users not
+        read yet (at the cost of one read per user and manager; see
+        SessionDocuments.needs_blob_check).
+        
+        Args:
+            user_id: User identifier
+        """
+        if not self._documents.needs_blob_check(user_id):
+            return
+        try:
+            doc_ref = self._user_doc(user_id)
+            doc = doc_ref.get()
+            write = self._documents.unpacked_write((doc.to_dict() or {}) if doc.exists else {})
+            if write is not None:
+                doc_ref.set(write, merge=True)
+        except Exception as e:
+            self._logger.error(f"Error unpacking session for user {user_id}: {e}")
+            return
+        self._documents.blob_checked(user_id)
+    
+    def warm_up(self) -> bool:
+        """
+        Connect to Firestore now instead of on the first request.
+        
+        Returns:
+            True if Firestore is used, False if storage is in-memory
+        """
+        return self._use_firestore
     
     def get_session(self, user_id: str) -> Dict[str, Any]:
         """
@@ -65,15 +388,22 @@ class MemoryManager:
             Dictionary containing all session data
         """
         if self._use_firestore:
+            if self._session_cache is not None:
+                cached = self._session_cache.get(user_id)
+                if cached is not None:
+                    # Callers may modify the session they get back
+                    return copy.deepcopy(cached)
             try:
-                doc_ref = self._collection.document(f"user_{user_id}")
+                doc_ref = self._user_doc(user_id)
                 doc = doc_ref.get()
-                if doc.exists:
-                    return doc.to_dict() or {}
-                return {}
+                document = (doc.to_dict() or {}) if doc.exists else {}
+                session = self._documents.load(user_id, document)
             except Exception as e:
                 self._logger.error(f"Error getting session for user {user_id}: {e}")
                 return {}
+            if self._session_cache is not None:
+                self._session_cache.set(user_id, copy.deepcopy(session))
+            return session
         else:
             return self._memory.get(f"user_{user_id}", {})
     
@@ -86,15 +416,36 @@ class MemoryManager:
             data: Session data to save
         """
         if self._use_firestore:
+            if self._documents.compressed:
+                # The blob holds several fields, so merge on this side
+                data = {**self.get_session(user_id), **data}
+            self.invalidate(user_id)
             try:
-                doc_ref = self._collection.document(f"user_{user_id}")
-                doc_ref.set(data, merge=True)
+                doc_ref = self._user_doc(user_id)
+                if self._documents.compressed:
+                    doc_ref.set(self._documents.packed_write(data), merge=True)
+                else:
+                    self._drop_blob(user_id)
+                    doc_ref.set(data, merge=True)
                 self._logger.debug(f"Saved session for user {user_id}")
             except Exception as e:
                 self._logger.error(f"Error saving session for user {user_id}: {e}")
         else:
             self._memory[f"user_{user_id}"] = data
     
+    def invalidate(self, user_id: str) -> None:
+        """
+        Forget the cached Firestore session of a user.
+        
+        Needed only when the session document was changed by someone else
+        (another process or a direct Firestore write).
+        
+        Args:
+            user_id: User identifier
+        """
+        if self._session_cache is not None:
+            self._session_cache.pop(user_id)
+    
     def get_context(self, user_id: str, key: str) -> Any:
         """
         Get a specific context value for a user.
@@ -106,9 +457,30 @@ class MemoryManager:
         Returns:
             The context value or None if not found
         """
-        session = self.get_session(user_id)
+        if self._partial_writes:
+            cached = self._session_cache.get(user_id) if self._session_cache is not None else None
+            if cached is None:
+                return self._fetch_context_value(user_id, key)
+            session = copy.deepcopy(cached)
+        else:
+            session = self.get_session(user_id)
         return session.get("context", {}).get(key)
     
+    def _fetch_context_value(self, user_id: str, key: str) -> Any:
+        """Read a single context value from Firestore instead of the whole session."""
+        try:
+            # The blob fields only exist on documents packed by compress=True
+            doc = self._user_doc(user_id).get(
+                field_paths=[firestore.FieldPath("context", key).to_api_repr(), *BLOB_FIELDS, "last_updated"]
+            )
+            if not doc.exists:
+                return None
+            document = doc.to_dict() or {}
+            return (self._documents.load(user_id, document).get("context") or {}).get(key)
+        except Exception as e:
+            self._logger.error(f"Error getting context for user {user_id}: {e}")
+            return None
+    
     def set_context(self, user_id: str, key: str, value: Any) -> None:
         """
         Set a specific context value for a user.
@@ -118,6 +490,16 @@ class MemoryManager:
             key: Context key
             value: Context value to set
         """
+        if self._partial_writes:
+            # Write just this key (no read, no full-document rewrite)
+            self._merge(
+                user_id,
+                {"context": {key: value}},
+                [firestore.FieldPath("context", key)],
+                f"setting context for user {user_id}"
+            )
+            return
+        
         session = self.get_session(user_id)
         if "context" not in session:
             session["context"] = {}
@@ -148,21 +530,20 @@ class MemoryManager:
             user_id: User identifier
             message: Message to add to history
         """
-        session = self.get_session(user_id)
-        if "conversation_history" not in session:
-            session["conversation_history"] = []
-        
-        # Add timestamp if not present
-        if "timestamp" not in message:
-            message["timestamp"] = datetime.utcnow().isoformat()
-        
-        session["conversation_history"].append(message)
-        
-        # Keep only last 100 messages to prevent memory bloat
-        if len(session["conversation_history"]) > 100:
-            session["conversation_history"] = session["conversation_history"][-100:]
+        if self._partial_writes:
+            # Append in place; the history is trimmed every few appends
+            self._merge(
+                user_id,
+                self._documents.append_data(message),
+                ["conversation_history"],
+                f"adding conversation message for user {user_id}"
+            )
+            if self._documents.count_append(user_id):
+                self._prune_history(user_id)
+            return
         
-        session["last_updated"] = datetime.utcnow().isoformat()
+        session = self.get_session(user_id)
+        self._documents.append(session, message)
         self.save_session(user_id, session)
     
     def clear_context(self, user_id: str) -> None:
@@ -172,6 +553,10 @@ class MemoryManager:
         Args:
             user_id: User identifier
         """
+        if self._partial_writes:
+            self._merge(user_id, {"context": {}}, ["context"], f"clearing context for user {user_id}")
+            return
+        
         session = self.get_session(user_id)
         session["context"] = {}
         session["last_updated"] = datetime.utcnow().isoformat()
@@ -184,11 +569,60 @@ class MemoryManager:
         Args:
             user_id: User identifier
         """
+        if self._partial_writes:
+            self._merge(
+                user_id,
+                {"conversation_history": []},
+                ["conversation_history"],
+                f"clearing conversation history for user {user_id}"
+            )
+            self._documents.forget_appends(user_id)
+            return
+        
         session = self.get_session(user_id)
         session["conversation_history"] = []
         session["last_updated"] = datetime.utcnow().isoformat()
         self.save_session(user_id, session)
     
+    def _merge(self, user_id: str, data: Dict[str, Any], fields: List[Any], action: str) -> None:
+        """
+        Overwrite some fields of a user's session document.
+        
+        Only the given fields (and ``last_updated``) are sent; the document
+        is created if it does not exist yet.
+        
+        Args:
+            user_id: User identifier
+            data: Values for the fields
+            fields: Field paths to overwrite
+            action: Description used in the error log
+        """
+        self.invalidate(user_id)
+        self._drop_blob(user_id)
+        data, fields = self._documents.field_write(data, fields)
+        try:
+            doc_ref = self._user_doc(user_id)
+            doc_ref.set(data, merge=fields)
+        except Exception as e:
+            self._logger.error(f"Error {action}: {e}")
+    
+    def _prune_history(self, user_id: str) -> None:
+        """Trim a user's Firestore conversation history to the last MAX_HISTORY messages."""
+        # Read the stored history itself; get_session() returns it trimmed
+        try:
+            doc = self._user_doc(user_id).get(field_paths=["conversation_history"])
+        except Exception as e:
+            self._logger.error(f"Error reading conversation history for user {user_id}: {e}")
+            return
+        history = self._documents.pruned_history((doc.to_dict() or {}) if doc.exists else {})
+        if history is not None:
+            self._merge(
+                user_id,
+                {"conversation_history": history},
+                ["conversation_history"],
+                f"pruning conversation history for user {user_id}"
+            )
+    
     def delete_session(self, user_id: str) -> None:
         """
         Delete all session data for a user.
@@ -197,8 +631,9 @@ class MemoryManager:
             user_id: User identifier
         """
         if self._use_firestore:
+            self.invalidate(user_id)
             try:
-                doc_ref = self._collection.document(f"user_{user_id}")
+                doc_ref = self._user_doc(user_id)
                 doc_ref.delete()
                 self._logger.info(f"Deleted session for user {user_id}")
             except Exception as e:
@@ -225,7 +660,7 @@ class MemoryManager:
             "message_count": len(history),
             "last_updated": session.get("last_updated"),
             "created_at": session.get("created_at"),
-            "context_size": len(json.dumps(session.get("context", {})))
+            "context_size": len(json_bytes(session.get("context", {})))
         }
     
     def cleanup_old_sessions(self, days_old: int = 30) -> int:
@@ -246,10 +681,10 @@ class MemoryManager:
         deleted_count = 0
         
         try:
-            docs = self._collection.where("last_updated", "<", cutoff_date.isoformat()).stream()
-            for doc in docs:
-                doc.reference.delete()
-                deleted_count += 1
+            docs = self._collection.where("last_updated", "<", cutoff_date.isoformat()).select([]).stream()
+            deleted_count = delete_documents(self._db, (doc.reference for doc in docs))
+            if self._session_cache is not None:
+                self._session_cache.clear()
             
             self._logger.info(f"Cleaned up {deleted_count} old sessions")
         except Exception as e:
@@ -268,7 +703,7 @@ class MemoryManager:
             JSON string representation of session data
         """
         session = self.get_session(user_id)
-        return json.dumps(session, indent=2, default=str)
+        return json_bytes(session, indent=True).decode()
     
     def import_session(self, user_id: str, json_data: str) -> bool:
         """
@@ -282,7 +717,7 @@ class MemoryManager:
             True if import was successful, False otherwise
         """
         try:
-            data = json.loads(json_data)
+            data = json_loads(json_data)
             self.save_session(user_id, data)
             return True
         except Exception as e:
@@ -5,14 +5,38 @@ Routes ACP messages to appropriate agents based on intent and context.
 """
 
 import time
+import types
+import hashlib
+import functools
 import logging
-from typing import Any, Dict, List, Optional, Tuple
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple, Union
 from .agent_registry import AgentRegistry
 from .memory import MemoryManager
 from .invoker import AgentInvoker
 from .logger import ReasoningLogger, ReasoningStep
 from .acp import ACPMessage
 
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+    ahocorasick = None
+
+# Shared read-only stand-in for a missing message context
+_EMPTY_CONTEXT = types.MappingProxyType({})
+
+# Keywords detecting each intent; earlier intents win when several match
+INTENT_KEYWORDS: Dict[str, Tuple[str, ...]] = {
+    "get_crop_advice": ("crop", "plant", "grow", "harvest"),
+    "get_weather": ("weather", "rain", "temperature", "climate"),
+    "pest_control": ("pest", "disease", "insect", "treatment"),
+    "soil_analysis": ("soil", "ph", "nutrient", "fertilizer"),
+    "market_prices": ("price", "market", "cost", "sell"),
+}
+
 
 class AgentRouter:
     """
@@ -26,7 +50,8 @@ class AgentRouter:
         registry: AgentRegistry, 
         memory: MemoryManager,
         invoker: Optional[AgentInvoker] = None,
-        logger: Optional[ReasoningLogger] = None
+        logger: Optional[ReasoningLogger] = None,
+        max_workers: int = 8
     ):
         """
         Initialize the agent router.
@@ -36,24 +61,41 @@ class AgentRouter:
             memory: Memory manager instance
             invoker: Agent invoker instance (optional)
             logger: Reasoning logger instance (optional)
+            max_workers: Maximum number of tool chain steps run concurrently
         """
         self.registry = registry
         self.memory = memory
         self.invoker = invoker or AgentInvoker()
         self.logger = logger or ReasoningLogger()
         self._logger = logging.getLogger(__name__)
+        self.max_workers = max_workers
+        # Runs independent tool chain steps; created on first use
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+        # Keyword-based intent detection for messages without an intent
+        self._intent_keywords: Dict[str, Tuple[str, ...]] = dict(INTENT_KEYWORDS)
+        self._rebuild_intent_matcher()
         
         # Intent to agent mapping
-        self._intent_mapping = {
-            "get_crop_advice": ["crop_advisor"],
-            "get_weather": ["weather"],
-            "pest_control": ["pest_assistant"],
-            "soil_analysis": ["soil_analyzer"],
-            "market_prices": ["market_agent"],
-            "general_help": ["general_assistant"]
+        self._intent_mapping: Dict[str, Tuple[str, ...]] = {
+            "get_crop_advice": ("crop_advisor",),
+            "get_weather": ("weather",),
+            "pest_control": ("pest_assistant",),
+            "soil_analysis": ("soil_analyzer",),
+            "market_prices": ("market_agent",),
+            "general_help": ("general_assistant",)
         }
+        # Agents selected per intent, valid for one registry version
+        self._selected: Dict[str, Tuple[str, ...]] = {}
+        self._selected_version = -1
+        # Invocation callable per agent name (None for missing agents),
+        # valid for one registry version
+        self._dispatch: Dict[str, Optional[Callable[[str, Dict[str, Any]], Any]]] = {}
+        self._dispatch_version = -1
         
-        # Tool chain definitions
+        # Tool chain definitions. A step may list the indices of the earlier
+        # steps it needs in "depends_on"; steps without it need all earlier
+        # steps. Steps whose dependencies are done run concurrently.
         self._tool_chains = {
             "comprehensive_advice": [
                 {"agent": "weather", "purpose": "get_weather_data"},
@@ -61,28 +103,50 @@ class AgentRouter:
                 {"agent": "pest_assistant", "purpose": "get_pest_advice"}
             ]
         }
+        # Agent names of each tool chain, in step order
+        self._tool_chain_agents: Dict[str, Tuple[str, ...]] = {
+            name: tuple(step["agent"] for step in steps)
+            for name, steps in self._tool_chains.items()
+        }
     
-    def route(self, acp_message: Dict[str, Any]) -> Dict[str, Any]:
+    def route(self, acp_message: Union[ACPMessage, Dict[str, Any]]) -> Dict[str, Any]:
         """
         Route an ACP message to the appropriate agent(s).
         
+        The reasoning log entries of the request are stored together once
+        it has been handled.
+        
         Args:
-            acp_message: ACP message dictionary
+            acp_message: Parsed ACPMessage, or an ACP message dictionary
             
         Returns:
             Response dictionary with agent response and metadata
         """
-        start_time = time.time()
+        with self.logger.batch():
+            return self._route(acp_message)
+    
+    def _route(self, acp_message: Union[ACPMessage, Dict[str, Any]]) -> Dict[str, Any]:
+        """Route an ACP message (see route())."""
+        start_time = time.perf_counter()
         
         try:
-            # Parse the ACP message
-            message = ACPMessage.from_dict(acp_message)
-            if not message.is_valid():
+            # Parse the ACP message unless the caller already did
+            if isinstance(acp_message, ACPMessage):
+                message = acp_message
+                if not message.is_valid():
+                    return self._create_error_response("Invalid ACP message format")
+            elif ACPMessage.validate_dict(acp_message):
+                message = ACPMessage.from_dict(acp_message)
+            else:
                 return self._create_error_response("Invalid ACP message format")
             
             # Extract user ID from from_id
-            user_id = self._extract_user_id(message.from_id)
+            from_id = message.from_id
+            user_id = from_id[5:] if from_id[:5] == "user:" else from_id
             session_id = message.session_id
+            # Fallbacks resolved once per request
+            step_session_id = session_id or "default"
+            message_context = message.context or _EMPTY_CONTEXT
             
             # Log the incoming message
             self.logger.log(
@@ -99,7 +163,7 @@ class AgentRouter:
             )
             
             # Select appropriate agent(s)
-            selected_agents = self._select_agents(intent, message.context or {})
+            selected_agents = self._select_agents(intent, message_context)
             if not selected_agents:
                 return self._create_error_response(f"No agent found for intent: {intent}")
             
@@ -107,17 +171,22 @@ class AgentRouter:
             self.logger.log_agent_selection(
                 user_id, intent, selected_agents[0], 
                 self.registry.list_active(), 
-                "Intent-based routing", session_id or "default"
+                "Intent-based routing", step_session_id
             )
             
             # Execute tool chain if needed
             if len(selected_agents) > 1:
-                response = self._execute_tool_chain(selected_agents, message, user_id, session_id or "default")
+                steps = self._tool_chains.get(message_context.get("tool_chain"))
+                response = self._execute_tool_chain(
+                    selected_agents, message, user_id, step_session_id, message_context, steps
+                )
             else:
-                response = self._invoke_single_agent(selected_agents[0], message, user_id, session_id or "default")
+                response = self._invoke_single_agent(
+                    selected_agents[0], message, user_id, step_session_id, message_context
+                )
             
             # Calculate execution time
-            execution_time = time.time() - start_time
+            execution_time = time.perf_counter() - start_time
             
             # Log the response
             self.logger.log(
@@ -129,20 +198,26 @@ class AgentRouter:
             
             # Add response metadata
             response["execution_time"] = execution_time
+            response["intent"] = intent
             response["session_id"] = session_id
             response["user_id"] = user_id
             
             return response
             
         except Exception as e:
-            self._logger.error(f"Error in routing: {e}")
-            return self._create_error_response(f"Routing error: {str(e)}")
+            # Message validation happens up front, so only unexpected errors
+            # end up here; the traceback is logged when debugging
+            message_text = str(e)
+            self._logger.error(
+                f"Error in routing: {message_text}",
+                exc_info=self._logger.isEnabledFor(logging.DEBUG)
+            )
+            return self._create_error_response(f"Routing error: {message_text}")
     
     def _extract_user_id(self, from_id: str) -> str:
         """Extract user ID from from_id field."""
-        if from_id.startswith("user:"):
-            return from_id[5:]  # Remove "user:" prefix
-        return from_id
+        # Slice compare instead of startswith(): no method call
+        return from_id[5:] if from_id[:5] == "user:" else from_id
     
     def _analyze_intent(self, message: ACPMessage) -> str:
         """
@@ -159,22 +234,30 @@ class AgentRouter:
             return message.intent
         
         # Simple keyword-based intent detection
-        message_lower = message.message.lower()
-        
-        if any(word in message_lower for word in ["crop", "plant", "grow", "harvest"]):
-            return "get_crop_advice"
-        elif any(word in message_lower for word in ["weather", "rain", "temperature", "climate"]):
-            return "get_weather"
-        elif any(word in message_lower for word in ["pest", "disease", "insect", "treatment"]):
-            return "pest_control"
-        elif any(word in message_lower for word in ["soil", "ph", "nutrient", "fertilizer"]):
-            return "soil_analysis"
-        elif any(word in message_lower for word in ["price", "market", "cost", "sell"]):
-            return "market_prices"
-        else:
-            return "general_help"
+        return self._match_intent(message.message.lower()) or "general_help"
+    
+    def _rebuild_intent_matcher(self) -> None:
+        """Build the intent matcher for the current keywords."""
+        # Memoized since the same phrasings keep coming back
+        self._match_intent = functools.lru_cache(maxsize=2048)(
+            _build_intent_matcher(self._intent_keywords)
+        )
+        # In table order: it is the priority order of the intents
+        table = repr(list(self._intent_keywords.items())).encode()
+        self._keywords_fingerprint = hashlib.sha256(table).hexdigest()[:16]
+    
+    @property
+    def keywords_fingerprint(self) -> str:
+        """
+        Digest of the intent keyword table.
+        
+        It changes whenever keywords change what intents are detected, and
+        is stable across restarts, so caches of detected intents can use it
+        in their keys.
+        """
+        return self._keywords_fingerprint
     
-    def _select_agents(self, intent: str, context: Dict[str, Any]) -> List[str]:
+    def _select_agents(self, intent: str, context: Mapping[str, Any]) -> Sequence[str]:
         """
         Select appropriate agents for the intent.
         
@@ -183,38 +266,49 @@ class AgentRouter:
             context: Message context
             
         Returns:
-            List of selected agent names
+            Selected agent names
         """
         # Check if this is a tool chain request
-        if context.get("tool_chain"):
-            chain_name = context.get("tool_chain")
-            if chain_name in self._tool_chains:
-                return [step["agent"] for step in self._tool_chains[chain_name]]
+        chain_name = context.get("tool_chain")
+        if chain_name:
+            chain_agents = self._tool_chain_agents.get(chain_name)
+            if chain_agents is not None:
+                return chain_agents
         
+        # The selection only changes with the registry (or the mapping)
+        if self._selected_version != self.registry.version:
+            self._selected = {}
+            self._selected_version = self.registry.version
+        selected = self._selected.get(intent)
+        if selected is None:
+            selected = self._selected[intent] = self._resolve_agents(intent)
+        return selected
+    
+    def _resolve_agents(self, intent: str) -> Tuple[str, ...]:
+        """Look up the agents registered for an intent, with fallbacks."""
         # Direct intent mapping
         if intent in self._intent_mapping:
-            agents = self._intent_mapping[intent]
-            # Filter to only active agents
-            available_agents = [agent for agent in agents if self.registry.is_registered(agent)]
-            return available_agents
+            # Filter to only registered agents
+            return tuple(agent for agent in self._intent_mapping[intent] if self.registry.is_registered(agent))
         
         # Fallback: find agents by intent capability
         agents_by_intent = self.registry.list_by_intent(intent)
         if agents_by_intent:
-            return agents_by_intent
+            return tuple(agents_by_intent)
         
         # Final fallback: general assistant
         if self.registry.is_registered("general_assistant"):
-            return ["general_assistant"]
+            return ("general_assistant",)
         
-        return []
+        return ()
     
     def _invoke_single_agent(
         self, 
         agent_name: str, 
         message: ACPMessage, 
         user_id: str, 
-        session_id: str
+        session_id: str,
+        message_context: Mapping[str, Any]
     ) -> Dict[str, Any]:
         """
         Invoke a single agent.
@@ -224,29 +318,26 @@ class AgentRouter:
             message: ACP message
             user_id: User identifier
             session_id: Session identifier
+            message_context: Context of the message (resolved by route())
             
         Returns:
             Response dictionary
         """
-        start_time = time.time()
+        start_time = time.perf_counter()
         
         try:
             # Get agent from registry
-            agent = self.registry.get(agent_name)
-            if not agent:
+            invoke = self._dispatcher(agent_name)
+            if invoke is None:
                 return self._create_error_response(f"Agent {agent_name} not found")
             
             # Prepare context
-            context = self._prepare_context(user_id, message.context or {})
+            context = self._prepare_context(user_id, message_context)
             
             # Invoke agent
-            if hasattr(agent, 'invoke'):
-                response = agent.invoke(message.message, context)
-            else:
-                # Use invoker for external agents
-                response = self.invoker.invoke(agent_name, message.message, context)
+            response = invoke(message.message, context)
             
-            execution_time = time.time() - start_time
+            execution_time = time.perf_counter() - start_time
             
             # Log the invocation
             self.logger.log_agent_invocation(
@@ -262,7 +353,6 @@ class AgentRouter:
             }
             
         except Exception as e:
-            execution_time = time.time() - start_time
             self.logger.log_error(
                 user_id, "agent_invocation_error", str(e), 
                 context={"agent": agent_name}, session_id=session_id
@@ -271,68 +361,86 @@ class AgentRouter:
     
     def _execute_tool_chain(
         self, 
-        agents: List[str], 
+        agents: Sequence[str], 
         message: ACPMessage, 
         user_id: str, 
-        session_id: str
+        session_id: str,
+        message_context: Mapping[str, Any],
+        steps: Optional[List[Dict[str, Any]]] = None
     ) -> Dict[str, Any]:
         """
         Execute a tool chain of multiple agents.
         
+        Steps run in waves: a wave holds the steps whose dependencies have
+        completed, and its steps are invoked concurrently. Results of the
+        earlier waves are passed in ``context["previous_results"]``.
+        
         Args:
             agents: List of agent names
             message: ACP message
             user_id: User identifier
             session_id: Session identifier
+            message_context: Context of the message (resolved by route())
+            steps: Tool chain step definitions matching agents (optional;
+                without them every step depends on the previous ones)
             
         Returns:
             Combined response dictionary
         """
-        chain_results = []
-        context = self._prepare_context(user_id, message.context or {})
-        
-        for i, agent_name in enumerate(agents):
-            try:
-                # Update context with previous results
-                if chain_results:
-                    context["previous_results"] = chain_results
-                
-                # Invoke agent
-                if self.registry.is_registered(agent_name):
-                    agent = self.registry.get(agent_name)
-                    if agent and hasattr(agent, 'invoke'):
-                        result = agent.invoke(message.message, context)
-                    else:
-                        result = self.invoker.invoke(agent_name, message.message, context)
-                else:
-                    result = self.invoker.invoke(agent_name, message.message, context)
+        # Results are stored by step index, so they stay in step order
+        # when a later wave holds lower-numbered steps
+        chain_results: List[Optional[Dict[str, Any]]] = [None] * len(agents)
+        context = self._prepare_context(user_id, message_context)
+        
+        for wave_number, wave in enumerate(self._chain_waves(len(agents), steps)):
+            # Update context with previous results; a tuple, so agents
+            # running concurrently cannot change what the others see
+            if wave_number:
+                context["previous_results"] = tuple(
+                    step_result for step_result in chain_results if step_result is not None
+                )
                 
-                chain_results.append({
-                    "agent": agent_name,
-                    "step": i + 1,
-                    "result": result
-                })
+            if len(wave) == 1:
+                outcomes = [self._run_chain_step(agents[wave[0]], message, context)]
+            else:
+                executor = self._get_executor()
+                futures = [
+                    executor.submit(self._run_chain_step, agents[i], message, context)
+                    for i in wave
+                ]
+                outcomes = [future.result() for future in futures]
                 
-                # Log each step
-                self.logger.log(
-                    user_id, 
-                    "tool_chain_step", 
-                    {"agent": agent_name, "step": i + 1, "result": result}, 
-                    session_id
-                )
+            for i, (result, error) in zip(wave, outcomes):
+                agent_name = agents[i]
+                if error is None:
+                    chain_results[i] = {
+                        "agent": agent_name,
+                        "step": i + 1,
+                        "result": result
+                    }
                 
-            except Exception as e:
-                self.logger.log_error(
-                    user_id, "tool_chain_error", str(e), 
-                    stack_trace=None,
-                    context={"agent": agent_name, "step": i + 1}, 
-                    session_id=session_id
-                )
-                chain_results.append({
-                    "agent": agent_name,
-                    "step": i + 1,
-                    "error": str(e)
-                })
+                    # Log each step
+                    self.logger.log(
+                        user_id, 
+                        "tool_chain_step", 
+                        {"agent": agent_name, "step": i + 1, "result": result}, 
+                        session_id
+                    )
+                else:
+                    self.logger.log_error(
+                        user_id, "tool_chain_error", error, 
+                        stack_trace=None,
+                        context={"agent": agent_name, "step": i + 1}, 
+                        session_id=session_id
+                    )
+                    chain_results[i] = {
+                        "agent": agent_name,
+                        "step": i + 1,
+                        "error": error
+                    }
+        
+        if "previous_results" in context:
+            context["previous_results"] = chain_results
         
         # Combine results
         combined_response = self._combine_tool_chain_results(chain_results)
@@ -340,12 +448,104 @@ class AgentRouter:
         return {
             "success": True,
             "tool_chain": True,
-            "agents": agents,
+            "agents": list(agents),
             "response": combined_response,
             "step_results": chain_results,
             "context": context
         }
     
+    def _run_chain_step(
+        self, 
+        agent_name: str, 
+        message: ACPMessage, 
+        context: Dict[str, Any]
+    ) -> Tuple[Any, Optional[str]]:
+        """Invoke one tool chain agent, returning its result or the error message."""
+        try:
+            invoke = self._dispatcher(agent_name)
+            if invoke is None:
+                return self.invoker.invoke(agent_name, message.message, context), None
+            return invoke(message.message, context), None
+        except Exception as e:
+            return None, str(e)
+    
+    def _dispatcher(self, agent_name: str) -> Optional[Callable[[str, Dict[str, Any]], Any]]:
+        """
+        Get the callable invoking a registered agent.
+        
+        Agents with an ``invoke`` method are called through it; other agents
+        go through the invoker as the type in their ``config["agent_type"]``.
+        Lookups are cached until the registry changes.
+        
+        Args:
+            agent_name: Agent name
+        
+        Returns:
+            Callable taking the message and context, or None if no agent
+            is registered under the name
+        """
+        if self._dispatch_version != self.registry.version:
+            self._dispatch = {}
+            self._dispatch_version = self.registry.version
+        try:
+            return self._dispatch[agent_name]
+        except KeyError:
+            pass
+        
+        agent = self.registry.get(agent_name)
+        if not agent:
+            invoke = None
+        elif hasattr(agent, 'invoke'):
+            invoke = agent.invoke
+        else:
+            # Use invoker for external agents, with the agent type from
+            # their config ("local" unless set, e.g. "vertex")
+            agent_type = self.registry.get_metadata(agent_name).config.get("agent_type", "local")
+            invoke = functools.partial(self.invoker.invoke, agent_name, agent_type=agent_type)
+        self._dispatch[agent_name] = invoke
+        return invoke
+    
+    @staticmethod
+    def _chain_waves(count: int, steps: Optional[List[Dict[str, Any]]]) -> List[List[int]]:
+        """
+        Group tool chain steps into waves of steps that can run together.
+        
+        Args:
+            count: Number of steps
+            steps: Step definitions with optional ``depends_on`` indices
+        
+        Returns:
+            Lists of step indices, in execution order
+        """
+        levels: List[int] = []
+        for i in range(count):
+            step = steps[i] if steps is not None and i < len(steps) else {}
+            depends_on = step.get("depends_on")
+            if depends_on is None:
+                depends_on = range(i)
+            levels.append(max((levels[j] + 1 for j in depends_on if 0 <= j < i), default=0))
+        
+        waves: List[List[int]] = [[] for _ in range(max(levels, default=-1) + 1)]
+        for i, level in enumerate(levels):
+            waves[level].append(i)
+        return waves
+    
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """Return the tool chain thread pool, creating it on first use."""
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers, thread_name_prefix="agentor-chain"
+                    )
+        return self._executor
+    
+    def close(self) -> None:
+        """Shut down the tool chain thread pool."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+    
     def _combine_tool_chain_results(self, results: List[Dict[str, Any]]) -> str:
         """
         Combine results from a tool chain into a single response.
@@ -359,17 +559,16 @@ class AgentRouter:
         if not results:
             return "No results from tool chain"
         
-        combined = []
-        for result in results:
-            agent = result.get("agent", "unknown")
-            if "error" in result:
-                combined.append(f"❌ {agent}: {result['error']}")
-            else:
-                combined.append(f"✅ {agent}: {result.get('result', 'No response')}")
-        
-        return "\n\n".join(combined)
+        # One list comprehension: join() needs a list anyway, and f-strings
+        # are cheaper than str.format
+        return "\n\n".join([
+            f"❌ {result.get('agent', 'unknown')}: {result['error']}"
+            if "error" in result
+            else f"✅ {result.get('agent', 'unknown')}: {result.get('result', 'No response')}"
+            for result in results
+        ])
     
-    def _prepare_context(self, user_id: str, message_context: Dict[str, Any]) -> Dict[str, Any]:
+    def _prepare_context(self, user_id: str, message_context: Mapping[str, Any]) -> Dict[str, Any]:
         """
         Prepare context for agent invocation.
         
@@ -412,26 +611,49 @@ class AgentRouter:
             "agent": None
         }
     
-    def add_intent_mapping(self, intent: str, agents: List[str]) -> None:
+    def add_intent_mapping(
+        self, 
+        intent: str, 
+        agents: List[str], 
+        keywords: Optional[Iterable[str]] = None
+    ) -> None:
         """
         Add or update intent to agent mapping.
         
         Args:
             intent: Intent name
             agents: List of agent names for this intent
+            keywords: Words detecting the intent in messages without an
+                explicit intent (optional; new intents rank after the
+                existing ones)
+        
+        Raises:
+            ValueError: If a keyword is empty or only whitespace (it would
+                match every message)
         """
-        self._intent_mapping[intent] = agents
+        if keywords is not None:
+            keywords = tuple(keyword.lower() for keyword in keywords)
+            if not all(keyword.strip() for keyword in keywords):
+                raise ValueError(f"Empty keyword for intent '{intent}'")
+        
+        self._intent_mapping[intent] = tuple(agents)
+        self._selected = {}
+        if keywords is not None:
+            self._intent_keywords[intent] = keywords
+            self._rebuild_intent_matcher()
         self._logger.info(f"Added intent mapping: {intent} -> {agents}")
     
-    def add_tool_chain(self, name: str, steps: List[Dict[str, str]]) -> None:
+    def add_tool_chain(self, name: str, steps: List[Dict[str, Any]]) -> None:
         """
         Add a new tool chain definition.
         
         Args:
             name: Tool chain name
-            steps: List of steps with agent and purpose
+            steps: List of steps with agent and purpose, and optionally
+                ``depends_on`` with the indices of the earlier steps they need
         """
         self._tool_chains[name] = steps
+        self._tool_chain_agents[name] = tuple(step["agent"] for step in steps)
         self._logger.info(f"Added tool chain: {name} with {len(steps)} steps")
     
     def get_routing_info(self) -> Dict[str, Any]:
@@ -442,8 +664,57 @@ class AgentRouter:
             Dictionary with routing configuration
         """
         return {
-            "intent_mapping": self._intent_mapping,
+            "intent_mapping": {intent: list(agents) for intent, agents in self._intent_mapping.items()},
             "tool_chains": self._tool_chains,
             "registered_agents": self.registry.list_all(),
             "active_agents": self.registry.list_active()
-        } 
\ No newline at end of file
+        }
+
+
+def _build_intent_matcher(keywords: Dict[str, Tuple[str, ...]]) -> Callable[[str], Optional[str]]:
+    """
+    Build a function finding the intent whose keywords occur in a text.
+    
+    With pyahocorasick installed, all keywords are matched in a single pass
+    of an Aho-Corasick automaton; otherwise each keyword is tested with
+    ``in``, in priority order, which beats a regular expression for a
+    handful of short keywords.
+    
+    Args:
+        keywords: Keywords per intent, in priority order
+    
+    Returns:
+        Function taking a lowercased text and returning the first intent
+        (in priority order) with a keyword in it, or None
+    """
+    intents = list(keywords)
+    
+    if AHOCORASICK_AVAILABLE and any(keywords.values()):
+        automaton = ahocorasick.Automaton()
+        for priority, intent in enumerate(intents):
+            for word in keywords[intent]:
+                # A keyword listed for several intents belongs to the first
+                if not automaton.exists(word):
+                    automaton.add_word(word, priority)
+        automaton.make_automaton()
+        
+        def match(text: str) -> Optional[str]:
+            best = None
+            for _, priority in automaton.iter(text):
+                if best is None or priority < best:
+                    best = priority
+                    if best == 0:
+                        break
+            return None if best is None else intents[best]
+        
+        return match
+    
+    pairs = tuple((word, intent) for intent in intents for word in keywords[intent])
+    
+    def match(text: str) -> Optional[str]:
+        for word, intent in pairs:
+            if word in text:
+                return intent
+        return None
+    
+    return match
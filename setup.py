@@ -32,6 +32,9 @@ setup(
         "pydantic>=2.0.0",
     ],
     extras_require={
+        "fast": ["orjson>=3.0.0", "pyahocorasick>=2.0.0"],
+        "cache": ["diskcache>=5.0.0"],
+        "compress": ["zstandard>=0.15.0"],
         "dev": [
             "pytest>=7.0.0",
             "pytest-cov>=4.0.0",
@@ -0,0 +1,65 @@
+"""
+Tests for the ACP message schema.
+"""
+
+import json
+import time
+
+from gcp_agentor.acp import ACPMessage, create_agent_message, create_user_message
+
+
+class TestACPMessage:
+    """Test cases for ACPMessage."""
+    
+    def test_to_json_round_trip(self):
+        """Test that compact and pretty JSON both load back into an equal message."""
+        message = create_user_message("farmer1", "get_weather", "Rain?", context={"location": "Pune"})
+        
+        compact = message.to_json()
+        assert "\n" not in compact
+        assert json.loads(compact) == message.to_dict()
+        assert ACPMessage.from_json(compact) == message
+        assert ACPMessage.from_json(message.to_json(pretty=True)) == message
+    
+    def test_to_json_unsupported_values(self):
+        """Test that non-string keys and arbitrary objects don't break serialization."""
+        message = create_agent_message("a", "b", "intent", "text", context={1: "one", "when": object()})
+        
+        context = json.loads(message.to_json())["context"]
+        assert context["1"] == "one"
+        assert context["when"].startswith("<object")
+    
+    def test_validate_dict_matches_is_valid(self):
+        """Test validate_dict against building the message and calling is_valid."""
+        valid = {"from_id": "user:a", "to_id": "agent:router", "intent": "", "message": "hi"}
+        candidates = [
+            valid,
+            {**valid, "language": "hi-IN", "context": {"crop": "rice"}},
+            {**valid, "language": "x"},
+            {**valid, "context": ["not", "a", "dict"]},
+            {**valid, "message": None},
+        ]
+        for data in candidates:
+            assert ACPMessage.validate_dict(data) == ACPMessage.from_dict(data).is_valid()
+        
+        assert not ACPMessage.validate_dict({key: valid[key] for key in ("from_id", "to_id", "intent")})
+        assert not ACPMessage.validate_dict({**valid, "unknown": 1})
+        assert not ACPMessage.validate_dict("not a dict")
+    
+    def test_lazy_fields_use_creation_time(self):
+        """Test that the default timestamp and session id reflect when the message was made."""
+        before = int(time.time())
+        message = create_user_message("farmer1", "", "hi")
+        after = int(time.time())
+        time.sleep(1.1)
+        
+        assert before <= int(message.session_id[len("session_"):]) <= after
+        assert message.timestamp == message.to_dict()["timestamp"]
+        assert message.timestamp < ACPMessage("a", "b", "c", "d").timestamp
+    
+    def test_explicit_fields_are_kept(self):
+        """Test that given timestamps and session ids are not replaced."""
+        message = ACPMessage("a", "b", "c", "d", timestamp="2024-01-01T00:00:00", session_id="s1")
+        assert message.to_dict()["timestamp"] == "2024-01-01T00:00:00"
+        assert message.session_id == "s1"
+        assert message.context == {}
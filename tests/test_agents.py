@@ -0,0 +1,87 @@
+"""
+Tests for the sample agricultural agents.
+"""
+
+from gcp_agentor.examples.agri_agent import (
+    CropAdvisorAgent, GeneralAssistantAgent, MarketAgent, PestAssistantAgent, WeatherAgent
+)
+
+
+class TestSampleAgents:
+    """Test cases for keyword detection in the sample agents."""
+    
+    def test_crop_advisor_season_keywords(self):
+        """Test season detection from keywords anywhere in the message."""
+        agent = CropAdvisorAgent()
+        assert "Winter Season" in agent.invoke("What grows in the cold?")
+        assert "Monsoon Season" in agent.invoke("Best crops for the rainy months", {"season": "summer"})
+        assert "Summer Season" in agent.invoke("Crops for hot, dry weather")
+    
+    def test_keywords_match_inside_words(self):
+        """Test that inflected keywords still select their season."""
+        agent = CropAdvisorAgent()
+        assert "Winter Season" in agent.invoke("It is getting colder", {"season": "summer"})
+        assert "Summer Season" in agent.invoke("Drier weeks ahead", {"season": "winter"})
+        assert "Monsoon Season" in agent.invoke("Heavy rainfall expected", {"season": "summer"})
+    
+    def test_weather_location(self):
+        """Test location detection from the message."""
+        agent = WeatherAgent()
+        assert agent.invoke("Weather in Mumbai?").startswith("🌤️ Weather for Mumbai")
+        assert agent.invoke("Weather?", {"location": "Mumbai"}).startswith("🌤️ Weather for Mumbai")
+    
+    def test_pest_crop_priority(self):
+        """Test that wheat wins over rice when both are mentioned."""
+        agent = PestAssistantAgent()
+        assert agent.invoke("Pests in rice and wheat").startswith("🐛 Pest Management for Wheat")
+    
+    def test_market_crop_order(self):
+        """Test that the first crop in price data order is picked."""
+        agent = MarketAgent()
+        assert "Pulses" in agent.invoke("How are pulses selling?")
+        assert "Rice" in agent.invoke("How are pulses and rice selling?")
+    
+    def test_general_assistant_topic(self):
+        """Test topic detection."""
+        agent = GeneralAssistantAgent()
+        assert agent.invoke("Is smart farming worth it?").startswith("🌾 Agricultural Technology")
+        assert agent.invoke("Hello").startswith("🌾 General Agricultural Advice")
+    
+    def test_invoke_is_memoized_per_instance(self):
+        """Test that repeat invocations reuse the cached response."""
+        agent = CropAdvisorAgent()
+        context = {"location": "Pune", "soil_pH": 6.8}
+        first = agent.invoke("Crops for winter", context)
+        
+        assert agent.invoke("Crops for winter", dict(context)) is first
+        assert agent.invoke("Crops for winter", {"previous_results": []}) != first
+        assert CropAdvisorAgent().invoke("Crops for winter", context) == first
+    
+    def test_memoized_invoke_ignores_unread_context(self):
+        """Test that router metadata in the context doesn't defeat the cache."""
+        agent = WeatherAgent()
+        first = agent.invoke("Weather?", {"location": "Mumbai", "timestamp": 1.0, "user_id": "a"})
+        
+        assert agent.invoke("Weather?", {"location": "Mumbai", "timestamp": 2.0, "user_id": "b"}) is first
+        assert agent.invoke("Weather?", {"location": "Jalgaon", "timestamp": 2.0}) != first
+    
+    def test_get_crop_info(self):
+        """Test crop lookups by name."""
+        agent = CropAdvisorAgent()
+        assert agent.get_crop_info("Wheat") == {
+            "crop": "Wheat", "season": "winter",
+            "description": "Primary winter crop", "duration": "120 days"
+        }
+        assert "error" in agent.get_crop_info("banana")
+    
+    def test_invoke_many_matches_invoke(self):
+        """Test that batch invocation gives the same responses as one-by-one calls."""
+        messages = ["Rain in Mumbai", "hot wheat\ncotton", "", "organic rice price", "smart"]
+        context = {"location": "Pune", "crop": "wheat"}
+        for agent_class in (
+            CropAdvisorAgent, GeneralAssistantAgent, MarketAgent, PestAssistantAgent, WeatherAgent
+        ):
+            agent = agent_class()
+            assert agent.invoke_many(messages, context) == [
+                agent.invoke(message, context) for message in messages
+            ]
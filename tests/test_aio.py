@@ -0,0 +1,151 @@
+"""
+Tests for the async memory manager and reasoning logger.
+"""
+
+import asyncio
+import types
+
+from gcp_agentor import aio
+from gcp_agentor import memory as memory_module
+from gcp_agentor.aio import AsyncMemoryManager, AsyncReasoningLogger
+from gcp_agentor.memory import HISTORY_ENTRY_ID, HISTORY_PRUNE_INTERVAL, MAX_HISTORY
+
+
+class FakeSnapshot:
+    """Document snapshot returned by the fake async client."""
+    
+    def __init__(self, doc_id, data):
+        self.id = doc_id
+        self.exists = data is not None
+        self._data = data
+    
+    def to_dict(self):
+        return dict(self._data) if self._data is not None else None
+
+
+class FakeAsyncCollection:
+    """Async Firestore collection recording the writes made to it."""
+    
+    def __init__(self, docs=None):
+        self.docs = docs or {}
+        self.writes = []
+    
+    def document(self, doc_id):
+        collection = self
+        
+        class Document:
+            async def get(self, field_paths=None):
+                return FakeSnapshot(doc_id, collection.docs.get(doc_id))
+            
+            async def set(self, data, merge=False):
+                collection.writes.append((doc_id, data, merge))
+            
+            def collection(self, name):
+                return collection
+        
+        return Document()
+    
+    def collection(self, name):
+        return self
+    
+    def where(self, *args):
+        return self
+    
+    def order_by(self, *args, **kwargs):
+        return self
+    
+    def limit(self, *args):
+        return self
+    
+    async def stream(self):
+        for doc_id, data in self.docs.items():
+            yield FakeSnapshot(doc_id, data)
+
+
+FAKE_FIRESTORE = types.SimpleNamespace(
+    ArrayUnion=lambda values: ("ArrayUnion", values),
+    FieldPath=lambda *parts: ".".join(parts),
+    Query=types.SimpleNamespace(DESCENDING="DESCENDING"),
+)
+
+
+def _with_collection(manager, collection):
+    """Point an async manager at a fake Firestore collection."""
+    manager._firestore_enabled = True
+    manager._collection = collection
+    return manager
+
+
+class TestAsyncManagers:
+    """Test cases for the async managers (in-memory storage)."""
+    
+    def test_memory_round_trip(self):
+        """Test that concurrent async calls see the stored sessions."""
+        memory = AsyncMemoryManager()
+        
+        async def run():
+            await asyncio.gather(
+                memory.set_context("a", "crop", "wheat"),
+                memory.set_context("b", "crop", "rice"),
+            )
+            await memory.add_conversation_message("a", {"role": "user", "content": "hi"})
+            return await memory.get_sessions(["a", "b"]), await memory.get_conversation_history("a")
+        
+        sessions, history = asyncio.run(run())
+        assert sessions["a"]["context"] == {"crop": "wheat"}
+        assert sessions["b"]["context"] == {"crop": "rice"}
+        assert [message["content"] for message in history] == ["hi"]
+    
+    def test_logger_round_trip(self):
+        """Test that awaited log entries can be read back."""
+        logger = AsyncReasoningLogger()
+        
+        async def run():
+            await asyncio.gather(*(logger.log("user", f"step_{i}", {}) for i in range(3)))
+            return await logger.get_logs("user")
+        
+        assert sorted(log["step"] for log in asyncio.run(run())) == ["step_0", "step_1", "step_2"]
+    
+    def test_firestore_history_append_is_a_single_write(self, monkeypatch):
+        """Test that a message is appended with a single ArrayUnion write."""
+        monkeypatch.setattr(aio, "firestore", FAKE_FIRESTORE)
+        monkeypatch.setattr(memory_module, "firestore", FAKE_FIRESTORE)
+        collection = FakeAsyncCollection()
+        memory = _with_collection(AsyncMemoryManager(), collection)
+        
+        asyncio.run(memory.add_conversation_message("a", {"role": "user", "timestamp": "t"}))
+        
+        [(doc_id, data, merge)] = collection.writes
+        assert doc_id == "user_a"
+        operation, [entry] = data["conversation_history"]
+        assert operation == "ArrayUnion"
+        assert entry["role"] == "user" and entry["timestamp"] == "t" and entry[HISTORY_ENTRY_ID]
+        assert merge == ["conversation_history", "last_updated"]
+    
+    def test_firestore_history_is_pruned(self, monkeypatch):
+        """Test that every few appends the stored history is cut to MAX_HISTORY messages."""
+        monkeypatch.setattr(aio, "firestore", FAKE_FIRESTORE)
+        monkeypatch.setattr(memory_module, "firestore", FAKE_FIRESTORE)
+        stored = [{"i": i} for i in range(MAX_HISTORY + 5)]
+        collection = FakeAsyncCollection({"user_a": {"conversation_history": stored}})
+        memory = _with_collection(AsyncMemoryManager(), collection)
+        
+        async def run():
+            for i in range(HISTORY_PRUNE_INTERVAL):
+                await memory.add_conversation_message("a", {"i": i})
+        
+        asyncio.run(run())
+        
+        assert len(collection.writes) == HISTORY_PRUNE_INTERVAL + 1
+        _, data, merge = collection.writes[-1]
+        assert data["conversation_history"] == stored[-MAX_HISTORY:]
+        assert merge == ["conversation_history", "last_updated"]
+    
+    def test_firestore_logs_have_ids(self, monkeypatch):
+        """Test that log entries read from Firestore carry their document id."""
+        monkeypatch.setattr(aio, "firestore", FAKE_FIRESTORE)
+        logger = _with_collection(
+            AsyncReasoningLogger(), FakeAsyncCollection({"log1": {"step": "step_0"}})
+        )
+        
+        assert asyncio.run(logger.get_logs("user")) == [{"step": "step_0", "log_id": "log1"}]
@@ -0,0 +1,161 @@
+"""
+Tests for the Firestore write batcher.
+"""
+
+import os
+import subprocess
+import sys
+import textwrap
+import threading
+
+from gcp_agentor.batcher import FirestoreBatcher, delete_documents
+
+
+class RecordingBatch:
+    """Write batch that records committed writes on its client."""
+    
+    def __init__(self, client):
+        self.client = client
+        self.writes = []
+    
+    def set(self, doc_ref, data, merge=False):
+        self.writes.append((doc_ref, data, merge))
+    
+    def delete(self, doc_ref):
+        self.writes.append((doc_ref, None, False))
+    
+    def commit(self):
+        if len(self.writes) > self.client.limit:
+            raise ValueError("Transaction too big")
+        with self.client.lock:
+            self.client.commits.append(list(self.writes))
+
+
+class RecordingClient:
+    """Client handing out RecordingBatch instances."""
+    
+    def __init__(self, limit=500):
+        self.limit = limit
+        self.commits = []
+        self.lock = threading.Lock()
+    
+    def batch(self):
+        return RecordingBatch(self)
+
+
+class FlakyClient(RecordingClient):
+    """Client whose first commits fail with the given errors."""
+    
+    def __init__(self, errors):
+        super().__init__()
+        self.errors = list(errors)
+    
+    def batch(self):
+        batch = RecordingBatch(self)
+        if self.errors:
+            error = self.errors.pop(0)
+            
+            def commit():
+                raise error
+            batch.commit = commit
+        return batch
+
+
+class TestFirestoreBatcher:
+    """Test cases for FirestoreBatcher."""
+    
+    def test_coalesces_writes(self):
+        """Test that queued writes are committed together."""
+        client = RecordingClient()
+        batcher = FirestoreBatcher(client, flush_interval=10)
+        for i in range(5):
+            batcher.enqueue(f"doc{i}", {"i": i})
+        batcher.close()
+        
+        assert len(client.commits) == 1
+        assert [write[0] for write in client.commits[0]] == [f"doc{i}" for i in range(5)]
+    
+    def test_flush_waits_for_commit(self):
+        """Test that flush returns only after queued writes are committed."""
+        client = RecordingClient()
+        batcher = FirestoreBatcher(client, flush_interval=10)
+        batcher.enqueue("doc", {"value": 1}, merge=True)
+        batcher.flush()
+        
+        assert client.commits == [[("doc", {"value": 1}, True)]]
+        batcher.close()
+    
+    def test_halves_batch_when_too_big(self):
+        """Test that oversized batches are split and retried."""
+        client = RecordingClient(limit=3)
+        batcher = FirestoreBatcher(client, flush_interval=10, max_batch_size=100)
+        for i in range(10):
+            batcher.enqueue(f"doc{i}", {"i": i})
+        batcher.close()
+        
+        committed = [write[0] for commit in client.commits for write in commit]
+        assert committed == [f"doc{i}" for i in range(10)]
+        assert all(len(commit) <= 3 for commit in client.commits)
+        assert batcher.batch_size <= 3
+    
+    def test_drops_writes_when_queue_is_full(self):
+        """Test that enqueue drops and counts writes beyond max_queue_size."""
+        client = RecordingClient()
+        batcher = FirestoreBatcher(client, flush_interval=10, max_queue_size=2)
+        queued = [batcher.enqueue(f"doc{i}", {"i": i}) for i in range(3)]
+        batcher.close()
+        
+        assert queued == [True, True, False]
+        assert batcher.dropped == 1
+        assert [write[0] for write in client.commits[0]] == ["doc0", "doc1"]
+    
+    def test_enqueue_many(self):
+        """Test queuing several writes at once, up to max_queue_size."""
+        client = RecordingClient()
+        batcher = FirestoreBatcher(client, flush_interval=10, max_queue_size=2)
+        assert batcher.enqueue_many([(f"doc{i}", {"i": i}) for i in range(3)], merge=True) == 2
+        batcher.close()
+        
+        assert batcher.dropped == 1
+        assert client.commits == [[("doc0", {"i": 0}, True), ("doc1", {"i": 1}, True)]]
+    
+    def test_retries_transient_errors(self):
+        """Test that a commit failing with a transient error is retried."""
+        client = FlakyClient([ConnectionError("reset"), TimeoutError("deadline")])
+        batcher = FirestoreBatcher(client, flush_interval=10, retry_delay=0.001)
+        batcher.enqueue("doc", {"value": 1})
+        batcher.close()
+        
+        assert client.commits == [[("doc", {"value": 1}, False)]]
+    
+    def test_flushes_at_exit(self):
+        """Test that writes still queued when the interpreter exits are committed."""
+        script = textwrap.dedent("""
+            from gcp_agentor.batcher import FirestoreBatcher
+            
+            class Batch:
+                def set(self, doc_ref, data, merge=False):
+                    print("set", doc_ref)
+                
+                def commit(self):
+                    print("commit")
+            
+            class Client:
+                def batch(self):
+                    return Batch()
+            
+            FirestoreBatcher(Client(), flush_interval=60).enqueue("doc", {})
+        """)
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        result = subprocess.run(
+            [sys.executable, "-c", script], cwd=root, capture_output=True, text=True, timeout=30
+        )
+        
+        assert result.stdout.split("\n")[:2] == ["set doc", "commit"]
+    
+    def test_delete_documents_in_batches(self):
+        """Test that deletes are committed in batches of at most batch_size."""
+        client = RecordingClient()
+        assert delete_documents(client, (f"doc{i}" for i in range(5)), batch_size=2) == 5
+        assert [len(commit) for commit in client.commits] == [2, 2, 1]
+        assert delete_documents(client, []) == 0
@@ -0,0 +1,53 @@
+"""
+Tests for the in-process TTL cache.
+"""
+
+from gcp_agentor.cache import TTLCache
+
+
+class FakeClock:
+    """Manually advanced clock."""
+    
+    def __init__(self):
+        self.now = 0.0
+    
+    def __call__(self):
+        return self.now
+
+
+class TestTTLCache:
+    """Test cases for TTLCache."""
+    
+    def test_get_and_expiry(self):
+        """Test that entries expire after the TTL."""
+        clock = FakeClock()
+        cache = TTLCache(maxsize=10, ttl=5, timer=clock)
+        cache.set("key", "value")
+        
+        assert cache.get("key") == "value"
+        clock.now = 5
+        assert cache.get("key") is None
+        assert len(cache) == 0
+    
+    def test_evicts_least_recently_used(self):
+        """Test that the least recently used entry is evicted first."""
+        cache = TTLCache(maxsize=2, ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        
+        assert cache.get("a") == 1
+        assert cache.get("b") is None
+        assert cache.get("c") == 3
+    
+    def test_pop_and_clear(self):
+        """Test removing entries."""
+        cache = TTLCache(maxsize=10, ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        
+        assert cache.pop("a") == 1
+        assert cache.pop("a") is None
+        cache.clear()
+        assert len(cache) == 0
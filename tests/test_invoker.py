@@ -0,0 +1,181 @@
+"""
+Tests for the agent invoker.
+"""
+
+import asyncio
+import threading
+from types import SimpleNamespace
+
+from gcp_agentor import invoker as invoker_module
+from gcp_agentor.acp import create_user_message
+from gcp_agentor.agent_registry import AgentRegistry
+from gcp_agentor.cache import TTLCache
+from gcp_agentor.invoker import AgentInvoker, BaseAgent, InvocationError
+from gcp_agentor.memory import MemoryManager
+from gcp_agentor.router import AgentRouter
+
+
+class BarrierInvoker(AgentInvoker):
+    """Invoker whose local agents wait until all of them are running."""
+    
+    def __init__(self, parties):
+        super().__init__(cache_size=0)
+        self.barrier = threading.Barrier(parties, timeout=5)
+    
+    def _invoke_local_agent(self, agent_name, message, context):
+        self.barrier.wait()
+        return f"{agent_name}: {message}"
+
+
+class EchoAgent:
+    """Agent that does not subclass BaseAgent."""
+    
+    def invoke(self, message, context=None):
+        return message
+
+
+class TestAgentInvoker:
+    """Test cases for AgentInvoker."""
+    
+    def test_invoke_local_agent(self):
+        """Test invoking a local agent."""
+        invoker = AgentInvoker()
+        assert invoker.invoke("crop_advisor", "Hi") == "Local agent 'crop_advisor' response: Hi"
+    
+    def test_batch_invoke_runs_concurrently(self):
+        """Test that batch_invoke overlaps the invocations."""
+        invoker = BarrierInvoker(parties=3)
+        results = invoker.batch_invoke(
+            [{"name": "a"}, {"name": "b"}, {"name": ""}, {"name": "c"}], "Hi"
+        )
+        invoker.close()
+        
+        assert results == {"a": "a: Hi", "b": "b: Hi", "c": "c: Hi"}
+        assert list(results) == ["a", "b", "c"]
+    
+    def test_invoke_many_local(self):
+        """Test invoking one agent with several messages."""
+        invoker = AgentInvoker()
+        assert invoker.invoke_many("weather", ["a", "b"]) == [
+            "Local agent 'weather' response: a",
+            "Local agent 'weather' response: b"
+        ]
+    
+    def test_invoke_many_vertex_sends_each_message_once(self, monkeypatch):
+        """Test that repeated messages share one prediction."""
+        monkeypatch.setattr(invoker_module, "VERTEX_AI_AVAILABLE", True)
+        requests = []
+        
+        def predict(instances):
+            requests.append([instance["message"] for instance in instances])
+            return SimpleNamespace(predictions=[instance["message"].upper() for instance in instances])
+        
+        invoker = AgentInvoker(project_id="test-project")
+        invoker._endpoint_for = lambda name: SimpleNamespace(predict=predict)
+        
+        assert invoker.invoke_many("agent", ["a", "b", "a"], agent_type="vertex") == ["A", "B", "A"]
+        assert requests == [["a", "b"]]
+    
+    def test_batch_invoke_repeated_agent(self):
+        """Test that a repeated agent is invoked once and keeps its position."""
+        invoker = AgentInvoker(cache_size=0)
+        calls = []
+        invoker.register_agent_type("local", lambda name, message, context: calls.append(name) or name)
+        
+        results = invoker.batch_invoke([{"name": "a"}, {"name": "b"}, {"name": "a"}], "Hi")
+        invoker.close()
+        
+        assert list(results) == ["a", "b"]
+        assert sorted(calls) == ["a", "b"]
+    
+    def test_register_agent_type(self):
+        """Test dispatching to a custom agent type."""
+        invoker = AgentInvoker()
+        invoker.register_agent_type("echo", lambda name, message, context: message.upper())
+        
+        assert invoker.invoke("any", "hi", agent_type="echo") == "HI"
+        assert invoker.invoke("any", "hi", agent_type="unknown").startswith("Local agent")
+    
+    def test_abatch_invoke(self):
+        """Test invoking a batch of agents from an event loop."""
+        invoker = BarrierInvoker(parties=2)
+        results = asyncio.run(invoker.abatch_invoke([{"name": "a"}, {"name": "b"}], "Hi"))
+        invoker.close()
+        
+        assert results == {"a": "a: Hi", "b": "b: Hi"}
+    
+    def test_circuit_breaker_fails_fast(self):
+        """Test that an agent failing repeatedly is skipped until the cooldown ends."""
+        invoker = AgentInvoker(cache_size=0, breaker_threshold=2, breaker_cooldown=60)
+        calls = []
+        
+        def failing(name, message, context):
+            calls.append(name)
+            raise ConnectionError("endpoint down")
+        
+        invoker.register_agent_type("flaky", failing)
+        for _ in range(4):
+            assert isinstance(invoker.invoke("primary", "hi", agent_type="flaky"), InvocationError)
+        assert calls == ["primary", "primary"]
+        
+        invoker.breaker_cooldown = 0
+        invoker.invoke("primary", "hi", agent_type="flaky")
+        assert len(calls) == 3
+    
+    def test_invoke_with_fallback(self):
+        """Test falling back when the primary agent fails."""
+        invoker = AgentInvoker(cache_size=0)
+        invoker.register_agent_type(
+            "local",
+            lambda name, message, context: message if name == "backup" else 1 / 0
+        )
+        
+        assert invoker.invoke_with_fallback("primary", "hi", fallback_agent="backup") == "hi"
+        failed = invoker.invoke_with_fallback("primary", "hi")
+        assert isinstance(failed, InvocationError)
+        assert failed.startswith("Error: All agents failed")
+    
+    def test_fallback_ignores_error_like_answers(self):
+        """Test that an answer merely starting with "Error:" is not a failure."""
+        invoker = AgentInvoker(cache_size=0)
+        invoker.register_agent_type("local", lambda name, message, context: f"Error: {name} says {message}")
+        
+        assert invoker.invoke_with_fallback("primary", "hi", fallback_agent="backup") == "Error: primary says hi"
+    
+    def test_vertex_cache_key(self):
+        """Test that the Vertex AI cache key ignores context order and tolerates mixed keys."""
+        invoker = AgentInvoker(cache_size=0)
+        assert invoker._vertex_cache_key("agent", "hi", {}) is None
+        
+        invoker._vertex_cache = TTLCache(8, 60)
+        key = invoker._vertex_cache_key("agent", "hi", {"a": 1, "b": [1, 2]})
+        assert key == invoker._vertex_cache_key("agent", "hi", {"b": [1, 2], "a": 1})
+        assert key != invoker._vertex_cache_key("agent", "hi", {"a": 2, "b": [1, 2]})
+        assert invoker._vertex_cache_key("agent", "hi", {1: "x", "a": "y"}) is None
+    
+    def test_base_agent_is_structural(self):
+        """Test that any object with an invoke method counts as an agent."""
+        assert isinstance(EchoAgent(), BaseAgent)
+        assert not isinstance(object(), BaseAgent)
+    
+    def test_routed_vertex_calls_hit_disk_cache(self, monkeypatch, tmp_path):
+        """Test that a cache_dir alone enables the Vertex AI cache for routed calls."""
+        monkeypatch.setattr(invoker_module, "VERTEX_AI_AVAILABLE", True)
+        requests = []
+        
+        def predict(instances):
+            requests.append(instances[0]["message"])
+            return SimpleNamespace(predictions=["Sunny"])
+        
+        invoker = AgentInvoker(project_id="test-project", cache_dir=str(tmp_path))
+        invoker._endpoint_for = lambda name: SimpleNamespace(predict=predict)
+        registry = AgentRegistry()
+        registry.register("weather", "projects/p/locations/l/endpoints/1", {"config": {"agent_type": "vertex"}})
+        router = AgentRouter(registry, MemoryManager(), invoker=invoker)
+        
+        for user_id in ["farmer1", "farmer2"]:
+            assert router.route(create_user_message(user_id, "get_weather", "rain?"))["response"] == "Sunny"
+        router.close()
+        invoker.close()
+        
+        assert requests == ["rain?"]
@@ -0,0 +1,244 @@
+"""
+Tests for the reasoning logger.
+"""
+
+import io
+import json
+import types
+
+from gcp_agentor import logger as logger_module
+from gcp_agentor.logger import ReasoningLogger, ReasoningStep
+
+
+class MissingIndex(Exception):
+    """Stands in for google.api_core's FailedPrecondition."""
+
+
+class UnindexedLogs:
+    """Firestore collection whose queries fail for lack of an index."""
+    
+    def document(self, *args):
+        return self
+    
+    def collection(self, *args):
+        return self
+    
+    def where(self, *args):
+        return self
+    
+    def select(self, *args):
+        return self
+    
+    def order_by(self, *args, **kwargs):
+        return self
+    
+    def limit(self, *args):
+        return self
+    
+    def stream(self):
+        raise MissingIndex("The query requires an index")
+
+
+class PrefixQuery(UnindexedLogs):
+    """Indexed log query recording its filters, orderings and limit."""
+    
+    def __init__(self, docs):
+        self.docs = docs
+        self.calls = []
+    
+    def where(self, *args):
+        self.calls.append(("where",) + args)
+        return self
+    
+    def order_by(self, field, direction=None):
+        self.calls.append(("order_by", field, direction))
+        return self
+    
+    def limit(self, count):
+        self.calls.append(("limit", count))
+        return self
+    
+    def stream(self):
+        return (types.SimpleNamespace(id=doc_id, to_dict=lambda data=data: dict(data)) for doc_id, data in self.docs)
+
+
+class LogDoc:
+    """Stored log entry whose reference is its path."""
+    
+    def __init__(self, path):
+        self.reference = types.SimpleNamespace(path=path)
+
+
+class LogQuery:
+    """Query over stored log entries (timestamps are ignored)."""
+    
+    def __init__(self, paths):
+        self.paths = paths
+    
+    def where(self, *args):
+        return self
+    
+    def select(self, *args):
+        return self
+    
+    def stream(self):
+        return (LogDoc(path) for path in self.paths)
+
+
+class DeletingClient:
+    """Firestore client keeping log entry paths per user, for cleanup."""
+    
+    def __init__(self, logs, indexed):
+        self.logs = logs
+        self.indexed = indexed
+        self.deleted = []
+    
+    def collection_group(self, name):
+        if not self.indexed:
+            return UnindexedLogs()
+        return LogQuery([path for paths in self.logs.values() for path in paths])
+    
+    def list_documents(self):
+        return [
+            types.SimpleNamespace(collection=lambda name, paths=paths: LogQuery(paths))
+            for paths in self.logs.values()
+        ]
+    
+    def batch(self):
+        return types.SimpleNamespace(delete=lambda ref: self.deleted.append(ref.path), commit=lambda: None)
+
+
+class TestReasoningLogger:
+    """Test cases for ReasoningLogger (in-memory storage)."""
+    
+    def test_export_logs_matches_json_dumps(self):
+        """Test that the streamed export equals dumping the whole list."""
+        logger = ReasoningLogger()
+        assert logger.export_logs("user") == "[]"
+        
+        for i in range(3):
+            logger.log("user", "step", {"i": i, "text": "a\nb", "nested": [{}]}, "session")
+        logger.log("user", "step", {}, "other")
+        
+        expected = json.dumps(logger.get_logs("user", 1000, "session"), indent=2, default=str)
+        assert logger.export_logs("user", "session") == expected
+    
+    def test_write_logs_to_sink(self):
+        """Test writing logs to a file-like object."""
+        logger = ReasoningLogger()
+        for i in range(5):
+            logger.log("user", f"step{i}", {})
+        
+        sink = io.StringIO()
+        assert logger.write_logs(sink, "user", limit=2) == 2
+        assert len(json.loads(sink.getvalue())) == 2
+        assert len(list(logger.iter_logs("user"))) == 5
+    
+    def test_get_logs_newest_first(self):
+        """Test that logs come back newest first, filtered and limited."""
+        logger = ReasoningLogger()
+        for i in range(6):
+            logger.log("user", f"step{i}", {}, "even" if i % 2 == 0 else "odd")
+        
+        assert [log["step"] for log in logger.get_logs("user", 3)] == ["step5", "step4", "step3"]
+        assert [log["step"] for log in logger.get_logs("user", 2, "even")] == ["step4", "step2"]
+        assert logger.get_logs("nobody") == []
+    
+    def test_cleanup_old_logs(self):
+        """Test that in-memory logs older than the cutoff are removed."""
+        logger = ReasoningLogger()
+        for i in range(3):
+            logger.log("user", f"step{i}", {})
+        
+        assert logger.cleanup_old_logs(days_old=30) == 0
+        assert logger.cleanup_old_logs(days_old=-1) == 3
+        assert logger.get_logs("user") == []
+    
+    def test_reasoning_trace_only_has_reasoning_steps(self):
+        """Test that the trace keeps reasoning steps of the session, newest first."""
+        logger = ReasoningLogger()
+        for i, session in enumerate(["session", "session", "other"]):
+            logger.log_reasoning_step(
+                "user", ReasoningStep(f"id{i}", "", "analysis", "", {}, {}), session
+            )
+            logger.log("user", "message_received", {}, session)
+        
+        trace = logger.get_reasoning_trace("user", "session")
+        assert [step.step_id for step in trace] == ["id1", "id0"]
+    
+    def test_batch_stores_entries_on_exit(self):
+        """Test that entries logged in a batch are stored when it ends, in order."""
+        logger = ReasoningLogger()
+        with logger.batch():
+            logger.log("user", "first", {})
+            with logger.batch():
+                logger.log("user", "second", {})
+            assert logger.get_logs("user") == []
+        
+        assert [log["step"] for log in logger.get_logs("user")] == ["second", "first"]
+    
+    def test_log_keeps_details_as_logged(self):
+        """Test that changing logged details afterwards doesn't change the entry."""
+        logger = ReasoningLogger()
+        response = {"success": True, "steps": [{"agent": "a"}]}
+        with logger.batch():
+            logger.log("user", "response_sent", {"response": response})
+            response["intent"] = "get_weather"
+            response["steps"][0]["agent"] = "b"
+        
+        assert logger.get_logs("user")[0]["details"] == {
+            "response": {"success": True, "steps": [{"agent": "a"}]}
+        }
+    
+    def test_step_prefix_query_limits_newest_entries(self, monkeypatch):
+        """Test that the Firestore query orders by time before applying the limit."""
+        monkeypatch.setattr(
+            logger_module, "firestore", types.SimpleNamespace(Query=types.SimpleNamespace(DESCENDING="DESCENDING"))
+        )
+        query = PrefixQuery([("b", {"step": "reasoning_step_b"}), ("a", {"step": "reasoning_step_a"})])
+        logger = ReasoningLogger()
+        logger._firestore_enabled = True
+        logger._collection = query
+        
+        logs = logger._query_by_step_prefix("user", "session", "reasoning_step_", limit=2)
+        assert [log["log_id"] for log in logs] == ["b", "a"]
+        assert [call for call in query.calls if call[0] != "where"] == [
+            ("order_by", "timestamp", "DESCENDING"), ("limit", 2)
+        ]
+    
+    def test_step_prefix_query_without_index(self, monkeypatch, caplog):
+        """Test that a missing index falls back to filtering the session's logs."""
+        monkeypatch.setattr(logger_module, "MISSING_INDEX_ERRORS", (MissingIndex,))
+        monkeypatch.setattr(
+            logger_module, "firestore", types.SimpleNamespace(Query=types.SimpleNamespace(DESCENDING="DESCENDING"))
+        )
+        logger = ReasoningLogger()
+        logger._firestore_enabled = True
+        logger._collection = UnindexedLogs()
+        session_logs = [
+            {"step": "reasoning_step_response", "details": {"step_id": "id1"}},
+            {"step": "message_received", "details": {}},
+            {"step": "reasoning_step_analysis", "details": {"step_id": "id0"}},
+        ]
+        monkeypatch.setattr(logger, "get_session_logs", lambda user_id, session_id: session_logs)
+        
+        trace = logger.get_reasoning_trace("user", "session")
+        assert [step.step_id for step in trace] == ["id1", "id0"]
+        assert logger_module.STEP_PREFIX_INDEX in caplog.text
+    
+    def test_cleanup_old_logs_on_firestore(self, monkeypatch, caplog):
+        """Test that cleanup keeps to its collection, with or without the index."""
+        monkeypatch.setattr(logger_module, "MISSING_INDEX_ERRORS", (MissingIndex,))
+        logs = {"a": ["agentor_logs/user_a/logs/1"], "b": ["agentor_logs/user_b/logs/2"]}
+        other = ["agentor_logs_v2/user_a/logs/3", "other/user_a/logs/4"]
+        
+        for indexed in (True, False):
+            client = DeletingClient(dict(logs, other=other) if indexed else logs, indexed)
+            logger = ReasoningLogger()
+            logger._firestore_enabled = True
+            logger._db = client
+            logger._collection = client
+            
+            assert logger.cleanup_old_logs() == 2
+            assert client.deleted == ["agentor_logs/user_a/logs/1", "agentor_logs/user_b/logs/2"]
+        assert logger_module.CLEANUP_INDEX in caplog.text
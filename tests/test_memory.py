@@ -0,0 +1,260 @@
+"""
+Tests for the memory manager.
+"""
+
+import types
+
+import pytest
+
+from gcp_agentor import memory as memory_module
+from gcp_agentor.memory import (
+    HISTORY_ENTRY_ID, HISTORY_PRUNE_INTERVAL, MAX_HISTORY, USER_STATE_SIZE, MemoryManager
+)
+
+
+class ArrayUnion:
+    """Stands in for firestore.ArrayUnion."""
+    
+    def __init__(self, values):
+        self.values = values
+
+
+# Stands in for firestore.DELETE_FIELD
+DELETE_FIELD = object()
+
+
+class FieldPath(tuple):
+    """Stands in for firestore.FieldPath."""
+    
+    def __new__(cls, *parts):
+        return super().__new__(cls, parts)
+    
+    def to_api_repr(self):
+        return ".".join(self)
+
+
+class IdentityCodec:
+    """Stands in for the zstandard compressor and decompressor."""
+    
+    @staticmethod
+    def compress(data):
+        return data
+    
+    @staticmethod
+    def decompress(data):
+        return data
+
+
+class FakeSnapshot:
+    """Document snapshot returned by FakeCollection."""
+    
+    def __init__(self, data):
+        self.exists = data is not None
+        self._data = data
+    
+    def to_dict(self):
+        return dict(self._data) if self._data is not None else None
+
+
+class FakeDocument:
+    """Session document applying writes the way Firestore does."""
+    
+    def __init__(self, collection, doc_id):
+        self.collection = collection
+        self.doc_id = doc_id
+    
+    def get(self, field_paths=None):
+        self.collection.reads += 1
+        return FakeSnapshot(self.collection.docs.get(self.doc_id))
+    
+    def set(self, data, merge=False):
+        document = dict(self.collection.docs.get(self.doc_id) or {}) if merge else {}
+        if isinstance(merge, list):
+            paths = [path if isinstance(path, tuple) else (path,) for path in merge]
+        else:
+            paths = [(key,) for key in data]
+        for path in paths:
+            value = data
+            for part in path:
+                value = value[part]
+            target = document
+            for part in path[:-1]:
+                target[part] = target = dict(target.get(part) or {})
+            key = path[-1]
+            if isinstance(value, ArrayUnion):
+                # ArrayUnion only adds values not already in the array
+                current = list(target.get(key, []))
+                value = current + [item for item in value.values if item not in current]
+            if value is DELETE_FIELD:
+                target.pop(key, None)
+            else:
+                target[key] = value
+        self.collection.docs[self.doc_id] = document
+    
+    def delete(self):
+        self.collection.docs.pop(self.doc_id, None)
+
+
+class FakeCollection:
+    """Firestore collection keeping its documents in a dict."""
+    
+    def __init__(self):
+        self.docs = {}
+        self.reads = 0
+    
+    def document(self, doc_id):
+        return FakeDocument(self, doc_id)
+
+
+@pytest.fixture
+def firestore_memory(monkeypatch):
+    """MemoryManager backed by a FakeCollection."""
+    monkeypatch.setattr(
+        memory_module, "firestore", types.SimpleNamespace(
+            ArrayUnion=ArrayUnion, DELETE_FIELD=DELETE_FIELD, FieldPath=FieldPath
+        )
+    )
+    memory = MemoryManager(session_cache_ttl=0)
+    memory._firestore_enabled = True
+    memory._collection = FakeCollection()
+    return memory
+
+
+def _compressing(memory):
+    """A compressing manager on the same collection as memory (which can read its blobs)."""
+    memory._documents._decompressor = IdentityCodec()
+    packed = MemoryManager(session_cache_ttl=0)
+    packed._firestore_enabled = True
+    packed._collection = memory._collection
+    packed._documents._compressor = packed._documents._decompressor = IdentityCodec()
+    return packed
+
+
+class TestMemoryManager:
+    """Test cases for MemoryManager (in-memory storage)."""
+    
+    def test_conversation_history_is_bounded(self):
+        """Test that only the most recent messages are kept."""
+        memory = MemoryManager()
+        for i in range(MAX_HISTORY + 20):
+            memory.add_conversation_message("user", {"i": i})
+        
+        history = memory.get_conversation_history("user", limit=0)
+        assert isinstance(history, list)
+        assert [message["i"] for message in history] == list(range(20, MAX_HISTORY + 20))
+        assert memory.get_session_info("user")["message_count"] == MAX_HISTORY
+    
+    def test_history_entries_are_stored_as_given(self):
+        """Test that history entries only gain a timestamp."""
+        memory = MemoryManager()
+        memory.add_conversation_message("user", {"role": "user", "content": "hi"})
+        
+        [entry] = memory.get_conversation_history("user")
+        assert set(entry) == {"role", "content", "timestamp"}
+    
+    def test_compressed_session_round_trip(self):
+        """Test that packed sessions keep metadata readable and restore the rest."""
+        pytest.importorskip("zstandard")
+        memory = MemoryManager(compress=True)
+        session = {
+            "context": {"crop": "wheat"},
+            "conversation_history": [{"role": "user", "content": "hi"}],
+            "last_updated": "2024-01-01T00:00:00",
+        }
+        
+        packed = memory._documents.pack(session)
+        assert "context" not in packed
+        assert packed["last_updated"] == session["last_updated"]
+        assert memory._documents.unpack(packed) == session
+
+
+class TestFirestoreMemoryManager:
+    """Test cases for MemoryManager on a mocked Firestore collection."""
+    
+    def test_repeated_messages_are_kept(self, firestore_memory):
+        """Test that identical messages are each appended to the history."""
+        for _ in range(2):
+            firestore_memory.add_conversation_message("user", {"role": "user", "content": "hi", "timestamp": "t"})
+        
+        history = firestore_memory.get_conversation_history("user")
+        assert history == [{"role": "user", "content": "hi", "timestamp": "t"}] * 2
+        stored = firestore_memory._collection.docs["user_user"]["conversation_history"]
+        assert stored[0][HISTORY_ENTRY_ID] != stored[1][HISTORY_ENTRY_ID]
+    
+    def test_append_does_not_read_the_session(self, firestore_memory):
+        """Test that appends between prunes are blind writes after the first."""
+        for i in range(HISTORY_PRUNE_INTERVAL - 1):
+            firestore_memory.add_conversation_message("user", {"i": i})
+        
+        assert firestore_memory._collection.reads == 0
+    
+    def test_user_bookkeeping_is_bounded(self, firestore_memory):
+        """Test that per-user append counts and blob checks don't grow without limit."""
+        for i in range(USER_STATE_SIZE + 5):
+            firestore_memory.add_conversation_message(f"user{i}", {"i": i})
+        
+        assert len(firestore_memory._documents._appends) == USER_STATE_SIZE
+        firestore_memory._documents.unpack_compressed = True
+        for i in range(USER_STATE_SIZE + 5):
+            firestore_memory.set_context(f"user{i}", "i", i)
+        assert len(firestore_memory._documents._blob_users) == USER_STATE_SIZE
+    
+    def test_history_is_trimmed_on_read_and_pruned(self, firestore_memory):
+        """Test that reads never return more than MAX_HISTORY messages."""
+        stored = [{"i": i} for i in range(MAX_HISTORY + 5)]
+        firestore_memory._collection.docs["user_user"] = {"conversation_history": stored}
+        
+        history = firestore_memory.get_conversation_history("user", limit=0)
+        assert [message["i"] for message in history] == list(range(5, MAX_HISTORY + 5))
+        assert firestore_memory.get_session_info("user")["message_count"] == MAX_HISTORY
+        
+        for i in range(HISTORY_PRUNE_INTERVAL):
+            firestore_memory.add_conversation_message("user", {"i": MAX_HISTORY + 5 + i})
+        stored = firestore_memory._collection.docs["user_user"]["conversation_history"]
+        assert len(stored) == MAX_HISTORY
+        assert stored[-1]["i"] == MAX_HISTORY + 4 + HISTORY_PRUNE_INTERVAL
+    
+    def test_switching_compression_keeps_one_representation(self, firestore_memory):
+        """Test that each write removes the representation the other setting left behind."""
+        packed = _compressing(firestore_memory)
+        docs = firestore_memory._collection.docs
+        
+        firestore_memory.set_context("user", "crop", "wheat")
+        packed.set_context("user", "season", "winter")
+        assert "context" not in docs["user_user"] and "blob" in docs["user_user"]
+        
+        assert firestore_memory.get_context("user", "season") == "winter"
+        firestore_memory.set_context("user", "crop", "rice")
+        assert not set(memory_module.BLOB_FIELDS) & set(docs["user_user"])
+        assert firestore_memory.get_session("user")["context"] == {"crop": "rice", "season": "winter"}
+    
+    def test_unread_blobs_are_unpacked_on_request(self, firestore_memory):
+        """Test that only unpack_compressed checks documents not read yet for blobs."""
+        packed = _compressing(firestore_memory)
+        docs = firestore_memory._collection.docs
+        for user_id in ["a", "b"]:
+            packed.set_context(user_id, "season", "winter")
+        reads = firestore_memory._collection.reads
+        
+        firestore_memory.add_conversation_message("a", {"i": 0})
+        assert firestore_memory._collection.reads == reads
+        assert "blob" in docs["user_a"]
+        
+        firestore_memory._documents.unpack_compressed = True
+        firestore_memory.add_conversation_message("b", {"i": 0})
+        assert "blob" not in docs["user_b"]
+        assert firestore_memory.get_session("b")["context"] == {"season": "winter"}
+    
+    def test_newer_representation_wins_on_read(self, firestore_memory):
+        """Test that a document holding both representations reads the newer one."""
+        packed = _compressing(firestore_memory)
+        document = packed._documents.pack({"context": {"crop": "wheat"}, "conversation_history": [{"i": 0}]})
+        
+        document["context"] = {"crop": "rice"}
+        document["last_updated"] = "9999"
+        session = packed._documents.unpack(document)
+        assert session["context"] == {"crop": "rice"}
+        assert session["conversation_history"] == [{"i": 0}]
+        
+        document["last_updated"] = ""
+        assert packed._documents.unpack(document)["context"] == {"crop": "wheat"}
@@ -0,0 +1,190 @@
+"""
+Tests for AgentOrchestrator module.
+"""
+
+import asyncio
+from gcp_agentor import core as core_module
+from gcp_agentor.core import AgentOrchestrator
+from gcp_agentor.examples.agri_agent import CropAdvisorAgent, GeneralAssistantAgent, WeatherAgent
+
+
+class TestAgentOrchestrator:
+    """Test cases for AgentOrchestrator."""
+    
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.orchestrator = AgentOrchestrator()
+        self.orchestrator.register_agents([
+            ("crop_advisor", CropAdvisorAgent(), {"intents": ["get_crop_advice"]}),
+            ("weather", WeatherAgent(), {"intents": ["get_weather"]})
+        ])
+    
+    def test_handle_message(self):
+        """Test routing a message to the matching agent."""
+        message = self.orchestrator.create_user_message(
+            "farmer1", "get_weather", "Weather in Mumbai?"
+        )
+        response = self.orchestrator.handle_message(message)
+        
+        assert response["success"] is True
+        assert response["agent"] == "weather"
+        assert "Mumbai" in response["response"]
+    
+    def test_conversation_history_is_persisted(self):
+        """Test that handled messages end up in the conversation history."""
+        for text in ["Weather?", "Weather tomorrow?"]:
+            message = self.orchestrator.create_user_message("farmer1", "get_weather", text)
+            self.orchestrator.handle_message(message)
+        
+        history = self.orchestrator.get_conversation_history("farmer1")
+        assert [entry["message"]["message"] for entry in history] == [
+            "Weather?", "Weather tomorrow?"
+        ]
+    
+    def test_history_keeps_order_per_user(self):
+        """Test that each user's history is written in order with several writers."""
+        users = [f"farmer{i}" for i in range(2 * core_module.PERSIST_WORKERS)]
+        for i in range(5):
+            for user_id in users:
+                message = self.orchestrator.create_user_message(user_id, "get_weather", f"Weather {i}?")
+                self.orchestrator.handle_message(message)
+        
+        for user_id in users:
+            history = self.orchestrator.get_conversation_history(user_id)
+            assert [entry["message"]["message"] for entry in history] == [f"Weather {i}?" for i in range(5)]
+    
+    def test_full_write_queue_drops_messages(self, monkeypatch):
+        """Test that messages beyond the pending write limit are dropped and counted."""
+        monkeypatch.setattr(core_module, "MAX_QUEUE_SIZE", 0)
+        message = self.orchestrator.create_user_message("farmer1", "get_weather", "Weather?")
+        
+        assert self.orchestrator.handle_message(message)["success"] is True
+        assert self.orchestrator.dropped_messages == 1
+        assert self.orchestrator.get_conversation_history("farmer1") == []
+    
+    def test_history_matches_routed_session(self):
+        """Test that history and routing see the same generated session id."""
+        message = self.orchestrator.create_user_message("farmer1", "get_weather", "Weather?")
+        del message["session_id"]
+        
+        response = self.orchestrator.handle_message(message)
+        history = self.orchestrator.get_conversation_history("farmer1")
+        assert history[-1]["message"]["session_id"] == response["session_id"]
+    
+    def test_handle_simple_message_caches_intent(self):
+        """Test that repeat simple messages reuse the detected intent."""
+        first = self.orchestrator.handle_simple_message("farmer1", "Will it  rain today?")
+        assert first["success"] is True
+        assert first["intent"] == "get_weather"
+        
+        second = self.orchestrator.handle_simple_message("farmer2", "will it rain today?")
+        assert second["agent"] == "weather"
+        key = f"{self.orchestrator.router.keywords_fingerprint}:will it rain today?"
+        assert self.orchestrator._route_cache.get(key) == "get_weather"
+    
+    def test_new_intent_keywords_bypass_cached_intents(self):
+        """Test that adding intent keywords changes the intent of cached messages."""
+        self.orchestrator.register_agent("general_assistant", GeneralAssistantAgent())
+        assert self.orchestrator.handle_simple_message("farmer1", "irrigation tips")["intent"] == "general_help"
+        
+        self.orchestrator.add_intent_mapping("irrigation_help", ["weather"], keywords=["irrigation"])
+        response = self.orchestrator.handle_simple_message("farmer1", "irrigation tips")
+        assert response["intent"] == "irrigation_help"
+    
+    def test_get_agent_info_tracks_registration(self):
+        """Test that agent info reflects registry changes."""
+        info = self.orchestrator.get_agent_info("weather")
+        assert info["metadata"]["intents"] == ["get_weather"]
+        assert self.orchestrator.get_agent_info("weather") is info
+        
+        self.orchestrator.unregister_agent("weather")
+        assert self.orchestrator.get_agent_info("weather") is None
+        assert "weather" not in self.orchestrator.list_agents()
+    
+    def test_user_context_cache_sees_writes(self):
+        """Test that context writes are visible through the read cache."""
+        assert self.orchestrator.get_user_context("farmer1") == {}
+        
+        self.orchestrator.set_user_context("farmer1", "location", "Punjab")
+        assert self.orchestrator.get_user_context("farmer1") == {"location": "Punjab"}
+        self.orchestrator.get_user_context("farmer1")["poison"] = 1
+        assert self.orchestrator.get_user_context("farmer1") == {"location": "Punjab"}
+        
+        self.orchestrator.clear_user_context("farmer1")
+        assert self.orchestrator.get_user_context("farmer1") == {}
+    
+    def test_handle_message_async(self):
+        """Test handling several messages concurrently on an event loop."""
+        messages = [
+            self.orchestrator.create_user_message("farmer1", "get_weather", "Weather?"),
+            self.orchestrator.create_user_message("farmer2", "get_crop_advice", "Crops?")
+        ]
+        
+        async def handle_all():
+            return await asyncio.gather(*(
+                self.orchestrator.handle_message_async(message) for message in messages
+            ))
+        
+        responses = asyncio.run(handle_all())
+        assert [response["agent"] for response in responses] == ["weather", "crop_advisor"]
+    
+    def test_handle_message_async_serializes_user(self):
+        """Test that one user's concurrent messages are handled in order."""
+        texts = [f"Weather {i}?" for i in range(5)]
+        messages = [
+            self.orchestrator.create_user_message("farmer1", "get_weather", text)
+            for text in texts
+        ]
+        
+        async def handle_all():
+            return await asyncio.gather(*(
+                self.orchestrator.handle_message_async(message) for message in messages
+            ))
+        
+        asyncio.run(handle_all())
+        history = self.orchestrator.get_conversation_history("farmer1")
+        assert [entry["message"]["message"] for entry in history] == texts
+    
+    def test_invoke_agent_directly_caches_responses(self):
+        """Test that identical direct invocations are served from cache."""
+        calls = []
+        
+        def echo(message, context):
+            calls.append(message)
+            return f"echo: {message}"
+        
+        self.orchestrator.register_agent("echo", echo)
+        assert self.orchestrator.invoke_agent_directly("echo", "hi") == "echo: hi"
+        assert self.orchestrator.invoke_agent_directly("echo", "hi") == "echo: hi"
+        assert calls == ["hi"]
+        
+        self.orchestrator.invoke_agent_directly("echo", "hi", no_cache=True)
+        self.orchestrator.invoke_agent_directly("echo", "hi", {"field": "north"})
+        assert calls == ["hi", "hi", "hi"]
+    
+    def test_invoke_cache_follows_registry(self):
+        """Test that re-registering or unregistering an agent bypasses cached responses."""
+        self.orchestrator.register_agent("echo", lambda message, context: f"old {message}")
+        assert self.orchestrator.invoke_agent_directly("echo", "hi") == "old hi"
+        
+        self.orchestrator.register_agent("echo", lambda message, context: f"new {message}")
+        assert self.orchestrator.invoke_agent_directly("echo", "hi") == "new hi"
+        
+        self.orchestrator.registry.unregister("echo")
+        assert self.orchestrator.invoke_agent_directly("echo", "hi") != "new hi"
+    
+    def test_handle_invalid_message(self):
+        """Test that invalid messages are rejected."""
+        message = self.orchestrator.create_user_message("farmer1", "get_weather", "Weather?")
+        message["language"] = "x"
+        
+        response = self.orchestrator.handle_message(message)
+        assert response["success"] is False
+        assert response["error"] == "Invalid ACP message format"
+    
+    def test_handle_malformed_message(self):
+        """Test that messages with missing or unknown fields are rejected."""
+        for message in [{"from_id": "user:farmer1"}, {"unexpected": True}, None]:
+            response = self.orchestrator.handle_message(message)
+            assert response["success"] is False
+            assert response["error"] == "Invalid ACP message format"
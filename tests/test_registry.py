@@ -36,6 +36,27 @@ class TestAgentRegistry:
         assert agent_info["metadata"]["description"] == "Crop advisory agent"
         assert "crop_advice" in agent_info["metadata"]["capabilities"]
     
+    def test_register_many(self):
+        """Test registering several agents at once."""
+        self.registry.register_many([
+            ("crop_advisor", self.crop_agent, {"intents": ["get_crop_advice"]}),
+            ("weather", self.weather_agent, None)
+        ])
+        
+        assert self.registry.list_all() == ["crop_advisor", "weather"]
+        assert self.registry.list_by_intent("get_crop_advice") == ["crop_advisor"]
+        assert self.registry.get("weather") == self.weather_agent
+    
+    def test_call_agent(self):
+        """Test invoking agents through the registry."""
+        self.registry.register("weather", self.weather_agent)
+        self.registry.register("echo", lambda message, context: f"echo: {message}")
+        
+        assert "Mumbai" in self.registry.call("weather", "weather in mumbai")
+        assert self.registry.call("echo", "hi") == "echo: hi"
+        with pytest.raises(KeyError):
+            self.registry.call("nonexistent", "hi")
+    
     def test_get_nonexistent_agent(self):
         """Test getting a non-existent agent."""
         assert self.registry.get("nonexistent") is None
@@ -89,6 +110,36 @@ class TestAgentRegistry:
         assert "crop_advisor" in crop_intent_agents
         assert "weather" not in crop_intent_agents
     
+    def test_list_by_intent_excludes_inactive(self):
+        """Test that deactivated agents drop out of intent lookups."""
+        self.registry.register("crop_advisor", self.crop_agent, {
+            "intents": ["get_crop_advice"]
+        })
+        self.registry.update_metadata("crop_advisor", {"is_active": False})
+        assert self.registry.list_by_intent("get_crop_advice") == []
+        
+        self.registry.update_metadata("crop_advisor", {"is_active": True})
+        assert self.registry.list_by_intent("get_crop_advice") == ["crop_advisor"]
+    
+    def test_indexes_follow_metadata_changes(self):
+        """Test that re-registration and updates keep lookups consistent."""
+        self.registry.register("crop_advisor", self.crop_agent, {
+            "capabilities": ["crop_advice"]
+        })
+        self.registry.register("crop_advisor", self.crop_agent, {
+            "capabilities": ["soil_analysis"]
+        })
+        assert self.registry.list_by_capability("crop_advice") == []
+        assert self.registry.list_by_capability("soil_analysis") == ["crop_advisor"]
+        
+        self.registry.update_metadata("crop_advisor", {"capabilities": ["market_prices"]})
+        assert self.registry.list_by_capability("soil_analysis") == []
+        assert self.registry.list_by_capability("market_prices") == ["crop_advisor"]
+        
+        self.registry.unregister("crop_advisor")
+        assert self.registry.list_by_capability("market_prices") == []
+        assert self.registry.list_active() == []
+    
     def test_unregister_agent(self):
         """Test agent unregistration."""
         self.registry.register("crop_advisor", self.crop_agent)
@@ -124,6 +175,37 @@ class TestAgentRegistry:
         })
         assert success is False
     
+    def test_update_metadata_keeps_unchanged_index_entries(self):
+        """Test that metadata updates only move the changed index entries."""
+        self.registry.register("crop_advisor", self.crop_agent, {
+            "intents": ["general_help"]
+        })
+        self.registry.register("weather", self.weather_agent, {
+            "intents": ["general_help"]
+        })
+        
+        self.registry.update_metadata("crop_advisor", {
+            "intents": ["general_help", "get_crop_advice"]
+        })
+        assert self.registry.list_by_intent("general_help") == ["crop_advisor", "weather"]
+        assert self.registry.list_by_intent("get_crop_advice") == ["crop_advisor"]
+        
+        self.registry.update_metadata("crop_advisor", {"intents": ["get_crop_advice"]})
+        assert self.registry.list_by_intent("general_help") == ["weather"]
+    
+    def test_snapshot_tracks_changes(self):
+        """Test that the cached snapshot is rebuilt after mutations."""
+        self.registry.register("crop_advisor", self.crop_agent)
+        snapshot = self.registry.snapshot
+        assert list(snapshot) == ["crop_advisor"]
+        assert self.registry.snapshot is snapshot
+        
+        self.registry.update_metadata("crop_advisor", {"description": "Updated"})
+        assert self.registry.snapshot["crop_advisor"]["metadata"]["description"] == "Updated"
+        
+        self.registry.unregister("crop_advisor")
+        assert self.registry.snapshot == {}
+    
     def test_clear_registry(self):
         """Test clearing all agents."""
         self.registry.register("crop_advisor", self.crop_agent)
@@ -164,13 +246,36 @@ class TestAgentMetadata:
         assert "test_intent" in metadata.intents
         assert metadata.is_active is True
     
+    def test_agent_metadata_freezes_lists(self):
+        """Test that capabilities and intents are stored as tuples."""
+        metadata = AgentMetadata(
+            name="test_agent",
+            capabilities=["test_capability"],
+            intents=None
+        )
+        
+        assert metadata.capabilities == ("test_capability",)
+        assert metadata.intents == ()
+        assert metadata.to_dict()["capabilities"] == ["test_capability"]
+    
     def test_agent_metadata_defaults(self):
         """Test AgentMetadata default values."""
         metadata = AgentMetadata(name="test_agent")
         
         assert metadata.description == ""
-        assert metadata.capabilities == []
-        assert metadata.intents == []
+        assert metadata.capabilities == ()
+        assert metadata.intents == ()
         assert metadata.version == "1.0.0"
         assert metadata.is_active is True
-        assert metadata.config == {} 
\ No newline at end of file
+        assert metadata.config == {}
+    
+    def test_agent_metadata_none_config(self):
+        """Test that a None config is stored as an empty dict."""
+        registry = AgentRegistry()
+        registry.register("test_agent", CropAdvisorAgent(), {"config": None})
+        
+        assert registry.get_metadata("test_agent").config == {}
+        assert registry.get_agent_info("test_agent")["metadata"]["config"] == {}
+        
+        registry.update_metadata("test_agent", {"config": None})
+        assert registry.get_metadata("test_agent").to_dict()["config"] == {} 
\ No newline at end of file
@@ -0,0 +1,161 @@
+"""
+Tests for AgentRouter module.
+"""
+
+import threading
+
+import pytest
+
+from gcp_agentor.acp import create_user_message
+from gcp_agentor.agent_registry import AgentRegistry
+from gcp_agentor.invoker import AgentInvoker
+from gcp_agentor.memory import MemoryManager
+from gcp_agentor.router import INTENT_KEYWORDS, AgentRouter, _build_intent_matcher
+
+
+class BarrierAgent:
+    """Agent that waits until all agents sharing its barrier are running."""
+    
+    def __init__(self, name, barrier):
+        self.name = name
+        self.barrier = barrier
+    
+    def invoke(self, message, context):
+        self.barrier.wait(timeout=5)
+        previous = [result["agent"] for result in context.get("previous_results", [])]
+        return f"{self.name} after {previous}"
+
+
+class TestAgentRouter:
+    """Test cases for AgentRouter."""
+    
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.registry = AgentRegistry()
+        self.router = AgentRouter(self.registry, MemoryManager())
+    
+    def teardown_method(self):
+        """Release the router's thread pool."""
+        self.router.close()
+    
+    def test_analyze_intent_keywords(self):
+        """Test keyword intent detection and its priority order."""
+        def analyze(text):
+            return self.router._analyze_intent(create_user_message("u", "", text))
+        
+        assert analyze("Will it RAIN?") == "get_weather"
+        assert analyze("pest on my crop") == "get_crop_advice"
+        assert analyze("selling price of soil") == "soil_analysis"
+        assert analyze("hello") == "general_help"
+        assert self.router._analyze_intent(create_user_message("u", "pest_control", "rain")) == "pest_control"
+    
+    def test_add_intent_mapping_keywords(self):
+        """Test that intents added with keywords are detected after the built-in ones."""
+        def analyze(text):
+            return self.router._analyze_intent(create_user_message("u", "", text))
+        
+        assert analyze("irrigation schedule") == "general_help"
+        self.router.add_intent_mapping("irrigation", ["water_agent"], ["Irrigation", "drip"])
+        assert analyze("irrigation schedule") == "irrigation"
+        assert analyze("drip irrigation for my crop") == "get_crop_advice"
+    
+    def test_add_intent_mapping_rejects_blank_keywords(self):
+        """Test that keywords matching every message are refused."""
+        for keywords in ([""], ["drip", "  "]):
+            with pytest.raises(ValueError):
+                self.router.add_intent_mapping("irrigation", ["water_agent"], keywords)
+        
+        assert "irrigation" not in self.router._intent_mapping
+        assert self.router._analyze_intent(create_user_message("u", "", "hello")) == "general_help"
+    
+    def test_intent_matcher_prefers_earlier_intents(self):
+        """Test that the matcher returns the first intent with a keyword in the text."""
+        match = _build_intent_matcher(INTENT_KEYWORDS)
+        assert match("market temperature for the harvest") == "get_crop_advice"
+        assert match("nothing here") is None
+        assert _build_intent_matcher({})("crop") is None
+    
+    def test_select_agents_follows_registry(self):
+        """Test that cached agent selections change with the registry and mappings."""
+        assert list(self.router._select_agents("get_weather", {})) == []
+        self.registry.register("weather", BarrierAgent("weather", threading.Barrier(1)))
+        assert list(self.router._select_agents("get_weather", {})) == ["weather"]
+        
+        self.router.add_intent_mapping("get_weather", ["crop_advisor", "weather"])
+        assert list(self.router._select_agents("get_weather", {})) == ["weather"]
+        self.registry.unregister("weather")
+        assert list(self.router._select_agents("get_weather", {})) == []
+    
+    def test_chain_waves(self):
+        """Test grouping tool chain steps by their dependencies."""
+        assert AgentRouter._chain_waves(3, None) == [[0], [1], [2]]
+        steps = [{}, {"depends_on": []}, {"depends_on": [0, 1]}, {"depends_on": [0]}]
+        assert AgentRouter._chain_waves(4, steps) == [[0, 1], [2, 3]]
+    
+    def test_independent_steps_run_concurrently(self):
+        """Test that independent steps run together and later ones see their results."""
+        barrier = threading.Barrier(2)
+        for name in ["a", "b"]:
+            self.registry.register(name, BarrierAgent(name, barrier))
+        self.registry.register("c", BarrierAgent("c", threading.Barrier(1)))
+        self.router.add_tool_chain("parallel", [
+            {"agent": "a", "depends_on": []},
+            {"agent": "b", "depends_on": []},
+            {"agent": "c", "depends_on": [0, 1]},
+        ])
+        
+        response = self.router.route(
+            create_user_message("farmer1", "general_help", "hi", context={"tool_chain": "parallel"})
+        )
+        
+        assert [step["result"] for step in response["step_results"]] == [
+            "a after []", "b after []", "c after ['a', 'b']"
+        ]
+    
+    def test_chain_results_keep_step_order(self):
+        """Test that results are in step order even when waves reorder the steps."""
+        for name in ["a", "b", "c"]:
+            self.registry.register(name, BarrierAgent(name, threading.Barrier(1)))
+        self.router.add_tool_chain("reordered", [
+            {"agent": "a"},
+            {"agent": "b", "depends_on": [0]},
+            {"agent": "c", "depends_on": []},
+        ])
+        
+        response = self.router.route(
+            create_user_message("farmer1", "general_help", "hi", context={"tool_chain": "reordered"})
+        )
+        
+        assert [step["result"] for step in response["step_results"]] == [
+            "a after []", "b after ['a', 'c']", "c after []"
+        ]
+        assert [step["agent"] for step in response["context"]["previous_results"]] == ["a", "b", "c"]
+    
+    def test_keywords_fingerprint_follows_priority(self):
+        """Test that the same keywords in another priority order get another fingerprint."""
+        routers = [AgentRouter(self.registry, MemoryManager()) for _ in range(2)]
+        routers[0].add_intent_mapping("drip_irrigation", ["water_agent"], ["drip"])
+        routers[0].add_intent_mapping("drip_repair", ["repair_agent"], ["drip"])
+        routers[1].add_intent_mapping("drip_repair", ["repair_agent"], ["drip"])
+        routers[1].add_intent_mapping("drip_irrigation", ["water_agent"], ["drip"])
+        
+        intents = [router._analyze_intent(create_user_message("u", "", "drip")) for router in routers]
+        assert intents == ["drip_irrigation", "drip_repair"]
+        assert routers[0].keywords_fingerprint != routers[1].keywords_fingerprint
+        for router in routers:
+            router.close()
+    
+    def test_routed_calls_hit_response_cache(self):
+        """Test that the router's per-call metadata doesn't defeat the invoker's response cache."""
+        calls = []
+        invoker = AgentInvoker(cache_size=8)
+        invoker.register_agent_type("local", lambda name, message, context: calls.append(message) or message)
+        router = AgentRouter(self.registry, MemoryManager(), invoker=invoker)
+        self.registry.register("weather", "remote-weather-agent")
+        
+        for user_id in ["farmer1", "farmer1", "farmer2"]:
+            response = router.route(create_user_message(user_id, "get_weather", "rain?"))
+            assert response["response"] == "rain?"
+        router.close()
+        
+        assert calls == ["rain?"]